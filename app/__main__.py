@@ -0,0 +1,223 @@
+"""
+Lanceur de production : un process maître, N workers uvicorn forkés.
+
+    python -m app [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+- l'app est importée une fois dans le maître puis forkée (mémoire partagée en copy-on-write) ;
+  le lifespan (DB, RabbitMQ, consumers) tourne dans chaque worker ;
+- uvloop / httptools si installés (uvicorn[standard]) ;
+- recyclage d'un worker après WEB_MAX_REQUESTS requêtes (+ jitter), remplacé aussitôt ;
+- SIGTERM/SIGINT : arrêt gracieux des workers (WEB_GRACEFUL_TIMEOUT), puis SIGKILL ;
+- métriques : mode multiprocess de prometheus_client (PROMETHEUS_MULTIPROC_DIR, créé si absent) ;
+- spool d'events (EVENTS_SPOOL_DIR) : un sous-répertoire `worker-<n>` par emplacement de worker,
+  repris par le worker qui le remplace (un spool n'est jamais ouvert par deux process).
+Avec plusieurs workers, préférer EVENTS_CONSUME_IN_API=false + `python -m app.worker` :
+sinon chaque worker consomme (consumers concurrents sur les mêmes queues).
+Sans fork (Windows), démarre un seul process uvicorn.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.launcher")
+
+
+def prepare_multiproc_dir(workers: int) -> Optional[str]:
+    """
+    Répertoire des métriques multiprocess, vidé des fichiers d'un lancement précédent.
+    À appeler AVANT le premier import de prometheus_client (il lit la variable à l'import).
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or settings.PROMETHEUS_MULTIPROC_DIR
+    if not path and workers > 1:
+        path = tempfile.mkdtemp(prefix="order-api-metrics-")
+    if not path:
+        return None
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    settings.PROMETHEUS_MULTIPROC_DIR = path
+    return path
+
+
+def max_requests_for_worker(base: int, jitter: int, rng: random.Random = random.Random()) -> Optional[int]:
+    """Seuil de recyclage d'un worker ; le jitter évite que tous redémarrent ensemble."""
+    if base <= 0:
+        return None
+    return base + (rng.randint(0, jitter) if jitter > 0 else 0)
+
+
+def worker_spool_dir(base: str, slot: int, workers: int) -> str:
+    """Spool propre à l'emplacement `slot` (0..workers-1) ; inchangé avec un seul worker."""
+    if not base or workers <= 1:
+        return base
+    return os.path.join(base, f"worker-{slot}")
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket) -> None:
+    """Corps d'un worker (après fork)."""
+    import uvicorn
+
+    from app.core.db import engine
+
+    # Connexions éventuellement ouvertes par le maître : jamais partagées entre process
+    engine.dispose(close=False)
+    config = uvicorn.Config(
+        app,
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        log_config=None,
+        proxy_headers=True,
+        limit_max_requests=max_requests_for_worker(settings.WEB_MAX_REQUESTS, settings.WEB_MAX_REQUESTS_JITTER),
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Arbiter:
+    """Process maître : forke, surveille et remplace les workers."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, graceful_timeout: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, Tuple[float, int]] = {}  # pid -> (heure de lancement, emplacement)
+        self.stopping = False
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            settings.EVENTS_SPOOL_DIR = worker_spool_dir(settings.EVENTS_SPOOL_DIR, slot, self.workers)
+            code = 0
+            try:
+                _serve(self.app, self.sock)
+            except BaseException:
+                logger.exception("[launcher] worker %d en erreur", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = (time.monotonic(), slot)
+        logger.info("[launcher] worker %d lancé (emplacement %d)", pid, slot)
+
+    def _reap(self, pid: int, status: int) -> None:
+        child = self.children.pop(pid, None)
+        if child is None:
+            return
+        started, slot = child
+        if settings.PROMETHEUS_MULTIPROC_DIR:
+            from prometheus_client import multiprocess
+
+            multiprocess.mark_process_dead(pid)
+        code = os.waitstatus_to_exitcode(status)
+        logger.info("[launcher] worker %d terminé (code %d)", pid, code)
+        if not self.stopping:
+            # Un worker qui meurt dès le démarrage ne doit pas faire boucler le maître
+            if code != 0 and time.monotonic() - started < 1.0:
+                time.sleep(1.0)
+            # Même emplacement : le remplaçant reprend le spool laissé par le worker terminé
+            self.spawn(slot)
+
+    def stop(self, *_: object) -> None:
+        if not self.stopping:
+            logger.info("[launcher] arrêt demandé, arrêt gracieux des workers")
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        deadline: Optional[float] = None
+        while self.children:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + self.graceful_timeout
+            if deadline is not None and time.monotonic() > deadline:
+                for pid in list(self.children):
+                    logger.warning("[launcher] worker %d toujours actif, SIGKILL", pid)
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float("inf")
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            self._reap(pid, status)
+        self.sock.close()
+        logger.info("[launcher] arrêté")
+        return 0
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Lance l'API avec N workers")
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    prepare_multiproc_dir(args.workers)
+
+    # Préchargement : import de l'app (et de ses dépendances) une seule fois, avant fork
+    from app.core.db import engine, startup_db
+    from app.main import app
+
+    # Schéma vérifié / créé ici une fois (selon DB_INIT_MODE) : les lifespans des workers
+    # ne se concurrencent pas sur create_all
+    try:
+        startup_db()
+    except Exception:
+        logger.exception("[launcher] init DB impossible, laissée aux workers")
+    finally:
+        engine.dispose()
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+
+        uvicorn.run(app, host=args.host, port=args.port, loop="auto", http="auto", log_config=None)
+        return 0
+
+    sock = _bind(args.host, args.port)
+    logger.info("[launcher] %s:%d, %d worker(s)", args.host, sock.getsockname()[1], args.workers)
+    return Arbiter(app, sock, max(1, args.workers), settings.WEB_GRACEFUL_TIMEOUT).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
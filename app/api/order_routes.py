@@ -1,16 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.core.db import get_db
-from app.schemas.order_schemas import OrderCreate, OrderResponse, OrderUpdate
-from app.security.security import require_read, require_write
+from app.core.config import settings
+from app.core.db import SessionLocal, get_db
+from app.infra.events.stream import (
+    StreamEvent,
+    Subscription,
+    Topic,
+    TooManySubscribers,
+    order_snapshot,
+    order_stream,
+)
+from app.schemas.order_schemas import (
+    OrderChangesPage,
+    OrderCreate,
+    OrderResponse,
+    OrderStatusBatch,
+    OrderStatusResponse,
+    OrderStatusResult,
+    OrderUpdate,
+)
+from app.security.ratelimit import limit_read, limit_write
 from app.infra.events.rabbitmq import rabbitmq
-from app.services.order_services import NotFoundError, OrderService  # implémente MessagePublisher
+from app.services.order_services import InvalidTransitionError, NotFoundError, OrderService  # implémente MessagePublisher
 from app.models.order_models import OrderStatus
 
 
@@ -20,30 +41,42 @@ logger = logging.getLogger(__name__)
 
 # ---------- Dependency injection ----------
 def get_order_service(db: Session = Depends(get_db)) -> OrderService:
-    """Construit un OrderService avec repo + publisher (RabbitMQ)."""
+    """Construit un OrderService avec repo + publisher (RabbitMQ, ou outbox si EVENTS_OUTBOX_ENABLED)."""
     from app.repositories.order_repositories import OrderRepository
 
     repo = OrderRepository(db)
-    return OrderService(repo, rabbitmq)
+    return OrderService(
+        repo, rabbitmq,
+        use_outbox=settings.EVENTS_OUTBOX_ENABLED,
+        coalesce_reads=settings.ORDERS_READ_COALESCING,
+    )
 
 
 # ---------- Endpoints CRUD ----------
 
-@router.post("/", response_model=OrderResponse, status_code=201, dependencies=[Depends(require_write)])
+@router.post("/", response_model=OrderResponse, status_code=201, dependencies=[Depends(limit_write)])
 async def create_order(
     order_in: OrderCreate,
+    response: Response,
+    wait_for_price: int = Query(0, ge=0, description="Attendre le calcul du prix (ms, 0 = non)"),
     svc: OrderService = Depends(get_order_service),
 ):
     """
     Crée et persiste immédiatement une commande (statut pending) avec ses items bruts (quantités sans prix),
     puis publie un event pour calculer les prix. Retourne la ressource créée (201 Created).
+    Avec `?wait_for_price=ms`, attend le prix : 201 avec la commande chiffrée, ou 202 Accepted
+    avec la commande en attente si le délai expire.
     """
-    return await svc.create_and_request_price(order_in)
+    wait_ms = min(wait_for_price, settings.ORDERS_WAIT_FOR_PRICE_MAX_MS)
+    order = await svc.create_and_request_price(order_in, wait_for_price_ms=wait_ms)
+    if wait_ms and order.total is None:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return order
 
 @router.get(
     "/",
     response_model=List[OrderResponse],
-    dependencies=[Depends(require_read)],
+    dependencies=[Depends(limit_read)],
 )
 def list_orders(
     skip: int = 0,
@@ -51,33 +84,86 @@ def list_orders(
     svc: OrderService = Depends(get_order_service),
 ):
     """Lister toutes les commandes. Nécessite les droits READ."""
-    return svc.get_all_orders(skip=skip, limit=limit)
+    # JSON déjà sérialisé : FastAPI ne revalide pas une Response (response_model sert à l'OpenAPI)
+    return Response(svc.list_orders_json(skip=skip, limit=limit), media_type="application/json")
+
+
+@router.get(
+    "/changes",
+    response_model=OrderChangesPage,
+    dependencies=[Depends(limit_read)],
+)
+def list_order_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1),
+    svc: OrderService = Depends(get_order_service),
+):
+    """
+    Flux de changements pour synchronisation incrémentale (indexeur, entrepôt). Nécessite READ.
+    Sans `since` : depuis le début. Repasser `next_cursor` tant que `has_more`, puis périodiquement.
+    Les suppressions apparaissent en `op=delete`.
+    """
+    try:
+        return svc.get_changes(
+            since,
+            limit=min(limit, settings.ORDERS_CHANGES_MAX_PAGE),
+            settle_ms=settings.ORDERS_CHANGES_SETTLE_MS,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get(
     "/{order_id}",
     response_model=OrderResponse,
-    dependencies=[Depends(require_read)],
+    dependencies=[Depends(limit_read)],
 )
 def get_order(order_id: int, svc: OrderService = Depends(get_order_service)):
     """Obtenir une commande par son ID. Nécessite READ."""
     try:
-        return svc.get_order(order_id)
+        return Response(svc.get_order_json(order_id), media_type="application/json")
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
+@router.patch(
+    "/status",
+    response_model=List[OrderStatusResult],
+    dependencies=[Depends(limit_write)],
+)
+async def update_order_statuses(batch: OrderStatusBatch, svc: OrderService = Depends(get_order_service)):
+    """
+    Changer le statut de plusieurs commandes en une transaction. Nécessite WRITE.
+    Un résultat par commande : updated, unchanged (déjà dans ce statut), not_found,
+    conflict (`expected_version` différente de la version courante) ou invalid_transition.
+    """
+    if len(batch.updates) > settings.ORDERS_STATUS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many updates (max {settings.ORDERS_STATUS_BATCH_MAX}).")
+    if len({u.order_id for u in batch.updates}) != len(batch.updates):
+        raise HTTPException(status_code=400, detail="Duplicate order_id in batch.")
+    changes = []
+    for update in batch.updates:
+        try:
+            changes.append((update.order_id, OrderStatus(update.status), update.expected_version))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid status value for order {update.order_id}.")
+    return await svc.update_statuses(changes)
+
+
 @router.put(
     "/{order_id}/status",
-    response_model=OrderResponse,
-    dependencies=[Depends(require_write)],
+    response_model=OrderStatusResponse,
+    dependencies=[Depends(limit_write)],
 )
 async def update_order_status(
     order_id: int,
     status_update: OrderUpdate,
     svc: OrderService = Depends(get_order_service),
 ):
-    """Mettre à jour le statut d’une commande. Nécessite WRITE."""
+    """
+    Mettre à jour le statut d’une commande. Nécessite WRITE. 409 si la transition est interdite.
+    Réponse : état renvoyé par l'UPDATE (sans items), aucune relecture de la commande.
+    """
     if not status_update.status:
         raise HTTPException(status_code=400, detail="Status field is required.")
 
@@ -86,14 +172,17 @@ async def update_order_status(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid status value.")
     try:
-        return await svc.update_order_status(order_id, new_status)
+        row = await svc.update_order_status(order_id, new_status)
+        return OrderStatusResponse.model_validate(row, from_attributes=True)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except InvalidTransitionError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 @router.delete(
     "/{order_id}",
     status_code=status.HTTP_204_NO_CONTENT,
-    dependencies=[Depends(require_write)],
+    dependencies=[Depends(limit_write)],
 )
 async def delete_order(order_id: int, svc: OrderService = Depends(get_order_service)):
     """Supprimer une commande. Nécessite WRITE."""
@@ -103,3 +192,103 @@ async def delete_order(order_id: int, svc: OrderService = Depends(get_order_serv
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+# ---------- Flux SSE ----------
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def _load_snapshot(order_id: int) -> Optional[dict]:
+    # Session courte : un flux SSE ne garde pas de connexion DB ouverte
+    db = SessionLocal()
+    try:
+        from app.repositories.order_repositories import OrderRepository
+
+        order = OrderRepository(db).get(order_id)
+        return order_snapshot(order) if order else None
+    finally:
+        db.close()
+
+
+def _subscribe(topic: Topic, last_event_id: Optional[str]):
+    try:
+        last = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last = None
+    try:
+        return order_stream.subscribe(topic, last)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event stream subscribers",
+            headers={"Retry-After": "5"},
+        )
+
+
+async def _stream(
+    request: Request, sub: Subscription, first: List[bytes], missed: List[StreamEvent]
+) -> AsyncIterator[bytes]:
+    """Rejoue les events manqués puis suit le flux ; commentaire heartbeat si rien ne passe."""
+    try:
+        yield b"retry: 3000\n\n"
+        for chunk in first:
+            yield chunk
+        for ev in missed:
+            yield _sse(ev.event, ev.data, ev.id)
+        while not await request.is_disconnected():
+            try:
+                ev = await asyncio.wait_for(sub.queue.get(), timeout=settings.ORDERS_STREAM_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            if ev is None:
+                break  # abonné trop lent, le client se reconnecte avec Last-Event-ID
+            yield _sse(ev.event, ev.data, ev.id)
+    finally:
+        sub.close()
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get("/{order_id}/events", dependencies=[Depends(limit_read)])
+async def order_events(
+    order_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Flux SSE des changements d'une commande (created, status, priced, deleted). Nécessite READ.
+    Commence par un event `snapshot` (état courant) sauf si `Last-Event-ID` permet une reprise complète.
+    Couvre les changements de tous les process (worker, autres workers API) via EVENTS_NOTIFY_EXCHANGE.
+    """
+    # Abonné avant la lecture : aucun changement ne tombe entre le snapshot et le flux
+    sub, missed, complete = _subscribe(("order", order_id), last_event_id)
+    try:
+        snapshot = await run_in_threadpool(_load_snapshot, order_id)
+    except BaseException:
+        sub.close()
+        raise
+    if snapshot is None:
+        sub.close()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Order {order_id} not found")
+    first = [] if last_event_id and complete else [_sse("snapshot", snapshot)]
+    return StreamingResponse(
+        _stream(request, sub, first, missed), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
+
+
+@router.get("/customers/{customer_id}/events", dependencies=[Depends(limit_read)])
+async def customer_order_events(
+    customer_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Flux SSE des changements de toutes les commandes d'un client. Nécessite READ."""
+    sub, missed, _ = _subscribe(("customer", customer_id), last_event_id)
+    return StreamingResponse(
+        _stream(request, sub, [], missed), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
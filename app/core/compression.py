@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+import zlib
+from typing import Callable, Dict, List, Optional, Protocol
+
+from prometheus_client import Counter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total",
+    "Octets des réponses compressées, avant (uncompressed) et après (compressed)",
+    ["encoding", "kind"],
+)
+
+# Types compressibles ; text/event-stream exclu (flux SSE : pas de tampon)
+_COMPRESSIBLE = ("application/json", "application/problem+json", "application/xml", "text/")
+_NOT_COMPRESSIBLE = ("text/event-stream",)
+
+
+class _Stream(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def flush(self) -> bytes:
+        ...
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        import brotli  # dépendance optionnelle
+
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        import zstandard  # dépendance optionnelle
+
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+
+# encoding -> fabrique de flux de compression (niveaux : compromis CPU / taille pour du JSON)
+_ENCODERS: Dict[str, Callable[[], _Stream]] = {"gzip": lambda: _GzipStream(6)}
+
+try:
+    import brotli  # noqa: F401
+
+    _ENCODERS["br"] = lambda: _BrotliStream(4)
+except ImportError:
+    logger.debug("brotli non installé: encodage br indisponible")
+
+try:
+    import zstandard  # noqa: F401
+
+    _ENCODERS["zstd"] = lambda: _ZstdStream(3)
+except ImportError:
+    logger.debug("zstandard non installé: encodage zstd indisponible")
+
+
+def available_encodings(spec: str) -> List[str]:
+    """"zstd,br,gzip" → encodages demandés et installés, dans l'ordre de préférence serveur."""
+    wanted = [e.strip().lower() for e in spec.split(",") if e.strip()]
+    missing = [e for e in wanted if e not in _ENCODERS]
+    if missing:
+        logger.warning("compression: encodage(s) indisponible(s) ignoré(s): %s", ", ".join(missing))
+    return [e for e in wanted if e in _ENCODERS]
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Premier encodage serveur accepté par le client (q > 0, `*` compris), ou None."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in encodings:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(_COMPRESSIBLE) and not content_type.startswith(_NOT_COMPRESSIBLE)
+
+
+class CompressionMiddleware:
+    """
+    Compression des réponses (ASGI pur) selon Accept-Encoding : gzip, br / zstd si installés.
+    Non compressées : corps sous `minimum_size`, statuts sans corps (204, 304), réponses déjà
+    encodées, types non textuels et flux SSE. Les réponses streamées sont compressées au fil de l'eau.
+    """
+
+    def __init__(self, app: ASGIApp, encodings: List[str], minimum_size: int = 1024) -> None:
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.app = middleware.app
+        self.minimum_size = middleware.minimum_size
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.stream: Optional[_Stream] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.app(scope, receive, self.on_send)
+
+    async def on_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            status = message["status"]
+            eligible = status >= 200 and status not in (204, 304) and _compressible(headers)
+            if not eligible or "content-encoding" in headers:
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start = message  # retenu jusqu'au premier morceau de corps
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            start["headers"] = headers.raw
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.stream = _ENCODERS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                compressed = self.stream.compress(body) + self.stream.flush()
+                headers["Content-Length"] = str(len(compressed))
+                self._count(len(body), len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(start)
+
+        assert self.stream is not None
+        chunk = self.stream.compress(body)
+        if not more_body:
+            chunk += self.stream.flush()
+        self._count(len(body), len(chunk))
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _count(self, uncompressed: int, compressed: int) -> None:
+        COMPRESSION_BYTES.labels(self.encoding, "uncompressed").inc(uncompressed)
+        COMPRESSION_BYTES.labels(self.encoding, "compressed").inc(compressed)
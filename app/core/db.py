@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, delete, insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from app.core.config import settings
@@ -38,13 +42,73 @@ SessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+# ---------- Version de schéma ----------
+# Version = empreinte des modèles (schema_fingerprint) : pas d'incrément manuel à oublier
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+def schema_fingerprint(metadata: MetaData = Base.metadata) -> int:
+    """
+    Empreinte des tables, colonnes (type, nullable, clé primaire), index et clés étrangères.
+    Toute modification des modèles la change. Les modèles doivent être importés (comme pour create_all).
+    """
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        if table.name == schema_version.name:
+            continue
+        parts.append(f"table:{table.name}")
+        parts += [f"col:{c.name}:{c.type!r}:{c.nullable}:{c.primary_key}" for c in table.columns]
+        parts += sorted(f"ix:{ix.name}:{[c.name for c in ix.columns]}:{ix.unique}" for ix in table.indexes)
+        parts += sorted(f"fk:{fk.parent.name}:{fk.target_fullname}" for fk in table.foreign_keys)
+    # 28 bits : tient dans la colonne INTEGER
+    return int(hashlib.sha256("\n".join(parts).encode()).hexdigest()[:7], 16)
+
+
 def init_db() -> None:
     """
-    Enregistre tous les modèles et crée les tables manquantes.
+    Enregistre tous les modèles et crée les tables manquantes, puis enregistre leur empreinte.
     IMPORTANT: il faut importer les modèles avant d’appeler create_all().
     """
     Base.metadata.create_all(bind=engine)
-    logger.info("[order-api] DB init: tables ensured")
+    version = schema_fingerprint()
+    with engine.begin() as conn:
+        conn.execute(delete(schema_version))
+        conn.execute(insert(schema_version).values(version=version))
+    logger.info("[order-api] DB init: tables ensured (schema %07x)", version)
+
+
+def current_schema_version() -> Optional[int]:
+    """Version enregistrée en base (None si la table est absente ou vide)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(schema_version.c.version)).scalar()
+    except SQLAlchemyError:
+        logger.debug("[order-api] schema_version illisible", exc_info=True)
+        return None
+
+
+def startup_db() -> None:
+    """
+    Étape DB du démarrage (lifespan), selon DB_INIT_MODE :
+    - "version" : une seule lecture de schema_version (sert aussi de test de connexion) ;
+      create_all n'est lancé que si la version est absente ou différente de l'empreinte des modèles ;
+    - "create_all" (défaut) : SELECT 1 puis create_all à chaque démarrage.
+    """
+    if settings.DB_INIT_MODE == "version":
+        version, expected = current_schema_version(), schema_fingerprint()
+        if version == expected:
+            logger.info("[order-api] DB schema %07x OK, create_all skipped", version)
+            return
+        logger.warning("[order-api] DB schema version %s != %07x: create_all", version, expected)
+    else:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        logger.info("database connection OK")
+    init_db()
 
 
 def get_db():
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from prometheus_client import Gauge, Histogram
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DB_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "db_executor_queue_depth", "Tâches DB en attente d'un thread du pool", ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_EXECUTOR_IN_FLIGHT = Gauge(
+    "db_executor_in_flight", "Tâches DB en cours d'exécution", ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_EXECUTOR_WAIT = Histogram(
+    "db_executor_wait_seconds", "Attente avant prise en charge par le pool DB", ["pool"]
+)
+
+
+class DbExecutor:
+    """
+    Pool de threads dédié au travail SQLAlchemy synchrone des handlers,
+    pour ne pas bloquer la boucle asyncio (HTTP + consumer).
+    max_workers=0 : exécution inline (comportement historique).
+    """
+
+    def __init__(self, max_workers: int, name: str = "db") -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+            if max_workers > 0
+            else None
+        )
+        self._queue_depth = DB_EXECUTOR_QUEUE_DEPTH.labels(name)
+        self._in_flight = DB_EXECUTOR_IN_FLIGHT.labels(name)
+        self._wait = DB_EXECUTOR_WAIT.labels(name)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._pool is None:
+            return fn(*args, **kwargs)
+
+        submitted = time.perf_counter()
+        # Le premier qui prend le verrou (thread ou annulation) décrémente la file d'attente
+        dequeued = threading.Lock()
+
+        def _call() -> T:
+            if dequeued.acquire(blocking=False):
+                self._queue_depth.dec()
+            self._wait.observe(time.perf_counter() - submitted)
+            self._in_flight.inc()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._in_flight.dec()
+
+        self._queue_depth.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, _call)
+        finally:
+            if dequeued.acquire(blocking=False):
+                self._queue_depth.dec()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            logger.info("[executor] pool %s arrêté", self.name)
+
+
+db_executor = DbExecutor(settings.DB_EXECUTOR_WORKERS)
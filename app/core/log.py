@@ -3,20 +3,20 @@ from __future__ import annotations
 import logging
 import sys
 import json
-import time
-import uuid
-from typing import Any
-from fastapi import Request, Response
+from contextvars import ContextVar
 from uvicorn.logging import ColourizedFormatter
 from app.core.config import settings
 
+# Positionné par RequestContextMiddleware pour la durée de la requête
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
 
 class _RequestIdLogFilter(logging.Filter):
     """Injecte le request_id dans tous les logs d'une requête."""
 
     def filter(self, record: logging.LogRecord) -> bool:
-        # request_id est ajouté par le middleware access
-        record.request_id = getattr(record, "request_id", "-")  # type: ignore
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()  # type: ignore
         return True
 
 
@@ -60,41 +60,15 @@ def setup_logging():
         formatter = ColourizedFormatter("%(levelprefix)s %(name)s - %(message)s", use_colors=True)
 
     handler.setFormatter(formatter)
+    # Filtre sur le handler : il voit aussi les records propagés par les loggers enfants
+    handler.addFilter(_RequestIdLogFilter())
 
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     root_logger.addHandler(handler)
-    root_logger.addFilter(_RequestIdLogFilter())
 
     # Moins de bruit
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
-
-async def access_log_middleware(request: Request, call_next) -> Response:
-    """Middleware pour logguer les requêtes et réponses avec un request_id."""
-
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-
-    logger = logging.getLogger("app.access")
-    extra: dict[str, Any] = {
-        "request_id": request_id,
-        "method": request.method,
-        "path": request.url.path,
-        "client_ip": request.client.host if request.client else "-",
-        "user_agent": request.headers.get("user-agent", "-"),
-    }
-
-    start = time.time()
-    response = await call_next(request)
-    duration_ms: float = round((time.time() - start) * 1000, 2)
-
-    # Explicitly use correct types for extra fields
-    extra["status"] = int(response.status_code)
-    extra["latency_ms"] = duration_ms
-
-    logger.info("request", extra=extra)
-
-    return response
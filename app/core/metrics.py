@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest, multiprocess
+from prometheus_client.utils import INF
+
+from app.core.config import settings
+
+
+def parse_buckets(spec: str) -> Tuple[float, ...]:
+    """"0.01,0.1,1" → (0.01, 0.1, 1.0, +Inf) ; "" → buckets par défaut de prometheus_client."""
+    if not spec.strip():
+        return Histogram.DEFAULT_BUCKETS
+    buckets = sorted(float(b) for b in spec.split(",") if b.strip())
+    return (*buckets, INF)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Exposition /metrics. En mode multiprocess (PROMETHEUS_MULTIPROC_DIR), agrège les fichiers
+    de tous les workers ; le répertoire doit être vidé avant le lancement des workers.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+import uuid
+from typing import Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.log import request_id_var
+from app.core.metrics import parse_buckets
+
+access_logger = logging.getLogger("app.access")
+
+# --- Prometheus ---
+# `path` = template de la route ("/orders/{order_id}") : cardinalité bornée
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Total des requêtes HTTP", ["method", "path", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP", ["method", "path"],
+    buckets=parse_buckets(settings.HTTP_LATENCY_BUCKETS),
+)
+# Requêtes sans route (404, scans) : un seul label
+UNMATCHED_PATH = "<unmatched>"
+
+# X-Request-ID fourni par l'appelant (gateway) : repris tel quel s'il est raisonnable
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+def route_template(scope: Scope) -> str:
+    """Template de la route résolue par le routeur (renseigné dans le scope après l'appel)."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # Route Starlette simple (/docs...) : chemin statique, sans paramètre
+    return scope["path"] if "endpoint" in scope else UNMATCHED_PATH
+
+
+def _read_headers(scope: Scope) -> Tuple[Optional[str], str]:
+    """(x-request-id entrant valide ou None, user-agent) en un seul parcours des headers."""
+    request_id, user_agent = None, "-"
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _REQUEST_ID_RE.fullmatch(candidate):
+                request_id = candidate
+        elif name == b"user-agent":
+            user_agent = value.decode("latin-1")
+    return request_id, user_agent
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI pur : request_id, log d'accès et métriques HTTP en une passe.
+    Contrairement à `@app.middleware("http")` (BaseHTTPMiddleware), pas de tâche ni de flux
+    intermédiaire : les réponses streamées (SSE) passent telles quelles, et la durée mesurée
+    couvre tout le corps de la réponse.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        incoming_id, user_agent = _read_headers(scope)
+        request_id = incoming_id or str(uuid.uuid4())
+        # Visible côté routes via request.state.request_id, et dans tous les logs de la requête
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ns = time.perf_counter_ns() - start
+            method, template = scope["method"], route_template(scope)
+            REQUEST_COUNT.labels(method, template, str(status)).inc()
+            REQUEST_LATENCY.labels(method, template).observe(duration_ns / 1e9)
+
+            if access_logger.isEnabledFor(logging.INFO):
+                client = scope.get("client")
+                access_logger.info(
+                    "request",
+                    extra={
+                        "request_id": request_id,
+                        "method": method,
+                        "path": scope["path"],
+                        "client_ip": client[0] if client else "-",
+                        "user_agent": user_agent,
+                        "status": status,
+                        "latency_ms": round(duration_ns / 1e6, 2),
+                    },
+                )
+            request_id_var.reset(token)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from prometheus_client import Counter
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Appels single-flight : exécutés (leader) ou servis par un appel identique en cours (coalesced)",
+    ["name", "result"],
+)
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalescence d'appels identiques concurrents (routes sync, threads du pool) : le premier appel
+    pour une clé s'exécute, ceux qui arrivent pendant qu'il tourne attendent et reçoivent son
+    résultat (ou son exception). Aucun cache : la clé est libérée dès la fin de l'appel.
+    Le résultat partagé doit être immuable (ex: JSON déjà sérialisé).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self._leaders = SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._coalesced = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        assert call is not None
+
+        if not leader:
+            self._coalesced.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+        self._leaders.inc()
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
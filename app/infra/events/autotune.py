@@ -0,0 +1,170 @@
+# app/infra/events/autotune.py (ORDER-API)
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from prometheus_client import Gauge
+
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_PREFETCH = Gauge("events_consumer_prefetch", "Prefetch (QoS) courant du consumer", ["queue"])
+CONSUMER_CONCURRENCY = Gauge("events_consumer_concurrency", "Concurrence courante du consumer", ["queue"])
+DB_POOL_SATURATION = Gauge("db_pool_saturation", "Connexions DB utilisées / capacité du pool")
+
+
+class ConcurrencyLimiter:
+    """Sémaphore dont la limite peut être ajustée à chaud (FIFO pour les attentes)."""
+
+    def __init__(self, limit: int) -> None:
+        self._limit = max(1, limit)
+        self._in_use = 0
+        self._peak = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def take_peak(self) -> int:
+        """Pic d'utilisation depuis le dernier appel."""
+        peak, self._peak = self._peak, self._in_use
+        return peak
+
+    def _grant(self) -> None:
+        self._in_use += 1
+        self._peak = max(self._peak, self._in_use)
+
+    async def acquire(self) -> None:
+        if self._in_use < self._limit and not self._waiters:
+            self._grant()
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self) -> None:
+        self._in_use -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self._limit = max(1, limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_use < self._limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self._grant()
+                fut.set_result(None)
+
+
+def db_pool_saturation(pool=None) -> float:
+    """Part des connexions du pool SQLAlchemy en cours d'utilisation (0 si pool sans capacité fixe)."""
+    pool = pool if pool is not None else engine.pool
+    try:
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return min(1.0, pool.checkedout() / capacity) if capacity > 0 else 0.0
+    except AttributeError:
+        return 0.0
+
+
+class AdaptiveController:
+    """
+    Ajuste concurrence et prefetch du consumer (AIMD, dans les bornes configurées) :
+    - p90 de latence des handlers > cible, ou pool DB saturé → concurrence × 0.7 ;
+    - latence < cible/2, pool DB disponible et tous les slots occupés → concurrence + 1 ;
+    - prefetch = concurrence × prefetch_per_slot.
+    """
+
+    def __init__(
+        self,
+        queue: str,
+        concurrency: int,
+        concurrency_bounds: Tuple[int, int],
+        prefetch_bounds: Tuple[int, int],
+        target_latency_ms: float,
+        interval_s: float = 5.0,
+        prefetch_per_slot: int = 2,
+        pool=None,
+    ) -> None:
+        self.queue = queue
+        self.concurrency_bounds = concurrency_bounds
+        self.prefetch_bounds = prefetch_bounds
+        self.target = target_latency_ms / 1000
+        self.interval_s = interval_s
+        self.prefetch_per_slot = prefetch_per_slot
+        self._pool = pool
+        self._samples: Deque[float] = deque(maxlen=512)
+        self.concurrency = self._clamp(concurrency, concurrency_bounds)
+        self.prefetch = self._prefetch_for(self.concurrency)
+
+    @staticmethod
+    def _clamp(value: int, bounds: Tuple[int, int]) -> int:
+        return max(bounds[0], min(bounds[1], value))
+
+    def _prefetch_for(self, concurrency: int) -> int:
+        return self._clamp(concurrency * self.prefetch_per_slot, self.prefetch_bounds)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def _p90(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def decide(self, busy: bool) -> Tuple[int, int]:
+        """Calcule (concurrence, prefetch) pour la prochaine période."""
+        p90 = self._p90()
+        saturation = db_pool_saturation(self._pool)
+        DB_POOL_SATURATION.set(saturation)
+        self._samples.clear()
+
+        concurrency = self.concurrency
+        if (p90 is not None and p90 > self.target) or saturation >= 0.9:
+            concurrency = int(concurrency * 0.7)
+        elif p90 is not None and p90 < self.target / 2 and saturation < 0.7 and busy:
+            concurrency += 1
+
+        self.concurrency = self._clamp(concurrency, self.concurrency_bounds)
+        self.prefetch = self._prefetch_for(self.concurrency)
+        return self.concurrency, self.prefetch
+
+    async def run(self, channel, limiter: ConcurrencyLimiter) -> None:
+        """Boucle de réglage : applique les nouvelles valeurs (QoS + limiteur) à chaque période."""
+        self._publish()
+        while True:
+            await asyncio.sleep(self.interval_s)
+            old = (self.concurrency, self.prefetch)
+            concurrency, prefetch = self.decide(busy=limiter.take_peak() >= limiter.limit)
+            if (concurrency, prefetch) == old:
+                continue
+            limiter.set_limit(concurrency)
+            if prefetch != old[1]:
+                await channel.set_qos(prefetch_count=prefetch)
+            self._publish()
+            logger.info(
+                "[autotune:%s] concurrency %d→%d, prefetch %d→%d",
+                self.queue, old[0], concurrency, old[1], prefetch,
+            )
+
+    def _publish(self) -> None:
+        CONSUMER_CONCURRENCY.labels(self.queue).set(self.concurrency)
+        CONSUMER_PREFETCH.labels(self.queue).set(self.prefetch)
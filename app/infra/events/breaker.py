@@ -0,0 +1,88 @@
+# app/infra/events/breaker.py (ORDER-API)
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = Gauge(
+    "events_publisher_circuit_state", "État du circuit breaker (0=fermé, 1=ouvert, 2=semi-ouvert)", ["name"]
+)
+
+
+class CircuitBreaker:
+    """
+    Coupe-circuit du publisher :
+    - fermé : tout passe ; `failure_threshold` échecs consécutifs → ouvert ;
+    - ouvert : échec immédiat (pas d'attente réseau) pendant `reset_timeout` secondes ;
+    - semi-ouvert : un seul essai autorisé ; succès → fermé, échec → ouvert à nouveau.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    _GAUGE = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+            self._publish()
+        return self._state
+
+    def allow(self) -> bool:
+        """True si un appel peut être tenté maintenant."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        """Secondes avant le prochain essai possible (0 si fermé ou semi-ouvert)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("[breaker:%s] fermé", self.name)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+        self._publish()
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("[breaker:%s] ouvert (%d échecs)", self.name, self._failures)
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+            self._publish()
+
+    def _publish(self) -> None:
+        CIRCUIT_STATE.labels(self.name).set(self._GAUGE[self._state])
@@ -0,0 +1,202 @@
+# app/infra/events/coalescer.py (ORDER-API)
+"""
+Coalescing des events de statut d'une même commande.
+
+Les services aval envoient souvent `order.confirmed`, `order.rejected`, `customer.delete_order`...
+pour une même commande à quelques ms d'intervalle. Le consumer les
+retient (sans ack) pendant une courte fenêtre par `order_id`, puis rejoue le groupe dans
+l'ordre d'arrivée sur ORDER_TRANSITIONS depuis le statut courant (étapes interdites ignorées) :
+le statut final est celui du traitement un par un. Seul l'event qui y mène est traité, en une
+écriture (ou chaque étape effective si le statut final n'est pas atteignable directement).
+Les events absorbés sont acquittés après ce traitement.
+
+Seuls les events dont l'effet se limite à écraser le statut sont coalesçables : un handler
+avec effet de bord (ex. `order.customer_validated`, qui publie `order.ready_for_stock`) ne
+doit jamais être absorbé. Un event non coalesçable de la même commande (ex.
+`order.price_calculated`) force le traitement du groupe en attente avant lui : l'ordre par
+commande est préservé.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+from app.core.db import SessionLocal
+from app.core.executor import db_executor
+from app.infra.events.rabbitmq import OrderedLanes, process_message
+from app.models.order_models import ORDER_TRANSITIONS, OrderStatus
+from app.repositories.order_repositories import OrderRepository
+
+if TYPE_CHECKING:
+    from app.infra.events.autotune import AdaptiveController
+    from app.infra.events.inbox import Inbox
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COALESCED = Counter(
+    "events_coalesced_total", "Events de statut absorbés par le coalescing", ["routing_key"]
+)
+
+StatusLookup = Callable[[Any], Awaitable[Optional[OrderStatus]]]
+
+
+async def current_status(order_id: Any) -> Optional[OrderStatus]:
+    """Statut en base de la commande (None si introuvable), lu dans l'executor."""
+    def read() -> Optional[OrderStatus]:
+        with SessionLocal() as db:
+            row = OrderRepository(db).status_row(order_id)
+            return row.status if row is not None else None
+
+    return await db_executor.run(read)
+
+
+@dataclass
+class _Group:
+    handler: Callable[[dict, str], Awaitable[None]]
+    inbox: Optional["Inbox"]
+    controller: Optional["AdaptiveController"]
+    entries: List[Tuple[Any, dict, str]] = field(default_factory=list)
+
+
+class StatusCoalescer:
+    """
+    `transitions` : routing_key → statut cible (seuls ces events sont retenus ; handlers sans effet de bord).
+    `lanes` est partagé avec le consumer concurrent pour sérialiser les events d'une commande.
+    `status_of` : statut courant d'une commande, point de départ du rejeu du groupe.
+    """
+
+    def __init__(
+        self,
+        transitions: Dict[str, OrderStatus],
+        window_ms: int = 20,
+        status_of: StatusLookup = current_status,
+    ) -> None:
+        self.transitions = transitions
+        self.window = window_ms / 1000
+        self.status_of = status_of
+        self.lanes = OrderedLanes()
+        self._pending: Dict[Any, _Group] = {}
+        self._timers: Dict[Any, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def order_id_of(payload: Any) -> Any:
+        return payload.get("order_id") if isinstance(payload, dict) else None
+
+    def offer(
+        self,
+        message,
+        payload: dict,
+        handler: Callable[[dict, str], Awaitable[None]],
+        inbox: Optional["Inbox"] = None,
+        controller: Optional["AdaptiveController"] = None,
+    ) -> bool:
+        """Retient le message s'il est coalesçable (True), sinon le laisse au consumer (False)."""
+        rk = message.routing_key or ""
+        order_id = self.order_id_of(payload)
+        if rk not in self.transitions or order_id is None:
+            return False
+
+        group = self._pending.get(order_id)
+        if group is None:
+            group = self._pending[order_id] = _Group(handler, inbox, controller)
+            loop = asyncio.get_running_loop()
+            self._timers[order_id] = loop.call_later(self.window, self._schedule, order_id)
+        group.entries.append((message, payload, rk))
+        return True
+
+    def _schedule(self, order_id: Any) -> Optional[asyncio.Task]:
+        timer = self._timers.pop(order_id, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(order_id, None)
+        if group is None:
+            return None
+        task = asyncio.create_task(self._flush(order_id, group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def flush_soon(self, order_id: Any) -> None:
+        """Déclenche le groupe en attente sans attendre (il prend le verrou de la commande en premier)."""
+        if order_id in self._pending:
+            self._schedule(order_id)
+
+    async def flush(self, order_id: Any) -> None:
+        """Traite le groupe en attente de la commande et attend la fin de tout traitement en cours."""
+        if order_id is None:
+            return
+        task = self._schedule(order_id)
+        if task is not None:
+            await task
+        async with self.lanes.hold(order_id):
+            pass
+
+    def _plan(self, status: Optional[OrderStatus], entries: List[Tuple[Any, dict, str]]) -> List[int]:
+        """Indices des events à traiter pour obtenir le même statut final qu'un traitement un par un."""
+        if status is None:
+            return [len(entries) - 1]  # commande introuvable : chaque handler l'ignore
+        start, steps = status, []
+        for i, (_, _, rk) in enumerate(entries):
+            target = self.transitions[rk]
+            if target in ORDER_TRANSITIONS[status]:
+                status = target
+                steps.append(i)
+        if not steps:
+            return [len(entries) - 1]  # aucune étape permise : statut inchangé
+        return [steps[-1]] if status in ORDER_TRANSITIONS[start] else steps
+
+    async def _flush(self, order_id: Any, group: _Group) -> None:
+        async with self.lanes.hold(order_id):
+            entries = group.entries
+            plan = [0]
+            if len(entries) > 1:
+                try:
+                    plan = self._plan(await self.status_of(order_id), entries)
+                except Exception:
+                    logger.exception("[coalesce] statut de la commande %s illisible : traitement un par un", order_id)
+                    plan = list(range(len(entries)))
+            if len(entries) > 1:
+                logger.info(
+                    "[coalesce] commande %s: %d events → %s",
+                    order_id, len(entries), [entries[i][2] for i in plan],
+                )
+
+            for i in plan:
+                message, payload, _ = entries[i]
+                await process_message(message, group.handler, group.inbox, payload, group.controller)
+
+            seen: List[Tuple[str, str]] = []
+            for i, (other, _, other_rk) in enumerate(entries):
+                if i in plan:
+                    continue
+                EVENTS_COALESCED.labels(other_rk).inc()
+                key = group.inbox.key_for(other, other_rk) if group.inbox is not None else None
+                if key is not None:
+                    seen.append((key, other_rk))
+                try:
+                    await other.ack()
+                except Exception:
+                    logger.exception("[coalesce] ack failed rk=%s", other_rk)
+            if seen:
+                await group.inbox.remember(seen)
+
+    async def drain(self) -> None:
+        """Fin normale de l'itérateur : traite tous les groupes encore retenus."""
+        for order_id in list(self._pending):
+            self._schedule(order_id)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def close(self) -> None:
+        """Arrêt du consumer : les messages retenus (non acquittés) seront redélivrés par le broker."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+        for task in self._tasks:
+            task.cancel()
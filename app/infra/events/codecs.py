@@ -0,0 +1,87 @@
+# app/infra/events/codecs.py (ORDER-API)
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional, Protocol, Union
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class Codec(Protocol):
+    """Contrat de sérialisation des events (négocié via le content_type AMQP)."""
+
+    content_type: str
+
+    def encode(self, message: Any) -> bytes:
+        ...
+
+    def decode(self, body: Buffer) -> Any:
+        ...
+
+
+class JsonCodec:
+    """JSON via orjson : encode directement en bytes, decode sans `.decode('utf-8')` intermédiaire."""
+
+    content_type = "application/json"
+
+    def encode(self, message: Any) -> bytes:
+        return orjson.dumps(message)
+
+    def decode(self, body: Buffer) -> Any:
+        return orjson.loads(body)
+
+
+class MsgpackCodec:
+    """MessagePack (optionnel, nécessite `msgpack`)."""
+
+    content_type = "application/msgpack"
+
+    def __init__(self) -> None:
+        import msgpack  # import paresseux : dépendance optionnelle
+
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def encode(self, message: Any) -> bytes:
+        return self._packb(message, use_bin_type=True)
+
+    def decode(self, body: Buffer) -> Any:
+        return self._unpackb(body, raw=False)
+
+
+JSON = JsonCodec()
+
+# content_type -> codec
+_CODECS: Dict[str, Codec] = {JSON.content_type: JSON}
+
+try:
+    _msgpack = MsgpackCodec()
+    _CODECS[_msgpack.content_type] = _msgpack
+    _CODECS["application/x-msgpack"] = _msgpack
+except ImportError:
+    logger.debug("msgpack non installé: codec application/msgpack indisponible")
+
+_ALIASES = {"json": JSON.content_type, "msgpack": "application/msgpack"}
+
+
+def get_codec(content_type: Optional[str]) -> Codec:
+    """Codec pour un content_type entrant (JSON par défaut si absent ou inconnu)."""
+    if isinstance(content_type, str):
+        codec = _CODECS.get(content_type.split(";", 1)[0].strip().lower())
+        if codec is not None:
+            return codec
+    return JSON
+
+
+def codec_by_name(name: Optional[str]) -> Codec:
+    """Codec de publication depuis la config (`json` | `msgpack`), fallback JSON si indisponible."""
+    content_type = _ALIASES.get((name or "json").lower(), name or "")
+    codec = _CODECS.get(content_type)
+    if codec is None:
+        logger.warning("Codec '%s' indisponible, fallback JSON", name)
+        return JSON
+    return codec
@@ -0,0 +1,187 @@
+# app/infra/events/consumer.py (ORDER-API)
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.infra.events.autotune import AdaptiveController
+from app.infra.events.coalescer import StatusCoalescer
+from app.infra.events.dispatcher import handle_batch, handle_event
+from app.infra.events.inbox import Inbox
+from app.infra.events.notify import notifier
+from app.infra.events.outbox import OutboxRelay
+from app.infra.events.stream import order_stream
+from app.infra.events.waiters import price_waiters
+from app.models.order_models import OrderStatus
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_RESTARTS = Counter(
+    "events_consumer_restarts_total", "Redémarrages du consumer par le superviseur", ["queue"]
+)
+
+QUEUE_NAME = "order-events"
+PATTERNS = ["customer.#", "order.#"]
+
+
+@dataclass(frozen=True)
+class Lane:
+    """Une queue consommée : ses patterns de binding et sa propre QoS / concurrence."""
+
+    name: str
+    patterns: List[str]
+    concurrency: int
+    prefetch: int
+
+
+def parse_lanes(spec: str) -> List[Lane]:
+    """
+    "nom=pattern,pattern[:concurrence[:prefetch]];..." → lanes.
+    Ex: "order-events=order.#:8:32;order-events.customer=customer.#:1:4".
+    Les patterns doivent être disjoints (sinon un event est livré à plusieurs lanes).
+    """
+    lanes: List[Lane] = []
+    for entry in (spec or "").split(";"):
+        name, sep, rest = entry.strip().partition("=")
+        if not sep or not name.strip():
+            continue
+        fields = rest.split(":")
+        patterns = [p.strip() for p in fields[0].split(",") if p.strip()]
+        if not patterns:
+            continue
+        try:
+            concurrency = int(fields[1]) if len(fields) > 1 else settings.EVENTS_CONCURRENCY
+            prefetch = int(fields[2]) if len(fields) > 2 else settings.EVENTS_PREFETCH
+        except ValueError:
+            logger.warning("[consumer] lane invalide ignorée: %s", entry)
+            continue
+        lanes.append(Lane(name.strip(), patterns, max(1, concurrency), max(1, prefetch)))
+    return lanes
+
+
+def consumer_lanes() -> List[Lane]:
+    """Lanes configurées (EVENTS_LANES), sinon la queue unique historique `order-events`."""
+    return parse_lanes(settings.EVENTS_LANES) or [
+        Lane(QUEUE_NAME, PATTERNS, settings.EVENTS_CONCURRENCY, settings.EVENTS_PREFETCH)
+    ]
+
+# Events dont le seul effet est une transition de statut : coalesçables (EVENTS_COALESCE_WINDOW_MS).
+# `order.customer_validated` n'en fait pas partie : il publie `order.ready_for_stock`, perdu s'il était absorbé.
+STATUS_EVENTS = {
+    "order.confirmed": OrderStatus.CONFIRMED,
+    "order.rejected": OrderStatus.REJECTED,
+    "customer.delete_order": OrderStatus.CANCELLED,
+}
+
+
+def consumer_options(lane: Optional[Lane] = None) -> Dict[str, Any]:
+    """Paramètres du consumer d'une lane (`order-events` par défaut), communs à l'API et au worker."""
+    lane = lane or consumer_lanes()[0]
+    return {
+        "queue_name": lane.name,
+        "patterns": lane.patterns,
+        "handler": handle_event,
+        "batch_handler": handle_batch if settings.EVENTS_BATCH_SIZE > 1 else None,
+        "batch_size": settings.EVENTS_BATCH_SIZE,
+        "batch_max_wait_ms": settings.EVENTS_BATCH_MAX_WAIT_MS,
+        "inbox": Inbox(
+            max_size=settings.EVENTS_INBOX_LRU_SIZE,
+            ttl_seconds=settings.EVENTS_INBOX_TTL_SECONDS,
+        ) if settings.EVENTS_INBOX_ENABLED else None,
+        "concurrency": lane.concurrency,
+        "prefetch": lane.prefetch,
+        "max_priority": settings.EVENTS_MAX_PRIORITY,
+        "controller": AdaptiveController(
+            queue=lane.name,
+            concurrency=lane.concurrency,
+            concurrency_bounds=(settings.EVENTS_CONCURRENCY_MIN, settings.EVENTS_CONCURRENCY_MAX),
+            prefetch_bounds=(settings.EVENTS_PREFETCH_MIN, settings.EVENTS_PREFETCH_MAX),
+            target_latency_ms=settings.EVENTS_AUTOTUNE_TARGET_LATENCY_MS,
+            interval_s=settings.EVENTS_AUTOTUNE_INTERVAL_S,
+        ) if settings.EVENTS_AUTOTUNE else None,
+        "coalescer": StatusCoalescer(
+            STATUS_EVENTS, window_ms=settings.EVENTS_COALESCE_WINDOW_MS
+        ) if settings.EVENTS_COALESCE_WINDOW_MS > 0 else None,
+    }
+
+
+async def supervise(
+    factory: Callable[[], Awaitable[None]],
+    name: str,
+    max_backoff: float = 30.0,
+    stable_after: float = 60.0,
+) -> None:
+    """
+    Relance le consumer s'il s'arrête ou plante (backoff exponentiel, remis à zéro
+    après un run stable). Seule une annulation (shutdown) l'arrête.
+    """
+    loop = asyncio.get_running_loop()
+    backoff = 1.0
+    while True:
+        started = loop.time()
+        try:
+            await factory()
+            logger.warning("[consumer:%s] arrêté, redémarrage dans %.1fs", name, backoff)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[consumer:%s] crash, redémarrage dans %.1fs", name, backoff)
+
+        if loop.time() - started >= stable_after:
+            backoff = 1.0
+        CONSUMER_RESTARTS.labels(name).inc()
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, max_backoff)
+
+
+def spawn_lanes(start: Callable[..., Awaitable[None]], broker) -> List[asyncio.Task]:
+    """Un consumer supervisé par lane : `start` = start_consumer, `broker` = broker actif."""
+    tasks: List[asyncio.Task] = []
+    for lane in consumer_lanes():
+        options = consumer_options(lane)
+        tasks.append(asyncio.create_task(
+            supervise(
+                lambda options=options: start(
+                    broker.connection, broker.exchange_name, broker.exchange_type, **options
+                ),
+                name=lane.name,
+            )
+        ))
+        logger.info(
+            "[consumer:%s] lancé (patterns=%s, concurrency=%d, prefetch=%d)",
+            lane.name, ",".join(lane.patterns), lane.concurrency, lane.prefetch,
+        )
+    return tasks
+
+
+def spawn_outbox_relay(broker) -> Optional[asyncio.Task]:
+    """Relai outbox supervisé, si l'outbox est activée et que ce process en porte un."""
+    if not (settings.EVENTS_OUTBOX_ENABLED and settings.EVENTS_OUTBOX_RELAY):
+        return None
+    relay = OutboxRelay(
+        broker,
+        batch_size=settings.EVENTS_OUTBOX_BATCH_SIZE,
+        poll_interval_s=settings.EVENTS_OUTBOX_POLL_MS / 1000,
+    )
+    logger.info("[outbox] relai lancé (batch=%d)", relay.batch_size)
+    return asyncio.create_task(supervise(relay.run, name="outbox"))
+
+
+def spawn_notifier(broker, consume: bool = True) -> Optional[asyncio.Task]:
+    """
+    Notifications inter-process supervisées (réveils wait_for_price, flux SSE) : `consume` côté API,
+    publication seule côté worker. Sans objet avec EVENTS_BROKER=memory (un seul process).
+    """
+    if not settings.EVENTS_NOTIFY_EXCHANGE or (settings.EVENTS_BROKER or "rabbitmq").lower() == "memory":
+        return None
+    price_waiters.attach(notifier)
+    order_stream.attach(notifier)
+    logger.info("[notify] exchange %s (réception=%s)", notifier.exchange_name, consume)
+    return asyncio.create_task(
+        supervise(lambda: notifier.run(broker.connection, consume=consume), name="notify")
+    )
@@ -0,0 +1,103 @@
+# app/infra/events/dispatcher.py (ORDER-API)
+from __future__ import annotations
+
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.db import SessionLocal, engine
+from app.infra.events.contracts import MessagePublisher
+from app.infra.events.handlers import (
+    handle_customer_deleted,
+    handle_customer_update_order,
+    handle_customer_delete_order,
+    handle_order_rejected,
+    handle_order_price_calculated,
+    handle_customer_validated,
+    handle_order_confirmed,
+)
+from app.infra.events.rabbitmq import rabbitmq
+from app.infra.events import postcommit
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict, Session, MessagePublisher], Awaitable[None]]
+
+# routing_key -> handler
+HANDLERS: Dict[str, EventHandler] = {
+    "customer.deleted": handle_customer_deleted,
+    "customer.update_order": handle_customer_update_order,
+    "customer.delete_order": handle_customer_delete_order,
+    "order.rejected": handle_order_rejected,
+    "order.price_calculated": handle_order_price_calculated,
+    "order.confirmed": handle_order_confirmed,
+    "order.customer_validated": handle_customer_validated,
+}
+
+
+async def dispatch(payload: dict, rk: str, db: Session, publisher: MessagePublisher) -> None:
+    """Route un event vers son handler (les events inconnus sont ignorés)."""
+    handler = HANDLERS.get(rk)
+    if handler is None:
+        logger.warning(f"[order-api] event ignoré: {rk}")
+        return
+    await handler(payload, db, publisher)
+
+
+async def handle_event(payload: dict, rk: str) -> None:
+    """Mode unitaire : une session (et un ou plusieurs commits) par event."""
+    logger.info("[order-api] received %s: %s", rk, payload)
+    db = SessionLocal()
+    try:
+        await dispatch(payload, rk, db, rabbitmq)
+    finally:
+        db.close()
+
+
+class _DeferredPublisher:
+    """Publisher tampon : les events ne partent qu'après le COMMIT du lot."""
+
+    def __init__(self) -> None:
+        self.messages: List[Tuple[str, dict]] = []
+
+    async def publish_message(self, routing_key: str, message: dict) -> None:
+        self.messages.append((routing_key, message))
+
+    async def flush(self, publisher: MessagePublisher) -> None:
+        for rk, message in self.messages:
+            await publisher.publish_message(rk, message)
+        self.messages.clear()
+
+
+async def handle_batch(events: List[Tuple[dict, str]]) -> None:
+    """
+    Mode micro-batch : tous les events du lot dans une seule transaction DB.
+    - chaque event a sa propre Session liée à la connexion partagée, en mode SAVEPOINT :
+      le commit() d'un handler ne fait qu'un RELEASE, un échec revient au SAVEPOINT ;
+    - une erreur inattendue propagée par le handler annule son SAVEPOINT courant ainsi que ses
+      publications et notifications différées ; le reste du lot continue (les erreurs attendues,
+      commande introuvable ou transition refusée, sont traitées par le handler lui-même) ;
+    - les publications et les notifications in-process (postcommit) sont différées jusqu'au COMMIT du lot ;
+    - si le COMMIT échoue, l'exception remonte et le consumer rejette (requeue) tout le lot.
+    """
+    deferred = _DeferredPublisher()
+
+    with postcommit.deferred() as callbacks, engine.connect() as conn:
+        with conn.begin():
+            for payload, rk in events:
+                mark, callbacks_mark = len(deferred.messages), len(callbacks)
+                db = SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
+                try:
+                    await dispatch(payload, rk, db, deferred)
+                except Exception:
+                    # Le SAVEPOINT de cet event est annulé par close(), le reste du lot continue
+                    del deferred.messages[mark:]
+                    del callbacks[callbacks_mark:]
+                    logger.exception("[order-api] batch: handler error rk=%s", rk)
+                finally:
+                    db.close()
+
+    logger.info("[order-api] batch committed (%d events)", len(events))
+    postcommit.run(callbacks)
+    await deferred.flush(rabbitmq)
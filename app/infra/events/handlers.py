@@ -1,13 +1,42 @@
 # app/infra/events/handlers.py (ORDER-API)
 
 import logging
+from typing import Optional
 from sqlalchemy.orm import Session
-from app.services.order_services import OrderService, NotFoundError
-from app.models.order_models import OrderStatus
+from app.core.executor import db_executor
+from app.infra.events.stream import order_stream
+from app.infra.events.waiters import price_waiters
+from app.services.order_services import InvalidTransitionError, OrderService, NotFoundError
+from app.models.order_models import Order, OrderStatus
 from app.repositories.order_repositories import OrderRepository
 
 logger = logging.getLogger(__name__)
 
+# Le travail SQLAlchemy (synchrone) passe par `db_executor` ; les publications restent sur la boucle.
+# Les erreurs attendues (introuvable, transition refusée) sont journalisées ici ; les autres sont
+# journalisées puis propagées : en micro-batch, handle_batch annule le SAVEPOINT de l'event et ses publications.
+
+
+def _priced_items(order: Order) -> list[dict]:
+    return [
+        {
+            "product_id": it.product_id,
+            "quantity": it.quantity,
+            "unit_price": it.unit_price,
+        }
+        for it in order.items
+    ]
+
+
+def _stock_request(order: Order, customer_id) -> dict:
+    """Payload `order.ready_for_stock` en valeurs simples (lu dans l'executor : pas de lazy-load sur la boucle)."""
+    return {
+        "order_id": order.id,
+        "customer_id": customer_id,
+        "items": _priced_items(order),
+        "total": order.total,
+    }
+
 
 # ----- CUSTOMER VALIDATED -----
 async def handle_customer_validated(payload: dict, db: Session, publisher):
@@ -19,37 +48,28 @@ async def handle_customer_validated(payload: dict, db: Session, publisher):
         return
 
     repo = OrderRepository(db)
-    service = OrderService(repo, publisher)
+    service = OrderService(repo, publisher, executor=db_executor)
 
     try:
-        order = repo.get(order_id)
+        order = await db_executor.run(repo.get, order_id)
         if not order:
             logger.warning(f"[order.customer_validated] commande {order_id} introuvable en base")
             return
 
         await service.update_order_status(order_id, OrderStatus.PENDING, publish=False)
 
-        items = [
-            {
-                "product_id": it.product_id,
-                "quantity": it.quantity,
-                "unit_price": it.unit_price,
-            }
-            for it in order.items
-        ]
-        await publisher.publish_message("order.ready_for_stock", {
-            "order_id": order.id,
-            "customer_id": customer_id,
-            "items": items,
-            "total": order.total,
-        })
+        message = await db_executor.run(_stock_request, order, customer_id)
+        await publisher.publish_message("order.ready_for_stock", message)
 
         logger.info(f"[order.customer_validated] commande {order_id} validée et envoyée à product-api")
 
     except NotFoundError:
         logger.warning(f"[order.customer_validated] commande {order_id} introuvable")
+    except InvalidTransitionError as e:
+        logger.warning(f"[order.customer_validated] commande {order_id} ignorée : {e}")
     except Exception as e:
         logger.error(f"[order.customer_validated] erreur inattendue: {e}")
+        raise
 
 
 # ----- ORDER CONFIRMED (stock OK) -----
@@ -59,15 +79,18 @@ async def handle_order_confirmed(payload: dict, db: Session, publisher):
         logger.warning("[order.confirmed] payload sans id → ignoré")
         return
 
-    service = OrderService(OrderRepository(db), publisher)
+    service = OrderService(OrderRepository(db), publisher, executor=db_executor)
 
     try:
         await service.update_order_status(order_id, OrderStatus.CONFIRMED, publish=False)
         logger.info(f"[order.confirmed] commande {order_id} confirmée (stock réservé)")
     except NotFoundError:
         logger.warning(f"[order.confirmed] commande {order_id} introuvable")
+    except InvalidTransitionError as e:
+        logger.warning(f"[order.confirmed] commande {order_id} ignorée : {e}")
     except Exception as e:
         logger.error(f"[order.confirmed] erreur inattendue: {e}")
+        raise
 
 
 # ----- ORDER REJECTED -----
@@ -79,18 +102,26 @@ async def handle_order_rejected(payload: dict, db: Session, publisher):
         logger.warning("[order.rejected] payload sans id → ignoré")
         return
 
-    service = OrderService(OrderRepository(db), publisher)
+    service = OrderService(OrderRepository(db), publisher, executor=db_executor)
 
     try:
         await service.update_order_status(order_id, OrderStatus.REJECTED, publish=False)
         logger.warning(f"[order.rejected] commande {order_id} rejetée : {reason}")
     except NotFoundError:
         logger.warning(f"[order.rejected] commande {order_id} introuvable")
+    except InvalidTransitionError as e:
+        logger.warning(f"[order.rejected] commande {order_id} ignorée : {e}")
     except Exception as e:
         logger.error(f"[order.rejected] erreur inattendue: {e}")
+        raise
 
 
 # ----- CUSTOMER DELETED -----
+def _customer_order_ids(repo: OrderRepository, customer_id) -> list[int]:
+    """Ids en entiers (lus dans l'executor) : les commits suivants expirent les objets ORM."""
+    return [order.id for order in repo.list(filters={"customer_id": customer_id})]
+
+
 async def handle_customer_deleted(payload: dict, db: Session, publisher):
     customer_id = payload.get("id")
     if not customer_id:
@@ -98,20 +129,23 @@ async def handle_customer_deleted(payload: dict, db: Session, publisher):
         return
 
     repo = OrderRepository(db)
-    service = OrderService(repo, publisher)
+    service = OrderService(repo, publisher, executor=db_executor)
 
     try:
-        orders = repo.list(filters={"customer_id": customer_id})
-        logger.info(f"[customer.deleted] {len(orders)} commandes trouvées pour customer {customer_id}")
+        order_ids = await db_executor.run(_customer_order_ids, repo, customer_id)
+        logger.info(f"[customer.deleted] {len(order_ids)} commandes trouvées pour customer {customer_id}")
 
-        for order in orders:
+        for order_id in order_ids:
             try:
-                await service.update_order_status(order.id, OrderStatus.CANCELLED, publish=False)
-                logger.info(f"[customer.deleted] commande {order.id} annulée")
+                await service.update_order_status(order_id, OrderStatus.CANCELLED, publish=False)
+                logger.info(f"[customer.deleted] commande {order_id} annulée")
             except NotFoundError:
-                logger.warning(f"[customer.deleted] commande {order.id} déjà supprimée ou introuvable")
+                logger.warning(f"[customer.deleted] commande {order_id} déjà supprimée ou introuvable")
+            except InvalidTransitionError as e:
+                logger.info(f"[customer.deleted] commande {order_id} conservée : {e}")
     except Exception as e:
         logger.error(f"[customer.deleted] erreur inattendue: {e}")
+        raise
 
 
 # ----- CUSTOMER UPDATE ORDER -----
@@ -123,7 +157,7 @@ async def handle_customer_update_order(payload: dict, db: Session, publisher):
         logger.warning("[customer.update_order] payload invalide")
         return
 
-    service = OrderService(OrderRepository(db), publisher)
+    service = OrderService(OrderRepository(db), publisher, executor=db_executor)
 
     try:
         await service.update_order_items(order_id, items)
@@ -132,6 +166,7 @@ async def handle_customer_update_order(payload: dict, db: Session, publisher):
         logger.warning(f"[customer.update_order] commande {order_id} introuvable")
     except Exception as e:
         logger.error(f"[customer.update_order] erreur inattendue: {e}")
+        raise
 
 
 # ----- CUSTOMER DELETE ORDER -----
@@ -142,20 +177,49 @@ async def handle_customer_delete_order(payload: dict, db: Session, publisher):
         return
 
     repo = OrderRepository(db)
-    service = OrderService(repo, publisher)
+    service = OrderService(repo, publisher, executor=db_executor)
     try:
         await service.update_order_status(order_id, OrderStatus.CANCELLED, publish=False)
         logger.info(f"[customer.delete_order] commande {order_id} annulée")
     except NotFoundError:
         logger.warning(f"[customer.delete_order] commande {order_id} introuvable")
+    except InvalidTransitionError as e:
+        logger.warning(f"[customer.delete_order] commande {order_id} non annulable : {e}")
     except Exception as e:
         logger.error(f"[customer.delete_order] erreur inattendue: {e}")
+        raise
 
 
 # ----- ORDER PRICE CALCULATED -----
-async def handle_order_price_calculated(payload: dict, db: Session, publisher):
+def _apply_prices(db: Session, order_id: int, items: list[dict], total: float) -> Optional[Order]:
+    """Partie DB synchrone : remplace les items par les lignes chiffrées et met à jour le total."""
     from app.models.order_models import OrderItem
 
+    repo = OrderRepository(db)
+    order = repo.get(order_id)
+    if not order:
+        return None
+
+    order.total = total
+    order.items.clear()
+    for it in items:
+        order.items.append(
+            OrderItem(
+                product_id=it["product_id"],
+                quantity=it["quantity"],
+                unit_price=it["unit_price"],
+                line_total=it["unit_price"] * it["quantity"],
+                total=it["unit_price"] * it["quantity"],
+                order=order,
+            )
+        )
+
+    db.commit()
+    db.refresh(order)
+    return order
+
+
+async def handle_order_price_calculated(payload: dict, db: Session, publisher):
     order_id = payload.get("order_id")
     customer_id = payload.get("customer_id")
     items = payload.get("items", [])
@@ -166,29 +230,14 @@ async def handle_order_price_calculated(payload: dict, db: Session, publisher):
         return
 
     try:
-        repo = OrderRepository(db)
-        order = repo.get(order_id)
+        order = await db_executor.run(_apply_prices, db, order_id, items, total)
         if not order:
             logger.warning(f"[order.price_calculated] commande {order_id} introuvable en base")
             return
 
-        order.total = total
-        order.items.clear()
-        for it in items:
-            order.items.append(
-                OrderItem(
-                    product_id=it["product_id"],
-                    quantity=it["quantity"],
-                    unit_price=it["unit_price"],
-                    line_total=it["unit_price"] * it["quantity"],
-                    total=it["unit_price"] * it["quantity"],
-                    order=order,
-                )
-            )
-
-        db.commit()
-        db.refresh(order)
         logger.info(f"[order.price_calculated] commande {order.id} mise à jour (total={order.total})")
+        price_waiters.resolve(order.id)
+        order_stream.publish_order("priced", order)
 
         await publisher.publish_message("order.created", {
             "order_id": order.id,
@@ -198,3 +247,4 @@ async def handle_order_price_calculated(payload: dict, db: Session, publisher):
         })
     except Exception as e:
         logger.error(f"[order.price_calculated] erreur inattendue: {e}")
+        raise
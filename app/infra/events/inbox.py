@@ -0,0 +1,134 @@
+# app/infra/events/inbox.py (ORDER-API)
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.db import SessionLocal
+from app.core.executor import DbExecutor, db_executor
+from app.models.event_models import ProcessedEvent, _utcnow
+
+logger = logging.getLogger(__name__)
+
+EVENTS_DUPLICATES = Counter(
+    "events_duplicates_total", "Events redélivrés ignorés par l'inbox", ["routing_key"]
+)
+
+
+class Inbox:
+    """
+    Déduplication des events entrants (livraison at-least-once).
+    - clé = message_id AMQP ; un message sans message_id n'est pas dédupliqué (deux events
+      identiques légitimes, ex: items A → B → A, ne doivent pas être confondus) ;
+    - LRU mémoire bornée devant la table `processed_events` (TTL, purge périodique) ;
+    - LRU sur la boucle, requêtes sur la table dans `executor` (pas de DB sur la boucle).
+    Un doublon est détecté sans jamais toucher à la table `orders`.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_size: int = 10_000,
+        ttl_seconds: int = 86_400,
+        purge_interval_seconds: int = 300,
+        executor: DbExecutor = db_executor,
+    ) -> None:
+        self._session_factory = session_factory
+        self._executor = executor
+        self._max_size = max_size
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._purge_interval = purge_interval_seconds
+        self._next_purge = time.monotonic() + purge_interval_seconds
+        self._lru: OrderedDict[str, None] = OrderedDict()
+
+    @staticmethod
+    def key_for(message, rk: str) -> Optional[str]:
+        """message_id AMQP, ou None (message non dédupliqué)."""
+        message_id = getattr(message, "message_id", None)
+        if isinstance(message_id, str) and message_id:
+            return message_id[:64]
+        return None
+
+    def _touch(self, key: str) -> None:
+        self._lru[key] = None
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._max_size:
+            self._lru.popitem(last=False)
+
+    async def is_duplicate(self, key: str, rk: str = "") -> bool:
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            EVENTS_DUPLICATES.labels(rk).inc()
+            return True
+
+        if await self._executor.run(self._lookup, key):
+            self._touch(key)
+            EVENTS_DUPLICATES.labels(rk).inc()
+            return True
+        return False
+
+    def _lookup(self, key: str) -> bool:
+        db = self._session_factory()
+        try:
+            return db.execute(
+                select(ProcessedEvent.event_id).where(ProcessedEvent.event_id == key)
+            ).first() is not None
+        finally:
+            db.close()
+
+    async def remember(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """Enregistre (clé, routing_key) comme traités : LRU + table, un seul commit."""
+        entries = [(k, rk) for k, rk in entries if k not in self._lru]
+        if not entries:
+            return
+
+        await self._executor.run(self._insert, entries)
+        for k, _ in entries:
+            self._touch(k)
+
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self._purge_interval
+            await self._executor.run(self.purge_expired)
+
+    def _insert(self, entries: List[Tuple[str, str]]) -> None:
+        db = self._session_factory()
+        try:
+            db.add_all([ProcessedEvent(event_id=k, routing_key=rk) for k, rk in entries])
+            db.commit()
+        except IntegrityError:
+            # Une clé déjà enregistrée par un autre consumer : on repasse une par une
+            db.rollback()
+            for k, rk in entries:
+                try:
+                    db.add(ProcessedEvent(event_id=k, routing_key=rk))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées plus vieilles que le TTL."""
+        self._next_purge = time.monotonic() + self._purge_interval
+        db = self._session_factory()
+        try:
+            result = db.execute(
+                delete(ProcessedEvent).where(ProcessedEvent.processed_at < _utcnow() - self._ttl)
+            )
+            db.commit()
+            if result.rowcount:
+                logger.info("[inbox] %d events expirés purgés", result.rowcount)
+            return result.rowcount or 0
+        except Exception:
+            db.rollback()
+            logger.exception("[inbox] purge failed")
+            return 0
+        finally:
+            db.close()
@@ -0,0 +1,340 @@
+# app/infra/events/memory.py (ORDER-API)
+"""
+Broker en mémoire (in-process) : remplaçant de RabbitMQ pour les tests de charge / CI.
+
+Reproduit la surface aio_pika utilisée par `start_consumer` (channel, set_qos, declare_queue,
+bind, iterator, message.process/ack/nack) afin que le même pipeline (codecs, inbox,
+micro-batching, concurrence) tourne sans réseau :
+- exchange topic (`*` = un mot, `#` = zéro ou plusieurs mots) ou fanout ;
+- prefetch par channel, ack/nack/reject (multiple), redelivery avec `redelivered=True` ;
+- priorités des messages si la queue est déclarée avec `x-max-priority` ;
+- les messages non acquittés sont remis en file à la fermeture du consumer.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from app.infra.events.codecs import Codec, JSON
+
+logger = logging.getLogger(__name__)
+
+
+def _match_words(pattern: tuple, words: tuple) -> bool:
+    if not pattern:
+        return not words
+    head, rest = pattern[0], pattern[1:]
+    if head == "#":
+        return any(_match_words(rest, words[i:]) for i in range(len(words) + 1))
+    if not words:
+        return False
+    return (head == "*" or head == words[0]) and _match_words(rest, words[1:])
+
+
+@lru_cache(maxsize=4096)
+def topic_matches(pattern: str, routing_key: str) -> bool:
+    """Sémantique des bindings d'un exchange topic AMQP (`*` = un mot, `#` = zéro ou plusieurs)."""
+    return _match_words(tuple(pattern.split(".")), tuple(routing_key.split(".")))
+
+
+class InMemoryMessage:
+    """Message livré (équivalent d'aio_pika.IncomingMessage)."""
+
+    def __init__(
+        self,
+        queue: "InMemoryQueue",
+        body: bytes,
+        routing_key: str,
+        content_type: str,
+        message_id: str,
+        priority: int = 0,
+        headers: Optional[dict] = None,
+    ) -> None:
+        self._queue = queue
+        self.body = body
+        self.routing_key = routing_key
+        self.content_type = content_type
+        self.message_id = message_id
+        self.priority = priority
+        self.headers = headers or {}
+        self.redelivered = False
+        self.delivery_tag: Optional[int] = None
+        self.processed = False
+
+    async def ack(self, multiple: bool = False) -> None:
+        await self._queue._settle(self, multiple, requeue=None)
+
+    async def nack(self, multiple: bool = False, requeue: bool = True) -> None:
+        await self._queue._settle(self, multiple, requeue=requeue)
+
+    async def reject(self, requeue: bool = False) -> None:
+        await self._queue._settle(self, False, requeue=requeue)
+
+    def process(self, requeue: bool = False) -> "_ProcessContext":
+        return _ProcessContext(self, requeue)
+
+
+class _ProcessContext:
+    """Comme aio_pika : ack en sortie normale, reject en cas d'exception (propagée)."""
+
+    def __init__(self, message: InMemoryMessage, requeue: bool) -> None:
+        self._message = message
+        self._requeue = requeue
+
+    async def __aenter__(self) -> InMemoryMessage:
+        return self._message
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self._message.processed:
+            return False
+        if exc_type is None:
+            await self._message.ack()
+        else:
+            await self._message.reject(requeue=self._requeue)
+        return False
+
+
+class InMemoryQueue:
+    def __init__(self, broker: "InMemoryBroker", name: str) -> None:
+        self._broker = broker
+        self.name = name
+        self.max_priority = 0
+        self.bindings: List[str] = []
+        self._ready: Deque[InMemoryMessage] = deque()
+        self._unacked: Dict[int, InMemoryMessage] = {}
+        self._cond = asyncio.Condition()
+
+    @property
+    def depth(self) -> int:
+        return len(self._ready)
+
+    async def bind(self, exchange, routing_key: str = "") -> None:
+        self.bindings.append(routing_key)
+
+    def matches(self, routing_key: str, fanout: bool) -> bool:
+        return fanout or any(topic_matches(p, routing_key) for p in self.bindings)
+
+    async def _put(self, message: InMemoryMessage) -> None:
+        async with self._cond:
+            priority = min(message.priority, self.max_priority)
+            if priority:
+                # Devant le premier message de priorité inférieure (FIFO à priorité égale)
+                index = next(
+                    (i for i, m in enumerate(self._ready) if min(m.priority, self.max_priority) < priority),
+                    len(self._ready),
+                )
+                self._ready.insert(index, message)
+            else:
+                self._ready.append(message)
+            self._cond.notify_all()
+
+    async def _settle(self, message: InMemoryMessage, multiple: bool, requeue: Optional[bool]) -> None:
+        """requeue=None : ack ; True : remise en tête de file ; False : abandon."""
+        async with self._cond:
+            if message.processed:
+                raise RuntimeError(f"message {message.delivery_tag} already processed")
+            tag = message.delivery_tag
+            targets = (
+                [m for t, m in sorted(self._unacked.items()) if t <= tag]
+                if multiple else [message]
+            )
+            for m in targets:
+                self._unacked.pop(m.delivery_tag, None)
+                m.processed = True
+            if requeue:
+                for m in reversed(targets):
+                    self._ready.appendleft(self._redelivery(m))
+            self._cond.notify_all()
+
+    @staticmethod
+    def _redelivery(message: InMemoryMessage) -> InMemoryMessage:
+        copy = InMemoryMessage(
+            message._queue, message.body, message.routing_key,
+            message.content_type, message.message_id, message.priority, message.headers,
+        )
+        copy.redelivered = True
+        return copy
+
+    def iterator(self, prefetch: Callable[[], int] = lambda: 0) -> "_QueueIterator":
+        return _QueueIterator(self, prefetch)
+
+
+class _QueueIterator:
+    def __init__(self, queue: InMemoryQueue, prefetch: Callable[[], int]) -> None:
+        self._queue = queue
+        # Lu à chaque livraison : un set_qos() en cours de route s'applique immédiatement
+        self._prefetch = prefetch
+        self._delivered: Dict[int, InMemoryMessage] = {}
+
+    async def __aenter__(self) -> "_QueueIterator":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        # Fermeture du consumer : les messages non acquittés repartent en file
+        pending = [m for m in self._delivered.values() if not m.processed]
+        for m in reversed(pending):
+            await m.nack(requeue=True)
+        return False
+
+    def __aiter__(self) -> "_QueueIterator":
+        return self
+
+    def _can_deliver(self) -> bool:
+        if self._queue._broker.closed:
+            return True
+        prefetch = self._prefetch()
+        in_flight = sum(1 for m in self._delivered.values() if not m.processed)
+        return bool(self._queue._ready) and (not prefetch or in_flight < prefetch)
+
+    async def __anext__(self) -> InMemoryMessage:
+        q = self._queue
+        async with q._cond:
+            await q._cond.wait_for(self._can_deliver)
+            if q._broker.closed:
+                raise StopAsyncIteration
+            message = q._ready.popleft()
+            message.delivery_tag = next(q._broker._tags)
+            q._unacked[message.delivery_tag] = message
+            # Oublie les messages déjà réglés (évite une croissance non bornée)
+            for tag in [t for t, m in self._delivered.items() if m.processed]:
+                del self._delivered[tag]
+            self._delivered[message.delivery_tag] = message
+            return message
+
+
+class InMemoryChannel:
+    def __init__(self, broker: "InMemoryBroker") -> None:
+        self._broker = broker
+        self.prefetch_count = 0
+        self.is_closed = False
+
+    async def set_qos(self, prefetch_count: int = 0, **kwargs) -> None:
+        self.prefetch_count = prefetch_count
+
+    async def declare_queue(self, name: str, arguments: Optional[dict] = None, **kwargs) -> "_ChannelQueue":
+        queue = self._broker._declare(name)
+        queue.max_priority = (arguments or {}).get("x-max-priority", queue.max_priority)
+        return _ChannelQueue(self, queue)
+
+    async def declare_exchange(self, name: str, *args, **kwargs) -> str:
+        return name
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class _ChannelQueue:
+    """Vue d'une queue depuis un channel (le prefetch est celui du channel)."""
+
+    def __init__(self, channel: InMemoryChannel, queue: InMemoryQueue) -> None:
+        self._channel = channel
+        self._queue = queue
+        self.name = queue.name
+
+    async def bind(self, exchange, routing_key: str = "") -> None:
+        await self._queue.bind(exchange, routing_key)
+
+    def iterator(self) -> _QueueIterator:
+        return self._queue.iterator(lambda: self._channel.prefetch_count)
+
+
+class InMemoryBroker:
+    """
+    Implémente MessagePublisher / MessageConsumer sans réseau.
+    Même interface que `RabbitMQ` (connect, disconnect, publish_message, connection,
+    exchange_name, exchange_type) : sélection via EVENTS_BROKER=memory.
+    """
+
+    def __init__(
+        self,
+        exchange_name: str = "events",
+        exchange_type: str = "topic",
+        codec: Codec = JSON,
+        priorities: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.exchange_name = exchange_name
+        self.exchange_type = exchange_type
+        self.codec = codec
+        self.priorities = priorities or {}
+        self.connection: Optional["InMemoryBroker"] = None
+        self.exchange: Optional[str] = None
+        self.closed = False
+        self.is_closed = True
+        self._queues: Dict[str, InMemoryQueue] = {}
+        self._tags = itertools.count(1)
+
+    # ---------- cycle de vie (API RabbitMQ) ----------
+    async def connect(self) -> None:
+        self.closed = False
+        self.is_closed = False
+        self.connection = self
+        self.exchange = self.exchange_name
+        logger.info("In-memory broker ready. Exchange '%s' (%s).", self.exchange_name, self.exchange_type)
+
+    async def disconnect(self) -> None:
+        self.closed = True
+        self.is_closed = True
+        for q in self._queues.values():
+            async with q._cond:
+                q._cond.notify_all()
+
+    async def channel(self) -> InMemoryChannel:
+        return InMemoryChannel(self)
+
+    def _declare(self, name: str) -> InMemoryQueue:
+        if name not in self._queues:
+            self._queues[name] = InMemoryQueue(self, name)
+        return self._queues[name]
+
+    def queue(self, name: str) -> InMemoryQueue:
+        return self._declare(name)
+
+    # ---------- MessagePublisher ----------
+    async def publish_message(self, routing_key: str, message: dict) -> None:
+        if self.exchange is None:
+            logger.error("Cannot publish: exchange is not available (connect() not called).")
+            return
+        await self._route(routing_key, message, uuid.uuid4().hex)
+
+    async def publish_confirmed(self, routing_key: str, message: dict, message_id: Optional[str] = None) -> None:
+        if self.exchange is None:
+            raise ConnectionError("exchange is not available")
+        await self._route(routing_key, message, message_id or uuid.uuid4().hex)
+
+    async def _route(self, routing_key: str, message: dict, message_id: str) -> None:
+        from app.infra.events.rabbitmq import PUBLISHED_AT_HEADER
+
+        fanout = self.exchange_type == "fanout"
+        body = self.codec.encode(message)
+        priority = self.priorities.get(routing_key, 0)
+        headers = {PUBLISHED_AT_HEADER: int(time.time() * 1000)}
+        for q in self._queues.values():
+            if q.matches(routing_key, fanout):
+                await q._put(InMemoryMessage(
+                    q, body, routing_key, self.codec.content_type, message_id, priority, headers,
+                ))
+        logger.debug("Published rk=%s, payload=%s", routing_key, message)
+
+    # ---------- MessageConsumer ----------
+    async def start_consumer(
+        self,
+        connection,
+        exchange,
+        exchange_type,
+        *,
+        queue_name: str,
+        patterns: Iterable[str],
+        handler: Callable[[dict, str], Awaitable[None]],
+        **options,
+    ) -> None:
+        from app.infra.events.rabbitmq import start_consumer
+
+        await start_consumer(
+            connection or self, exchange, exchange_type, queue_name, patterns, handler, **options
+        )
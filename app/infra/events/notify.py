@@ -0,0 +1,118 @@
+# app/infra/events/notify.py (ORDER-API)
+"""
+Notifications in-process partagées entre process (workers API préforkés, worker d'events).
+
+Un réveil `wait_for_price` ou un changement diffusé en SSE doit atteindre la requête quel que
+soit le process qui consomme l'event ou modifie la commande. Chaque process publie ses notifications sur un exchange fanout dédié
+(EVENTS_NOTIFY_EXCHANGE, non durable, hors exchange métier) et, côté API, les reçoit sur une
+queue exclusive auto-delete qui lui est propre. Les notifications émises par le process lui-même
+sont ignorées à la réception (déjà appliquées localement).
+Best effort : une notification perdue (broker indisponible) retombe sur le délai de l'appelant.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from functools import partial
+from typing import Any, Callable, Dict, Set
+
+import orjson
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = Counter(
+    "events_notifications_total", "Notifications inter-process", ["kind", "direction"]
+)
+
+ORIGIN_HEADER = "x-origin"
+
+Deliver = Callable[[dict], None]
+
+
+class Notifier:
+    def __init__(self, exchange_name: str) -> None:
+        self.exchange_name = exchange_name
+        self.origin = uuid.uuid4().hex
+        self.exchange = None
+        self._handlers: Dict[str, Deliver] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, kind: str, deliver: Deliver) -> Callable[[dict], None]:
+        """`deliver` reçoit les notifications `kind` des autres process ; retourne la fonction d'envoi."""
+        self._handlers[kind] = deliver
+        return partial(self.send, kind)
+
+    def send(self, kind: str, data: dict) -> None:
+        """Diffuse sans attendre (no-op tant que l'exchange n'est pas déclaré)."""
+        if self.exchange is None:
+            return
+        task = asyncio.create_task(self._publish(kind, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, kind: str, data: dict) -> None:
+        import aio_pika  # déjà chargé par la connexion du broker
+
+        try:
+            await self.exchange.publish(
+                aio_pika.Message(
+                    body=orjson.dumps({"kind": kind, "data": data}),
+                    content_type="application/json",
+                    delivery_mode=aio_pika.DeliveryMode.NOT_PERSISTENT,
+                    headers={ORIGIN_HEADER: self.origin},
+                ),
+                routing_key="",
+            )
+            NOTIFICATIONS.labels(kind, "sent").inc()
+        except Exception as e:
+            logger.warning("[notify] publication impossible kind=%s: %s", kind, e)
+
+    def deliver(self, message: Any) -> None:
+        """Applique une notification reçue (ignorée si elle vient de ce process)."""
+        headers = getattr(message, "headers", None) or {}
+        if headers.get(ORIGIN_HEADER) == self.origin:
+            return
+        try:
+            notification = orjson.loads(message.body)
+            handler = self._handlers.get(notification["kind"])
+        except Exception:
+            logger.warning("[notify] notification illisible ignorée")
+            return
+        if handler is None:
+            return
+        NOTIFICATIONS.labels(notification["kind"], "received").inc()
+        try:
+            handler(notification["data"])
+        except Exception:
+            logger.exception("[notify] échec de la notification kind=%s", notification["kind"])
+
+    async def run(self, connection, consume: bool = True) -> None:
+        """
+        Déclare l'exchange et, avec `consume`, consomme la queue exclusive du process.
+        Sans `consume` (worker) : publication seule, jusqu'à l'annulation.
+        """
+        channel = await connection.channel()
+        try:
+            self.exchange = await channel.declare_exchange(self.exchange_name, "fanout", durable=False)
+            if not consume:
+                await asyncio.Event().wait()
+            queue = await channel.declare_queue("", exclusive=True, auto_delete=True)
+            await queue.bind(self.exchange)
+            logger.info("[notify] queue %s liée à %s", queue.name, self.exchange_name)
+            async with queue.iterator(no_ack=True) as it:
+                async for message in it:
+                    self.deliver(message)
+        finally:
+            self.exchange = None
+            try:
+                await channel.close()
+            except Exception:
+                pass
+
+
+# Notifier du process (EVENTS_NOTIFY_EXCHANGE vide : désactivé)
+notifier = Notifier(settings.EVENTS_NOTIFY_EXCHANGE)
@@ -0,0 +1,120 @@
+# app/infra/events/outbox.py (ORDER-API)
+"""
+Transactional outbox.
+
+Les services écrivent leurs events dans la table `outbox` dans la même transaction que la
+modification de la commande (`stage`), puis rendent la main dès le COMMIT. Le relai lit la
+table par lots (`FOR UPDATE SKIP LOCKED` sur Postgres : plusieurs relais possibles), publie
+avec confirms et supprime les lignes confirmées. Livraison au-moins-une-fois : le
+`message_id` est conservé pour la déduplication côté consumers (inbox).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Iterable, List, Set, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.db import SessionLocal
+from app.core.executor import DbExecutor, db_executor
+from app.models.event_models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_RELAYED = Counter("events_outbox_relayed_total", "Events de l'outbox publiés (confirmés)")
+OUTBOX_FAILED = Counter("events_outbox_publish_failures_total", "Échecs de publication du relai outbox")
+
+_relays: Set["OutboxRelay"] = set()
+
+
+def stage(db: Session, events: Iterable[Tuple[str, dict]]) -> None:
+    """Ajoute les events à la transaction en cours (ils partent au COMMIT de l'appelant)."""
+    for routing_key, message in events:
+        db.add(OutboxEvent(routing_key=routing_key, message_id=uuid.uuid4().hex, payload=message))
+
+
+def notify() -> None:
+    """Réveille les relais du process après un COMMIT (sinon ils attendent le prochain poll)."""
+    for relay in _relays:
+        relay.wakeup.set()
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        publisher,
+        session_factory=SessionLocal,
+        executor: DbExecutor = db_executor,
+        batch_size: int = 100,
+        poll_interval_s: float = 0.2,
+    ) -> None:
+        # `publisher.publish_confirmed` doit lever si le broker n'a pas confirmé
+        self.publisher = publisher
+        self.session_factory = session_factory
+        self.executor = executor
+        self.batch_size = batch_size
+        self.poll_interval_s = poll_interval_s
+        self.wakeup = asyncio.Event()
+
+    def _claim(self, db: Session) -> List[OutboxEvent]:
+        stmt = (
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        return list(db.execute(stmt).scalars())
+
+    @staticmethod
+    def _finish(db: Session, ids: List[int]) -> None:
+        if ids:
+            db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        db.commit()
+
+    async def relay_once(self) -> int:
+        """Publie un lot ; les lignes restent verrouillées jusqu'au COMMIT. Retourne le nombre publié."""
+        db = self.session_factory()
+        try:
+            rows = await self.executor.run(self._claim, db)
+            if not rows:
+                await self.executor.run(db.rollback)
+                return 0
+
+            # Les publications partent dans l'ordre, les confirms sont attendus ensemble
+            results = await asyncio.gather(
+                *(self.publisher.publish_confirmed(r.routing_key, r.payload, r.message_id) for r in rows),
+                return_exceptions=True,
+            )
+            done: List[int] = []
+            for row, result in zip(rows, results):
+                if isinstance(result, BaseException):
+                    OUTBOX_FAILED.inc()
+                    logger.warning("[outbox] publication en échec rk=%s: %s", row.routing_key, result)
+                    break  # la suite du lot sera republiée dans l'ordre au prochain tour
+                done.append(row.id)
+
+            await self.executor.run(self._finish, db, done)
+            OUTBOX_RELAYED.inc(len(done))
+            return len(done)
+        finally:
+            await self.executor.run(db.close)
+
+    async def run(self) -> None:
+        """Boucle du relai : enchaîne les lots tant qu'il y en a, sinon attend un COMMIT ou le poll."""
+        _relays.add(self)
+        try:
+            while True:
+                self.wakeup.clear()
+                published = await self.relay_once()
+                if published >= self.batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            _relays.discard(self)
@@ -0,0 +1,40 @@
+# app/infra/events/postcommit.py (ORDER-API)
+"""
+Notifications in-process à déclencher après le COMMIT (réveil de requêtes, flux SSE).
+
+Hors lot : exécutées immédiatement (le handler a déjà commité). En micro-batching,
+`handle_batch` les retient (`deferred`) et les exécute (`run`) après le COMMIT du lot ;
+un event en échec retire les siennes.
+"""
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+Callback = Callable[[], None]
+
+_pending: contextvars.ContextVar[Optional[List[Callback]]] = contextvars.ContextVar("postcommit", default=None)
+
+
+def after_commit(callback: Callback) -> None:
+    pending = _pending.get()
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+@contextmanager
+def deferred() -> Iterator[List[Callback]]:
+    """Retient les `after_commit` du bloc dans la liste retournée."""
+    token = _pending.set([])
+    try:
+        yield _pending.get()
+    finally:
+        _pending.reset(token)
+
+
+def run(callbacks: List[Callback]) -> None:
+    for callback in callbacks:
+        callback()
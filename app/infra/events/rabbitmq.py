@@ -1,21 +1,69 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
-from typing import Iterable, Awaitable, Callable
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Awaitable, Callable, List, Optional, Set, Tuple
 
-import aio_pika
+from prometheus_client import Counter, Histogram
 
 from app.core.config import settings
+from app.infra.events.autotune import (
+    CONSUMER_CONCURRENCY,
+    CONSUMER_PREFETCH,
+    AdaptiveController,
+    ConcurrencyLimiter,
+)
+from app.infra.events.breaker import CircuitBreaker
+from app.infra.events.codecs import codec_by_name, get_codec
+from app.infra.events.spool import SPOOL_REPLAYED, Spool
+
+if TYPE_CHECKING:
+    import aio_pika
+
+    from app.infra.events.coalescer import StatusCoalescer
+    from app.infra.events.inbox import Inbox
 
 logger = logging.getLogger(__name__)
 
-_EXCHANGE_TYPE_MAP = {
-    "topic": aio_pika.ExchangeType.TOPIC,
-    "fanout": aio_pika.ExchangeType.FANOUT,
-    "direct": aio_pika.ExchangeType.DIRECT,
-    "headers": aio_pika.ExchangeType.HEADERS,
-}
+HANDLER_DURATION = Histogram(
+    "events_handler_duration_seconds", "Durée de traitement des events entrants", ["routing_key"]
+)
+CONSUMER_LAG = Histogram(
+    "events_consumer_lag_seconds",
+    "Délai entre publication et livraison au consumer, par queue (lane)",
+    ["queue"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+EVENTS_DROPPED = Counter(
+    "events_publish_dropped_total", "Events perdus faute de broker et de spool", ["routing_key"]
+)
+
+# Horodatage de publication en ms (le `timestamp` AMQP n'a qu'une précision à la seconde)
+PUBLISHED_AT_HEADER = "x-published-at"
+
+# Types d'exchange en str (valeurs d'aio_pika.ExchangeType) : aio_pika n'est importé qu'à la connexion
+_EXCHANGE_TYPES = ("topic", "fanout", "direct", "headers")
+
+
+def exchange_type_from(spec: Optional[str]) -> str:
+    value = (spec or "topic").lower()
+    return value if value in _EXCHANGE_TYPES else "topic"
+
+
+def parse_priorities(spec: str) -> Dict[str, int]:
+    """"order.confirmed=9,order.rejected=9" → {routing_key: priorité} (entrées invalides ignorées)."""
+    priorities: Dict[str, int] = {}
+    for entry in (spec or "").split(","):
+        rk, _, value = entry.partition("=")
+        try:
+            priorities[rk.strip()] = int(value)
+        except ValueError:
+            continue
+    return priorities
 
 
 class RabbitMQ:
@@ -25,17 +73,29 @@ class RabbitMQ:
 
         # Exchange + type (pilotés par l'env)
         self.exchange_name = settings.RABBITMQ_EXCHANGE or "events"
-        self.exchange_type = _EXCHANGE_TYPE_MAP.get(
-            (settings.RABBITMQ_EXCHANGE_TYPE or "topic").lower(),
-            aio_pika.ExchangeType.TOPIC,
+        self.exchange_type = exchange_type_from(settings.RABBITMQ_EXCHANGE_TYPE)
+
+        # Codec de publication (le consumer, lui, suit le content_type de chaque message)
+        self.codec = codec_by_name(settings.EVENTS_CODEC)
+        self.priorities = parse_priorities(settings.EVENTS_PRIORITIES)
+
+        # Broker en panne : échec immédiat (breaker) puis spool local, rejoué à la reconnexion
+        self.breaker = CircuitBreaker(
+            "rabbitmq", settings.EVENTS_BREAKER_FAILURES, settings.EVENTS_BREAKER_RESET_S
         )
+        self.publish_timeout = settings.EVENTS_PUBLISH_TIMEOUT_MS / 1000
+        self.spool: Optional[Spool] = None
+        self._spool_ready = asyncio.Event()
+        self._replayer: Optional[asyncio.Task] = None
 
         self.connection: aio_pika.RobustConnection | None = None
         self.channel: aio_pika.Channel | None = None
         self.exchange: aio_pika.Exchange | None = None
 
     async def connect(self):
-        """Connexion robuste + déclaration de l'exchange."""
+        """Connexion robuste + déclaration de l'exchange (+ relecture du spool local)."""
+        import aio_pika  # import différé (démarrage) : inutile avec EVENTS_BROKER=memory
+
         self.connection = await aio_pika.connect_robust(self.url)
         self.channel = await self.connection.channel()
         self.exchange = await self.channel.declare_exchange(
@@ -44,10 +104,22 @@ class RabbitMQ:
         logger.info(
             "RabbitMQ connected. Exchange '%s' (%s) declared.",
             self.exchange_name,
-            self.exchange_type.name.lower(),
+            self.exchange_type,
         )
+        if self._open_spool() is not None and self._replayer is None:
+            self._replayer = asyncio.create_task(self._replay_loop())
+            if self.spool.pending:
+                logger.info("[spool] %d events en attente, relecture", self.spool.pending)
+                self._spool_ready.set()
 
     async def disconnect(self):
+        if self._replayer is not None:
+            self._replayer.cancel()
+            self._replayer = None
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
         try:
             if self.channel and not self.channel.is_closed:
                 await self.channel.close()
@@ -64,47 +136,377 @@ class RabbitMQ:
 
     async def publish_message(self, routing_key: str, message: dict):
         """Publie un message. (routing_key ignorée si fanout)"""
+        message_id = uuid.uuid4().hex
+
+        # Tant que le spool n'est pas vidé, les nouveaux events passent derrière (ordre conservé)
+        if self.spool is not None and self.spool.pending:
+            self._fallback(routing_key, message_id, message)
+            return
+
         if not self.exchange:
             logger.error("Cannot publish: exchange is not available (connect() not called).")
+            self._fallback(routing_key, message_id, message)
+            return
+
+        if not self.breaker.allow():
+            self._fallback(routing_key, message_id, message)
             return
 
         try:
-            rk = routing_key if self.exchange_type == aio_pika.ExchangeType.TOPIC else ""
-            await self.exchange.publish(
+            await self._publish(routing_key, message, message_id)
+            self.breaker.record_success()
+            logger.debug("Published rk=%s, payload=%s", routing_key, message)
+        except Exception:
+            logger.exception("Failed to publish rk=%s", routing_key)
+            self.breaker.record_failure()
+            self._fallback(routing_key, message_id, message)
+
+    async def publish_confirmed(self, routing_key: str, message: dict, message_id: Optional[str] = None) -> None:
+        """
+        Publie et attend le confirm du broker (channel en mode publisher confirms, défaut aio_pika).
+        Lève en cas d'échec : pas de spool, l'appelant (relai outbox) garde l'event.
+        """
+        if not self.exchange:
+            raise ConnectionError("exchange is not available")
+        if not self.breaker.allow():
+            raise ConnectionError("circuit breaker open")
+        try:
+            await self._publish(routing_key, message, message_id or uuid.uuid4().hex)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    async def _publish(self, routing_key: str, message: dict, message_id: str) -> None:
+        import aio_pika  # déjà chargé par connect()
+
+        rk = routing_key if self.exchange_type == "topic" else ""
+        now = time.time()
+        await asyncio.wait_for(
+            self.exchange.publish(
                 aio_pika.Message(
-                    body=json.dumps(message).encode("utf-8"),
-                    content_type="application/json",
+                    body=self.codec.encode(message),
+                    content_type=self.codec.content_type,
+                    message_id=message_id,
                     delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    priority=self.priorities.get(routing_key),
+                    timestamp=now,
+                    headers={PUBLISHED_AT_HEADER: int(now * 1000)},
                 ),
                 routing_key=rk,
+            ),
+            timeout=self.publish_timeout,
+        )
+
+    # ---------- Spool local ----------
+    def _open_spool(self) -> Optional[Spool]:
+        if self.spool is None and settings.EVENTS_SPOOL_DIR:
+            self.spool = Spool(
+                settings.EVENTS_SPOOL_DIR, settings.EVENTS_SPOOL_SEGMENT_MB * 1024 * 1024
             )
-            logger.info("Published rk=%s, payload=%s", routing_key, message)
-        except Exception:
-            logger.exception("Failed to publish rk=%s", routing_key)
+        return self.spool
+
+    def _fallback(self, routing_key: str, message_id: str, message: dict) -> None:
+        """Event non publiable maintenant : spool local si configuré, sinon perdu (compté)."""
+        spool = self._open_spool()
+        if spool is None:
+            EVENTS_DROPPED.labels(routing_key).inc()
+            logger.error("Event dropped rk=%s (broker indisponible, pas de spool)", routing_key)
+            return
+        spool.append(routing_key, message_id, message)
+        self._spool_ready.set()
+
+    async def _replay_loop(self) -> None:
+        """Republie le spool dans l'ordre, à EVENTS_SPOOL_REPLAY_RATE events/s au plus."""
+        interval = 1 / max(1, settings.EVENTS_SPOOL_REPLAY_RATE)
+        replayed = 0
+        while True:
+            await self._spool_ready.wait()
+            record = self.spool.peek()
+            if record is None:
+                self.spool.commit()
+                self._spool_ready.clear()
+                if replayed:
+                    logger.info("[spool] relecture terminée (%d events)", replayed)
+                    replayed = 0
+                continue
 
+            if not self.exchange or not self.breaker.allow():
+                await asyncio.sleep(max(self.breaker.retry_in(), interval))
+                continue
 
-rabbitmq = RabbitMQ()
+            rk, message_id, message = record
+            try:
+                await self._publish(rk, message, message_id)
+            except Exception as e:
+                logger.warning("[spool] relecture en échec rk=%s: %s", rk, e)
+                self.breaker.record_failure()
+                await asyncio.sleep(interval)
+                continue
+
+            self.breaker.record_success()
+            self.spool.advance()
+            SPOOL_REPLAYED.inc()
+            replayed += 1
+            if replayed % 100 == 0:
+                self.spool.commit()
+            await asyncio.sleep(interval)
+
+
+def _make_broker():
+    """EVENTS_BROKER=memory : broker in-process (tests de charge / CI sans RabbitMQ)."""
+    if (settings.EVENTS_BROKER or "rabbitmq").lower() == "memory":
+        from app.infra.events.memory import InMemoryBroker
+
+        return InMemoryBroker(
+            exchange_name=settings.RABBITMQ_EXCHANGE or "events",
+            exchange_type=exchange_type_from(settings.RABBITMQ_EXCHANGE_TYPE),
+            codec=codec_by_name(settings.EVENTS_CODEC),
+            priorities=parse_priorities(settings.EVENTS_PRIORITIES),
+        )
+    return RabbitMQ()
+
+
+# Nom historique conservé : c'est le broker actif (RabbitMQ ou en mémoire)
+rabbitmq = _make_broker()
 
 
 # ---------- Consommation (topic ou fanout) ----------
+def _decode(message) -> dict:
+    """Décode le body selon son content_type (JSON par défaut), sans copie intermédiaire."""
+    try:
+        return get_codec(getattr(message, "content_type", None)).decode(message.body)
+    except Exception:
+        return {"raw": message.body}
+
+
+def _lag_of(message) -> Optional[float]:
+    """Secondes écoulées depuis la publication (header ms, sinon `timestamp` AMQP), None si inconnu."""
+    headers = getattr(message, "headers", None)
+    published_ms = headers.get(PUBLISHED_AT_HEADER) if isinstance(headers, dict) else None
+    if isinstance(published_ms, (int, float)):
+        return max(0.0, time.time() - published_ms / 1000)
+    ts = getattr(message, "timestamp", None)
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return max(0.0, time.time() - ts.timestamp())
+    return None
+
+
+async def _observe_lag(it, queue_name: str) -> AsyncIterator[Any]:
+    """Itérateur de la queue, avec mesure du lag de chaque message livré."""
+    lag = CONSUMER_LAG.labels(queue_name)
+    async for message in it:
+        seconds = _lag_of(message)
+        if seconds is not None:
+            lag.observe(seconds)
+        yield message
+
+
+async def _iter_batches(it, batch_size: int, max_wait_ms: int) -> AsyncIterator[list]:
+    """
+    Regroupe les messages de l'itérateur : jusqu'à `batch_size` messages,
+    ou `max_wait_ms` après réception du premier message du lot.
+    Le prochain `__anext__` en attente n'est jamais annulé (pas de message perdu),
+    il est simplement reporté sur le lot suivant.
+    """
+    loop = asyncio.get_running_loop()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            batch: list = []
+            deadline: Optional[float] = None
+            while len(batch) < batch_size:
+                if pending is None:
+                    pending = asyncio.ensure_future(it.__anext__())
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    break
+                fut, pending = pending, None
+                try:
+                    batch.append(fut.result())
+                except StopAsyncIteration:
+                    if batch:
+                        yield batch
+                    return
+                if deadline is None:
+                    deadline = loop.time() + max_wait_ms / 1000
+            yield batch
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def process_message(
+    message,
+    handler: Callable[[dict, str], Awaitable[None]],
+    inbox: Optional["Inbox"] = None,
+    payload: Optional[dict] = None,
+    controller: Optional[AdaptiveController] = None,
+) -> None:
+    """Traite un message (ack à la sortie de process(), même si le handler échoue)."""
+    async with message.process():
+        rk = message.routing_key or ""
+        key = inbox.key_for(message, rk) if inbox is not None else None
+        if key is not None and await inbox.is_duplicate(key, rk):
+            logger.info("Duplicate event ignored rk=%s id=%s", rk, key)
+            return
+        if payload is None:
+            payload = _decode(message)
+        started = time.perf_counter()
+        try:
+            await handler(payload, rk)
+        except Exception:
+            logger.exception("Handler error rk=%s", rk)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            HANDLER_DURATION.labels(rk).observe(elapsed)
+            if controller is not None:
+                controller.observe(elapsed)
+        if key is not None:
+            await inbox.remember([(key, rk)])
+
+
+class OrderedLanes:
+    """Sérialise les messages d'une même commande (ordre d'arrivée), parallélise les autres."""
+
+    def __init__(self) -> None:
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._refs: Dict[Any, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Any):
+        if key is None:
+            yield
+            return
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._refs[key] = self._refs.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._refs[key] -= 1
+            if not self._refs[key]:
+                del self._refs[key]
+                del self._locks[key]
+
+
+async def _consume_concurrently(
+    it,
+    handler: Callable[[dict, str], Awaitable[None]],
+    inbox: Optional["Inbox"],
+    slots: ConcurrencyLimiter,
+    controller: Optional[AdaptiveController] = None,
+    coalescer: Optional["StatusCoalescer"] = None,
+) -> None:
+    """Jusqu'à `slots.limit` messages en parallèle, l'ordre par order_id étant préservé."""
+    lanes = coalescer.lanes if coalescer is not None else OrderedLanes()
+    tasks: Set[asyncio.Task] = set()
+
+    async def _run(message, payload) -> None:
+        try:
+            order_id = payload.get("order_id") if isinstance(payload, dict) else None
+            async with lanes.hold(order_id):
+                await process_message(message, handler, inbox, payload, controller)
+        finally:
+            slots.release()
+
+    try:
+        async for message in it:
+            payload = _decode(message)
+            if coalescer is not None:
+                if coalescer.offer(message, payload, handler, inbox, controller):
+                    continue
+                coalescer.flush_soon(coalescer.order_id_of(payload))
+            await slots.acquire()
+            task = asyncio.create_task(_run(message, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if coalescer is not None:
+            await coalescer.drain()
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _process_batch(
+    batch: list,
+    batch_handler: Callable[[List[Tuple[dict, str]]], Awaitable[None]],
+    inbox: Optional["Inbox"] = None,
+) -> None:
+    """Ack groupé uniquement après succès du handler (donc du COMMIT), sinon requeue du lot."""
+    events: List[Tuple[dict, str]] = []
+    seen: List[Tuple[str, str]] = []
+    for m in batch:
+        rk = m.routing_key or ""
+        key = inbox.key_for(m, rk) if inbox is not None else None
+        if key is not None:
+            if any(key == k for k, _ in seen) or await inbox.is_duplicate(key, rk):
+                logger.info("Duplicate event ignored rk=%s id=%s", rk, key)
+                continue
+            seen.append((key, rk))
+        events.append((_decode(m), rk))
+
+    if events:
+        try:
+            await batch_handler(events)
+        except Exception:
+            logger.exception("Batch handler error (%d messages), requeue", len(batch))
+            await batch[-1].nack(multiple=True, requeue=True)
+            return
+        if seen:
+            await inbox.remember(seen)
+    await batch[-1].ack(multiple=True)
+
+
 async def start_consumer(
     connection: aio_pika.RobustConnection,
     exchange: aio_pika.Exchange,
-    exchange_type: aio_pika.ExchangeType,
+    exchange_type: str,
     queue_name: str,
     patterns: Iterable[str],
     handler: Callable[[dict, str], Awaitable[None]],
+    *,
+    batch_handler: Optional[Callable[[List[Tuple[dict, str]]], Awaitable[None]]] = None,
+    batch_size: int = 1,
+    batch_max_wait_ms: int = 50,
+    inbox: Optional["Inbox"] = None,
+    concurrency: int = 1,
+    prefetch: int = 16,
+    controller: Optional[AdaptiveController] = None,
+    coalescer: Optional["StatusCoalescer"] = None,
+    max_priority: int = 0,
 ):
     """
     - topic: bind sur chaque pattern fourni (ex: 'order.#', 'customer.#')
     - fanout: ignore les patterns et bind sans routing_key
+    - batch_handler + batch_size > 1: micro-batching (lot de N messages ou T ms, ack groupé)
+    - inbox: déduplication des redeliveries (ack immédiat des doublons)
+    - concurrency > 1: messages traités en parallèle (séquentiels pour un même order_id)
+    - prefetch: QoS du channel (au moins batch_size / concurrency)
+    - controller: auto-réglage de la concurrence et du prefetch (hors micro-batching)
+    - coalescer: fusion des events de statut d'une même commande (hors micro-batching)
+    - max_priority > 0: queue déclarée avec x-max-priority (priorités des messages respectées)
     """
+    batching = batch_handler is not None and batch_size > 1
+    if controller is not None and not batching:
+        concurrency, prefetch = controller.concurrency, controller.prefetch
+    prefetch = max(prefetch, batch_size, concurrency)
+
     channel = await connection.channel()
-    await channel.set_qos(prefetch_count=16)
+    await channel.set_qos(prefetch_count=prefetch)
+    CONSUMER_PREFETCH.labels(queue_name).set(prefetch)
+    CONSUMER_CONCURRENCY.labels(queue_name).set(concurrency)
 
-    queue = await channel.declare_queue(queue_name, durable=True, auto_delete=False)
+    arguments = {"x-max-priority": max_priority} if max_priority > 0 else None
+    queue = await channel.declare_queue(queue_name, durable=True, auto_delete=False, arguments=arguments)
 
-    if exchange_type == aio_pika.ExchangeType.FANOUT:
+    if exchange_type == "fanout":
         await queue.bind(exchange, routing_key="")
         logger.info("Queue %s bound (fanout)", queue_name)
     else:
@@ -112,15 +514,39 @@ async def start_consumer(
             await queue.bind(exchange, routing_key=p)
             logger.info("Queue %s bound to pattern %s", queue_name, p)
 
-    async with queue.iterator() as it:
-        async for message in it:
-            async with message.process():
-                rk = message.routing_key or ""
-                try:
-                    payload = json.loads(message.body.decode("utf-8"))
-                except Exception:
-                    payload = {"raw": message.body}
+    async with queue.iterator() as raw:
+        it = _observe_lag(raw, queue_name)
+        if batching:
+            logger.info("Queue %s: micro-batching (size=%d, wait=%dms)", queue_name, batch_size, batch_max_wait_ms)
+            async for batch in _iter_batches(it, batch_size, batch_max_wait_ms):
+                await _process_batch(batch, batch_handler, inbox)
+            return
+
+        try:
+            if controller is not None:
+                slots = ConcurrencyLimiter(concurrency)
+                tuner = asyncio.create_task(controller.run(channel, slots))
                 try:
-                    await handler(payload, rk)
-                except Exception:
-                    logger.exception("Handler error rk=%s", rk)
+                    await _consume_concurrently(it, handler, inbox, slots, controller, coalescer)
+                finally:
+                    tuner.cancel()
+                return
+
+            if concurrency > 1:
+                await _consume_concurrently(it, handler, inbox, ConcurrencyLimiter(concurrency), coalescer=coalescer)
+                return
+
+            async for message in it:
+                if coalescer is None:
+                    await process_message(message, handler, inbox)
+                    continue
+                payload = _decode(message)
+                if coalescer.offer(message, payload, handler, inbox):
+                    continue
+                await coalescer.flush(coalescer.order_id_of(payload))
+                await process_message(message, handler, inbox, payload)
+            if coalescer is not None:
+                await coalescer.drain()
+        finally:
+            if coalescer is not None:
+                coalescer.close()
@@ -0,0 +1,190 @@
+# app/infra/events/spool.py (ORDER-API)
+"""
+Spool local des events non publiés (broker indisponible).
+
+Fichiers append-only, mappés en mémoire (mmap) et découpés en segments de taille fixe :
+    <dir>/00000001.seg, 00000002.seg, ...   + <dir>/cursor (segment, offset de relecture)
+Enregistrement : longueur (u32) | crc32 (u32) | [routing_key, message_id, message] (JSON).
+L'en-tête est écrit après le corps : un enregistrement interrompu (crash) reste invisible.
+Les segments entièrement relus sont supprimés. Les écritures mmap survivent à un crash
+du process (page cache) ; pas de fsync par event.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PENDING = Gauge("events_spool_pending", "Events en attente dans le spool local", multiprocess_mode="livesum")
+SPOOL_WRITTEN = Counter("events_spooled_total", "Events écrits dans le spool local")
+SPOOL_REPLAYED = Counter("events_spool_replayed_total", "Events du spool republiés sur le broker")
+
+_HEADER = struct.Struct("<II")
+
+Record = Tuple[str, str, Dict[str, Any]]
+
+
+class Spool:
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = max(segment_bytes, 4096)
+        self._cursor_path = self.dir / "cursor"
+
+        self._segments: List[int] = sorted(int(p.stem) for p in self.dir.glob("*.seg"))
+        self._rseq, self._roff = self._load_cursor()
+        for seq in [s for s in self._segments if s < self._rseq]:
+            self._path(seq).unlink(missing_ok=True)
+        self._segments = [s for s in self._segments if s >= self._rseq]
+        if not self._segments:
+            self._segments = [max(self._rseq, 1)]
+            self._create(self._segments[0], self.segment_bytes)
+        if self._rseq not in self._segments:
+            self._rseq, self._roff = self._segments[0], 0
+
+        self._wseq = self._segments[-1]
+        self._wmap = self._open(self._wseq)
+        self._woff = self._end_of(self._wmap)
+
+        self._rmap: Optional[mmap.mmap] = None
+        self._rmap_seq: Optional[int] = None
+        self._peeked: Optional[int] = None
+        self.pending = self._count()
+        SPOOL_PENDING.set(self.pending)
+
+    # ---------- fichiers ----------
+    def _path(self, seq: int) -> Path:
+        return self.dir / f"{seq:08d}.seg"
+
+    def _create(self, seq: int, size: int) -> None:
+        with open(self._path(seq), "wb") as f:
+            f.truncate(size)
+
+    def _open(self, seq: int) -> mmap.mmap:
+        with open(self._path(seq), "r+b") as f:
+            return mmap.mmap(f.fileno(), 0)
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            seq, off = self._cursor_path.read_text().split()
+            return int(seq), int(off)
+        except (OSError, ValueError):
+            return (self._segments[0] if self._segments else 1), 0
+
+    def commit(self) -> None:
+        """Persiste la position de relecture (remplacement atomique)."""
+        tmp = self._cursor_path.with_suffix(".tmp")
+        tmp.write_text(f"{self._rseq} {self._roff}")
+        os.replace(tmp, self._cursor_path)
+
+    # ---------- lecture d'un segment ----------
+    @staticmethod
+    def _read(buf: mmap.mmap, offset: int) -> Optional[Tuple[bytes, int]]:
+        """(corps, offset suivant) de l'enregistrement à `offset`, None en fin de segment."""
+        if offset + _HEADER.size > len(buf):
+            return None
+        length, crc = _HEADER.unpack_from(buf, offset)
+        end = offset + _HEADER.size + length
+        if not length or end > len(buf):
+            return None
+        body = buf[offset + _HEADER.size:end]
+        if zlib.crc32(body) != crc:
+            return None
+        return body, end
+
+    def _end_of(self, buf: mmap.mmap) -> int:
+        offset = 0
+        while (rec := self._read(buf, offset)) is not None:
+            offset = rec[1]
+        return offset
+
+    def _count(self) -> int:
+        count = 0
+        for seq in self._segments:
+            buf = self._wmap if seq == self._wseq else self._open(seq)
+            offset = self._roff if seq == self._rseq else 0
+            while (rec := self._read(buf, offset)) is not None:
+                offset = rec[1]
+                count += 1
+            if buf is not self._wmap:
+                buf.close()
+        return count
+
+    # ---------- écriture ----------
+    def append(self, routing_key: str, message_id: str, message: Dict[str, Any]) -> None:
+        body = orjson.dumps([routing_key, message_id, message])
+        need = _HEADER.size + len(body)
+        if self._woff + need > len(self._wmap):
+            self._rotate(need)
+        start = self._woff + _HEADER.size
+        self._wmap[start:start + len(body)] = body
+        _HEADER.pack_into(self._wmap, self._woff, len(body), zlib.crc32(body))
+        self._woff += need
+        self.pending += 1
+        SPOOL_WRITTEN.inc()
+        SPOOL_PENDING.set(self.pending)
+
+    def _rotate(self, need: int) -> None:
+        self._wmap.flush()
+        self._wmap.close()
+        self._wseq += 1
+        self._create(self._wseq, max(self.segment_bytes, need + _HEADER.size))
+        self._segments.append(self._wseq)
+        self._wmap = self._open(self._wseq)
+        self._woff = 0
+        logger.info("[spool] nouveau segment %s", self._path(self._wseq).name)
+
+    # ---------- relecture (dans l'ordre d'écriture) ----------
+    def _reader(self) -> mmap.mmap:
+        if self._rseq == self._wseq:
+            return self._wmap
+        if self._rmap_seq != self._rseq:
+            if self._rmap is not None:
+                self._rmap.close()
+            self._rmap, self._rmap_seq = self._open(self._rseq), self._rseq
+        return self._rmap
+
+    def peek(self) -> Optional[Record]:
+        """Prochain event à rejouer (sans avancer), None si le spool est vide."""
+        while True:
+            rec = self._read(self._reader(), self._roff)
+            if rec is not None:
+                body, self._peeked = rec
+                rk, message_id, message = orjson.loads(body)
+                return rk, message_id, message
+            if self._rseq == self._wseq:
+                return None
+            self._drop_read_segment()
+
+    def advance(self) -> None:
+        """Marque l'event renvoyé par `peek()` comme publié."""
+        if self._peeked is None:
+            return
+        self._roff, self._peeked = self._peeked, None
+        self.pending -= 1
+        SPOOL_PENDING.set(self.pending)
+
+    def _drop_read_segment(self) -> None:
+        if self._rmap is not None:
+            self._rmap.close()
+        self._rmap, self._rmap_seq = None, None
+        self._path(self._rseq).unlink(missing_ok=True)
+        self._segments.remove(self._rseq)
+        self._rseq, self._roff = self._segments[0], 0
+        self.commit()
+
+    def close(self) -> None:
+        self.commit()
+        if self._rmap is not None:
+            self._rmap.close()
+        self._wmap.flush()
+        self._wmap.close()
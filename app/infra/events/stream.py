@@ -0,0 +1,149 @@
+# app/infra/events/stream.py (ORDER-API)
+"""
+Pub/sub in-process des changements de commande, pour les flux SSE.
+
+`OrderService` et les handlers publient (après COMMIT, via `postcommit`) ; chaque abonné SSE
+a sa file bornée, filtrée par commande ou par client. Les derniers events sont gardés dans
+un tampon circulaire pour la reprise `Last-Event-ID`. Un abonné trop lent est déconnecté
+(il reprendra via Last-Event-ID) plutôt que de ralentir les publications.
+Attaché au `notifier` (notify.py), le flux reçoit aussi les changements des autres process
+(worker d'events, autres workers API) avec leur id d'origine : ids en µs d'horloge, comparables
+d'un process à l'autre, la reprise fonctionne quel que soit le worker qui sert la reconnexion.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Gauge
+
+from app.core.config import settings
+from app.infra.events.postcommit import after_commit
+
+if TYPE_CHECKING:
+    from app.infra.events.notify import Notifier
+
+STREAM_SUBSCRIBERS = Gauge("orders_stream_subscribers", "Abonnés SSE connectés", multiprocess_mode="livesum")
+
+# Topic : ("order", order_id) ou ("customer", customer_id)
+Topic = Tuple[str, int]
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    id: int
+    event: str
+    order_id: int
+    customer_id: Optional[int]
+    data: Dict[str, Any]
+
+    def matches(self, topic: Topic) -> bool:
+        kind, key = topic
+        return self.order_id == key if kind == "order" else self.customer_id == key
+
+
+class Subscription:
+    def __init__(self, hub: "OrderStream", topic: Topic, queue_size: int) -> None:
+        self.hub = hub
+        self.topic = topic
+        self.queue: asyncio.Queue[Optional[StreamEvent]] = asyncio.Queue(queue_size)
+
+    def close(self) -> None:
+        self.hub._unsubscribe(self)
+
+
+def order_snapshot(order) -> Dict[str, Any]:
+    """Données diffusées pour une commande (statut, total, date de mise à jour)."""
+    return {
+        "order_id": order.id,
+        "customer_id": order.customer_id,
+        "status": getattr(order.status, "value", order.status),
+        "total": order.total,
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+class OrderStream:
+    def __init__(self, max_subscribers: int = 1000, buffer_size: int = 1000, queue_size: int = 100) -> None:
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.buffer: Deque[StreamEvent] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        # Ids = horloge en µs, strictement croissants dans le process : un Last-Event-ID d'avant
+        # le redémarrage est reconnu comme non rejouable, celui d'un autre process reste comparable
+        self._last_id = time.time_ns() // 1000 - 1
+        # Dernier id sorti du tampon : au-delà, la reprise est complète
+        self._floor = self._last_id
+        self._send: Optional[Callable[[dict], None]] = None
+
+    def attach(self, notifier: "Notifier") -> None:
+        """Diffuse les changements de ce process aux autres et reçoit les leurs."""
+        self._send = notifier.register("stream", lambda data: self._broadcast(**data))
+
+    def subscribe(self, topic: Topic, last_event_id: Optional[int] = None) -> Tuple[Subscription, List[StreamEvent], bool]:
+        """(abonnement, events manqués depuis last_event_id, reprise complète ?)."""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        sub = Subscription(self, topic, self.queue_size)
+        self._subscribers.add(sub)
+        STREAM_SUBSCRIBERS.set(len(self._subscribers))
+        if last_event_id is None:
+            return sub, [], True
+        missed = [e for e in self.buffer if e.id > last_event_id and e.matches(topic)]
+        return sub, missed, last_event_id >= self._floor
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+        STREAM_SUBSCRIBERS.set(len(self._subscribers))
+
+    def publish(self, event: str, order_id: int, customer_id: Optional[int], data: Dict[str, Any]) -> None:
+        """Diffuse après le COMMIT en cours (immédiatement hors micro-batching)."""
+        after_commit(partial(self._emit, event, order_id, customer_id, data))
+
+    def publish_order(self, event: str, order) -> None:
+        self.publish(event, order.id, order.customer_id, order_snapshot(order))
+
+    def _emit(self, event: str, order_id: int, customer_id: Optional[int], data: Dict[str, Any]) -> None:
+        ev = self._broadcast(event, order_id, customer_id, data)
+        if self._send is not None:
+            self._send({"event_id": ev.id, "event": event, "order_id": order_id, "customer_id": customer_id, "data": data})
+
+    def _broadcast(
+        self, event: str, order_id: int, customer_id: Optional[int], data: Dict[str, Any],
+        event_id: Optional[int] = None,
+    ) -> StreamEvent:
+        """Diffuse aux abonnés de ce process (`event_id` : id d'origine d'un event d'un autre process)."""
+        if event_id is None:
+            event_id = self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        else:
+            self._last_id = max(self._last_id, event_id)
+        ev = StreamEvent(event_id, event, order_id, customer_id, data)
+        if len(self.buffer) == self.buffer.maxlen:
+            self._floor = max(self._floor, self.buffer[0].id)
+        self.buffer.append(ev)
+        for sub in list(self._subscribers):
+            if not ev.matches(sub.topic):
+                continue
+            try:
+                sub.queue.put_nowait(ev)
+            except asyncio.QueueFull:
+                # Abonné trop lent : on vide sa file et on lui signale la fin du flux
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait(None)
+                self._unsubscribe(sub)
+        return ev
+
+
+order_stream = OrderStream(
+    max_subscribers=settings.ORDERS_STREAM_MAX_SUBSCRIBERS,
+    buffer_size=settings.ORDERS_STREAM_BUFFER,
+)
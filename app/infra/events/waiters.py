@@ -0,0 +1,70 @@
+# app/infra/events/waiters.py (ORDER-API)
+"""
+Corrélation requête HTTP ↔ event entrant, dans le process.
+
+La requête enregistre un future par clé (order_id) avant de publier sa demande ; le handler
+de l'event réponse appelle `resolve(clé)`. Le réveil passe par `postcommit` : en
+micro-batching la requête ne relit jamais un état non commité.
+Attachés au `notifier` (notify.py), les réveils sont aussi diffusés aux autres process :
+le worker d'events ou un autre worker API réveille les requêtes de ce process.
+"""
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set
+
+from app.infra.events.postcommit import after_commit
+
+if TYPE_CHECKING:
+    from app.infra.events.notify import Notifier
+
+
+class Waiters:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._futures: Dict[Any, Set[asyncio.Future]] = {}
+        self._send: Optional[Callable[[dict], None]] = None
+
+    def attach(self, notifier: "Notifier") -> None:
+        """Diffuse les réveils aux autres process et applique les leurs."""
+        self._send = notifier.register(f"waiters.{self.name}", lambda data: self.wake(data["key"]))
+
+    def register(self, key: Any) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._futures.setdefault(key, set()).add(fut)
+        return fut
+
+    def discard(self, key: Any, fut: asyncio.Future) -> None:
+        futures = self._futures.get(key)
+        if futures is not None:
+            futures.discard(fut)
+            if not futures:
+                del self._futures[key]
+
+    async def wait(self, key: Any, fut: asyncio.Future, timeout: float) -> bool:
+        """True si résolu avant `timeout` secondes."""
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.discard(key, fut)
+
+    def resolve(self, key: Any) -> None:
+        after_commit(partial(self._resolved, key))
+
+    def _resolved(self, key: Any) -> None:
+        self.wake(key)
+        if self._send is not None:
+            self._send({"key": key})
+
+    def wake(self, key: Any) -> None:
+        for fut in self._futures.pop(key, ()):
+            if not fut.done():
+                fut.set_result(True)
+
+
+# order_id → requêtes POST /orders/?wait_for_price=... en attente de `order.price_calculated`
+price_waiters = Waiters("price")
@@ -3,103 +3,65 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
-import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from sqlalchemy import text
 
 from app.core.config import settings
-from app.core.db import engine, SessionLocal
-from app.core.log import setup_logging, access_log_middleware
+from app.core.log import setup_logging
+from app.core.compression import CompressionMiddleware, available_encodings
+from app.core.metrics import render_metrics
+from app.core.middleware import RequestContextMiddleware
 from app.infra.events.rabbitmq import rabbitmq, start_consumer
-from app.infra.events.handlers import (
-    handle_customer_deleted,
-    handle_customer_update_order,
-    handle_customer_delete_order, 
-    handle_order_rejected, 
-    handle_order_price_calculated,
-    handle_customer_validated,
-    handle_order_confirmed)
+from app.infra.events.consumer import spawn_lanes, spawn_notifier, spawn_outbox_relay
 from app.api import order_routes as order_router
-from app.core.db import init_db
+from app.core.db import startup_db
 
 # --- Logging ---
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# --- Prometheus ---
-REQUEST_COUNT = Counter(
-    "http_requests_total", "Total des requêtes HTTP", ["method", "path", "status"]
-)
-REQUEST_LATENCY = Histogram(
-    "http_request_duration_seconds", "Latence des requêtes HTTP", ["method", "path"]
-)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- Startup ---
+    # DB (schéma) et broker en parallèle : la connexion AMQP n'attend plus create_all
+    db_result, broker_result = await asyncio.gather(
+        asyncio.to_thread(startup_db), rabbitmq.connect(), return_exceptions=True
+    )
+    if isinstance(db_result, BaseException):
+        logger.error("database connectivity check failed", exc_info=db_result)
+
+    consumer_tasks: list[asyncio.Task] = []
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        logger.info("database connection OK")
-        init_db()
-    except Exception:
-        logger.exception("database connectivity check failed")
-
-    # The `Base.metadata.create_all` will be handled by Alembic in a real scenario
-    # For now, we can leave it out as the models aren't defined yet.
-
-    try:
-        await rabbitmq.connect()
+        if isinstance(broker_result, BaseException):
+            raise broker_result
         logger.info("[order-api] RabbitMQ connecté, exchange=%s", rabbitmq.exchange_name)
 
-        async def consumer_handler(payload: dict, rk: str):
-            logger.info("[order-api] received %s: %s", rk, payload)
-            db = SessionLocal()
-            try:
-                if rk == "customer.deleted":
-                    await handle_customer_deleted(payload, db, rabbitmq)
-                elif rk == "customer.update_order":
-                    await handle_customer_update_order(payload, db, rabbitmq)
-                elif rk == "customer.delete_order":
-                    await handle_customer_delete_order(payload, db, rabbitmq)
-                elif rk == "order.rejected":
-                    await handle_order_rejected(payload, db, rabbitmq)
-                elif rk == "order.price_calculated":
-                    await handle_order_price_calculated(payload, db, rabbitmq)
-                elif rk == "order.confirmed":   # ← FIX ici
-                    await handle_order_confirmed(payload, db, rabbitmq)
-                elif rk == "order.customer_validated":  # ← FIX ici
-                    await handle_customer_validated(payload, db, rabbitmq)
-                else:
-                    logger.warning(f"[order-api] event ignoré: {rk}")
-            finally:
-                db.close()
-
-
-        # Démarre un consumer RabbitMQ
-        asyncio.create_task(
-            start_consumer(
-                rabbitmq.connection,
-                rabbitmq.exchange_name,
-                rabbitmq.exchange_type,
-                queue_name="order-events",
-                patterns=["customer.#", "order.#"],
-                handler=consumer_handler,
-            )
-        )
-
-        logger.info("[order-api] Consumer lancé (order-events, patterns=customer.#, order.#)")
+        if settings.EVENTS_CONSUME_IN_API:
+            # Un consumer RabbitMQ par lane (supervisé : relancé s'il plante)
+            consumer_tasks = spawn_lanes(start_consumer, rabbitmq)
+        else:
+            logger.info("[order-api] Consommation désactivée (EVENTS_CONSUME_IN_API=false)")
+
+        relay = spawn_outbox_relay(rabbitmq)
+        if relay is not None:
+            consumer_tasks.append(relay)
+        # Réveils wait_for_price et flux SSE émis par le worker ou les autres workers API
+        notify = spawn_notifier(rabbitmq)
+        if notify is not None:
+            consumer_tasks.append(notify)
     except Exception as e:
         logger.exception("[order-api] Échec initialisation RabbitMQ: %s", e)
 
     yield  # Application runs here
 
     # --- Shutdown ---
+    # Consumers et relai terminés (lot en cours annulé proprement) avant la fermeture du channel
+    for task in consumer_tasks:
+        task.cancel()
+    await asyncio.gather(*consumer_tasks, return_exceptions=True)
     try:
         await rabbitmq.disconnect()
         logger.info("RabbitMQ disconnected")
@@ -119,21 +81,14 @@ app = FastAPI(
 )
 
 # --- Middlewares ---
-app.middleware("http")(access_log_middleware)
-
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start = time.time()
-    response: Response = await call_next(request)
-    duration = time.time() - start
-
-    # Basic path templating for metrics
-    path = request.url.path
-
-    REQUEST_COUNT.labels(request.method, path, str(response.status_code)).inc()
-    REQUEST_LATENCY.labels(request.method, path).observe(duration)
-    return response
+# Compression (HTTP_COMPRESSION) sous la couche de métriques : la latence mesurée l'inclut
+_encodings = available_encodings(settings.HTTP_COMPRESSION)
+if _encodings:
+    app.add_middleware(
+        CompressionMiddleware, encodings=_encodings, minimum_size=settings.HTTP_COMPRESSION_MIN_SIZE
+    )
+# request_id + log d'accès + métriques HTTP (ASGI pur, une seule couche)
+app.add_middleware(RequestContextMiddleware)
 
 
 # --- CORS ---
@@ -158,7 +113,8 @@ app.add_middleware(
 # --- Tech endpoints ---
 @app.get("/metrics")
 def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    data, content_type = render_metrics()
+    return Response(data, media_type=content_type)
 
 
 @app.get("/health", tags=["health"])
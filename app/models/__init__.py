@@ -1 +1,2 @@
-from .order_models import Order as Order
\ No newline at end of file
+from .order_models import Order as Order, OrderTombstone as OrderTombstone
+from .event_models import OutboxEvent as OutboxEvent, ProcessedEvent as ProcessedEvent
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Dict, FrozenSet, List
 from enum import Enum
 
-from sqlalchemy import DateTime, ForeignKey, Integer, func, Enum as SqlEnum
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, func, Enum as SqlEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.db import Base
@@ -17,6 +17,24 @@ class OrderStatus(str, Enum):
     COMPLETED = "completed"
     REJECTED = "rejected"
 
+
+# Machine à états : statut courant -> statuts cibles autorisés (les autres changements sont refusés).
+# Flux d'events : customer_validated (pending, demande de stock) -> confirmed | rejected ; une commande
+# rejetée repasse en pending si le client est de nouveau validé (nouvelle demande de stock).
+ORDER_TRANSITIONS: Dict[OrderStatus, FrozenSet[OrderStatus]] = {
+    OrderStatus.PENDING: frozenset({OrderStatus.CONFIRMED, OrderStatus.REJECTED, OrderStatus.CANCELLED}),
+    OrderStatus.CONFIRMED: frozenset({OrderStatus.COMPLETED, OrderStatus.CANCELLED}),
+    OrderStatus.REJECTED: frozenset({OrderStatus.PENDING}),
+    OrderStatus.CANCELLED: frozenset(),
+    OrderStatus.COMPLETED: frozenset(),
+}
+
+
+def allowed_sources(target: OrderStatus) -> List[OrderStatus]:
+    """Statuts depuis lesquels `target` est atteignable."""
+    return [status for status, targets in ORDER_TRANSITIONS.items() if target in targets]
+
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -43,6 +61,8 @@ class Order(Base):
     )
 
     __mapper_args__ = {"version_id_col": version}
+    # Flux de changements (GET /orders/changes) : parcours par (updated_at, id)
+    __table_args__ = (Index("ix_orders_updated_at_id", "updated_at", "id"),)
 
 
 class OrderItem(Base):
@@ -58,3 +78,15 @@ class OrderItem(Base):
 
     # Relation back to the order
     order: Mapped[Order] = relationship(back_populates="items")
+
+
+class OrderTombstone(Base):
+    """Trace d'une commande supprimée, servie comme `delete` par le flux de changements."""
+
+    __tablename__ = "order_tombstones"
+
+    order_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    customer_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_order_tombstones_deleted_at_id", "deleted_at", "order_id"),)
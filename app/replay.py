@@ -0,0 +1,205 @@
+"""
+Republication d'events de commandes après une panne en aval.
+
+    python -m app.replay --events created,updated [--from-id 100] [--to-id 5000]
+                         [--customer-id 42] [--status confirmed] [--updated-since 2024-05-01T00:00]
+                         [--rate 500] [--batch 100] [--checkpoint replay.ckpt] [--dry-run]
+
+- parcourt les commandes par id croissant via un curseur serveur (yield_per) ;
+- reconstruit les payloads d'OrderService (order.created, order.updated) ;
+- publie par lots avec confirms (`publish_confirmed`), au plus `--rate` events/s ;
+- après chaque lot confirmé, écrit le dernier id dans le checkpoint : relancer la même
+  commande reprend après. Un lot non confirmé arrête l'outil (code 1) sans avancer.
+Les message_id sont dérivés de (routing key, commande, version) : un lot rejoué deux fois
+porte les mêmes ids, les consumers peuvent dédupliquer.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.db import SessionLocal
+from app.core.log import setup_logging
+from app.infra.events.rabbitmq import rabbitmq
+from app.models.order_models import Order, OrderStatus
+from app.services.order_services import Event, OrderService
+
+logger = logging.getLogger("app.replay")
+
+EVENT_KINDS = ("created", "updated")
+_MESSAGE_NS = uuid.UUID("6f1c3a52-4a8e-4e8b-9a57-6c1b0f5e2d11")
+
+
+# ---------- Lecture ----------
+def iter_orders(
+    db: Session,
+    after_id: int = 0,
+    to_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    status: Optional[OrderStatus] = None,
+    updated_since: Optional[datetime] = None,
+    chunk: int = 500,
+) -> Iterator[Order]:
+    """Commandes filtrées par id croissant, lues par paquets de `chunk` (curseur serveur sur Postgres)."""
+    stmt = select(Order).options(selectinload(Order.items)).where(Order.id > after_id)
+    if to_id is not None:
+        stmt = stmt.where(Order.id <= to_id)
+    if customer_id is not None:
+        stmt = stmt.where(Order.customer_id == customer_id)
+    if status is not None:
+        stmt = stmt.where(Order.status == status)
+    if updated_since is not None:
+        stmt = stmt.where(Order.updated_at >= updated_since)
+    stmt = stmt.order_by(Order.id).execution_options(yield_per=chunk)
+    yield from db.execute(stmt).scalars()
+
+
+def build_events(order: Order, kinds: Sequence[str] = EVENT_KINDS) -> List[Event]:
+    """Mêmes payloads que ceux émis par OrderService pour cette commande."""
+    events: List[Event] = []
+    if "created" in kinds:
+        events.append(OrderService._created_event(order))
+    if "updated" in kinds:
+        events += OrderService._items_events(order, [], OrderService._items_payload(order))
+    return events
+
+
+def message_id(routing_key: str, order: Order) -> str:
+    return uuid.uuid5(_MESSAGE_NS, f"{routing_key}:{order.id}:{order.version}").hex
+
+
+# ---------- Checkpoint ----------
+class Checkpoint:
+    """Dernier id de commande entièrement confirmé (fichier texte, remplacé atomiquement)."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+
+    def save(self, last_id: int) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(last_id))
+        os.replace(tmp, self.path)
+
+
+# ---------- Republication ----------
+async def _publish_batch(publisher, batch: List[Tuple[str, dict, str]]) -> None:
+    """Publie le lot dans l'ordre et attend tous les confirms ; lève au premier échec."""
+    results = await asyncio.gather(
+        *(publisher.publish_confirmed(rk, message, mid) for rk, message, mid in batch),
+        return_exceptions=True,
+    )
+    for (rk, _, _), result in zip(batch, results):
+        if isinstance(result, BaseException):
+            raise RuntimeError(f"publication non confirmée rk={rk}") from result
+
+
+async def replay(
+    publisher,
+    orders: Iterator[Order],
+    checkpoint: Checkpoint,
+    kinds: Sequence[str] = EVENT_KINDS,
+    batch_size: int = 100,
+    rate: float = 0,
+    dry_run: bool = False,
+) -> Tuple[int, int]:
+    """Republie les events des commandes ; retourne (commandes, events). `rate` = 0 : sans limite."""
+    batch: List[Tuple[str, dict, str]] = []
+    n_orders = n_events = 0
+    last_id = None
+    start = time.perf_counter()
+
+    async def flush() -> None:
+        nonlocal n_events
+        if batch and not dry_run:
+            await _publish_batch(publisher, batch)
+        n_events += len(batch)
+        batch.clear()
+        if last_id is not None and not dry_run:
+            checkpoint.save(last_id)
+        if rate > 0:
+            # Lissage : on n'avance pas plus vite que `rate` events/s depuis le début
+            ahead = n_events / rate - (time.perf_counter() - start)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        logger.info("[replay] %d commandes, %d events, dernier id=%s", n_orders, n_events, last_id)
+
+    for order in orders:
+        batch += [(rk, message, message_id(rk, order)) for rk, message in build_events(order, kinds)]
+        n_orders += 1
+        last_id = order.id
+        # Un lot ne coupe jamais une commande : le checkpoint reste à la granularité commande
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    return n_orders, n_events
+
+
+# ---------- CLI ----------
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.replay", description="Republie des events de commandes")
+    parser.add_argument("--events", default=",".join(EVENT_KINDS), help="created,updated")
+    parser.add_argument("--from-id", type=int, default=0, help="premier id exclu (écrasé par le checkpoint)")
+    parser.add_argument("--to-id", type=int)
+    parser.add_argument("--customer-id", type=int)
+    parser.add_argument("--status", type=OrderStatus)
+    parser.add_argument("--updated-since", type=datetime.fromisoformat)
+    parser.add_argument("--rate", type=float, default=200, help="events/s, 0 = sans limite")
+    parser.add_argument("--batch", type=int, default=100, help="events par lot de confirms")
+    parser.add_argument("--checkpoint", help="fichier de reprise")
+    parser.add_argument("--dry-run", action="store_true", help="compte sans publier")
+    args = parser.parse_args(argv)
+    args.events = [k.strip() for k in args.events.split(",") if k.strip()]
+    unknown = set(args.events) - set(EVENT_KINDS)
+    if unknown:
+        parser.error(f"events inconnus: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> int:
+    setup_logging()
+    args = _parse_args(argv)
+    checkpoint = Checkpoint(args.checkpoint)
+    after_id = max(args.from_id, checkpoint.load())
+    if after_id:
+        logger.info("[replay] reprise après la commande %d", after_id)
+
+    if not args.dry_run:
+        await rabbitmq.connect()
+    db = SessionLocal()
+    try:
+        orders = iter_orders(db, after_id, args.to_id, args.customer_id, args.status, args.updated_since)
+        n_orders, n_events = await replay(
+            rabbitmq, orders, checkpoint, args.events, args.batch, args.rate, args.dry_run
+        )
+    except RuntimeError as e:
+        logger.error("[replay] arrêt: %s (relancer pour reprendre au checkpoint)", e)
+        return 1
+    finally:
+        db.close()
+        if not args.dry_run:
+            await rabbitmq.disconnect()
+
+    logger.info("[replay] terminé : %d commandes, %d events", n_orders, n_events)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -1,7 +1,16 @@
 from app.schemas.order_schemas import OrderCreate, OrderUpdate
-from app.models.order_models   import Order
-from sqlalchemy.orm      import Session
-from typing              import Any, Dict, List, Optional
+from app.models.order_models   import Order, OrderItem, OrderStatus, OrderTombstone, allowed_sources
+from datetime            import datetime
+from sqlalchemy          import Row, String, func, literal, or_, select, true, tuple_, update
+from sqlalchemy.orm      import Session, selectinload
+from typing              import Any, Dict, List, Optional, Tuple, Union
+
+# Position dans le flux de changements : (updated_at | deleted_at, order_id)
+ChangePosition = Tuple[datetime, int]
+# Changement de statut en lot : (order_id, statut cible, version attendue ou None)
+StatusChange = Tuple[int, OrderStatus, Optional[int]]
+# Colonnes renvoyées par les changements de statut (RETURNING) : de quoi publier sans relire
+_STATUS_COLUMNS = (Order.id, Order.customer_id, Order.status, Order.total, Order.version, Order.updated_at)
 
 class OrderRepository:
     """Data Access Layer for Order and OrderItem models."""
@@ -30,15 +39,54 @@ class OrderRepository:
                     query = query.filter(getattr(Order, key) == value)
         return query.offset(skip).limit(limit).all()
 
+    # ---------- READ (lignes Core, sans objets ORM) ----------
+    _ORDER_COLUMNS = (
+        Order.id, Order.customer_id, Order.status, Order.created_at,
+        Order.updated_at, Order.version, Order.total,
+    )
+    _ITEM_COLUMNS = (
+        OrderItem.product_id, OrderItem.quantity, OrderItem.id,
+        OrderItem.order_id, OrderItem.unit_price, OrderItem.line_total,
+    )
+
+    def get_row(self, order_id: int) -> Optional[Dict[str, Any]]:
+        """Commande + items en dicts (forme d'OrderResponse), ou None."""
+        rows = self._with_items(select(*self._ORDER_COLUMNS).where(Order.id == order_id))
+        return rows[0] if rows else None
+
+    def list_rows(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Page de commandes + items en dicts : 2 requêtes, quel que soit le nombre de commandes."""
+        stmt = select(*self._ORDER_COLUMNS).order_by(Order.id).offset(skip).limit(limit)
+        return self._with_items(stmt)
+
+    def _with_items(self, stmt) -> List[Dict[str, Any]]:
+        orders = [dict(row) for row in self.db.execute(stmt).mappings()]
+        if not orders:
+            return orders
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for order in orders:
+            order["items"] = []
+            by_id[order["id"]] = order
+        items = select(*self._ITEM_COLUMNS).where(OrderItem.order_id.in_(list(by_id))).order_by(OrderItem.order_id, OrderItem.id)
+        for item in self.db.execute(items).mappings():
+            by_id[item["order_id"]]["items"].append(dict(item))
+        return orders
+
     # ---------- CREATE ----------
-    def create(self, order_in: OrderCreate) -> Order:
-        """Create a new order (without items). Items are added in the service layer."""
+    def create(self, order_in: OrderCreate, commit: bool = True) -> Order:
+        """
+        Create a new order (without items). Items are added in the service layer.
+        With commit=False the order is only flushed (id assigned), the caller commits.
+        """
         db_order = Order(
             customer_id=order_in.customer_id,
             status="pending",
             items=[],
         )
         self.db.add(db_order)
+        if not commit:
+            self.db.flush()
+            return db_order
         self.db.commit()
         self.db.refresh(db_order)
         return db_order
@@ -55,9 +103,122 @@ class OrderRepository:
         return order
 
     def delete(self, order_id: int) -> Optional[Order]:
-        """Delete an order."""
+        """Delete an order (and leave a tombstone for the change feed)."""
         db_order = self.get(order_id)
         if db_order:
+            # Id réutilisable (SQLite) : la tombe existante est rafraîchie
+            tombstone = self.db.get(OrderTombstone, order_id) or OrderTombstone(order_id=order_id)
+            tombstone.customer_id = db_order.customer_id
+            tombstone.deleted_at = func.now()
+            self.db.add(tombstone)
             self.db.delete(db_order)
             self.db.commit()
         return db_order
+
+    # ---------- STATUTS ----------
+    def transition_status(self, order_id: int, status: OrderStatus) -> Tuple[Optional[Row], bool]:
+        """
+        Compare-and-set, sans commit : UPDATE ... WHERE id = :id AND status IN (sources autorisées)
+        RETURNING. Retourne (ligne, modifiée ?) : la ligne modifiée, sinon l'état courant
+        (no-op ou transition refusée), ou (None, False) si la commande n'existe pas.
+        PostgreSQL : une seule requête (CTE : état avant + UPDATE, même snapshot) ; ailleurs
+        (SQLite, pas d'UPDATE dans un CTE) l'état courant n'est relu que si rien n'a été modifié.
+        """
+        sources = allowed_sources(status)
+        table = Order.__table__
+        changed = (
+            update(table)
+            .where(table.c.id == order_id, table.c.status.in_(sources))
+            .values(status=status, version=table.c.version + 1)
+            .returning(*(table.c[c.key] for c in _STATUS_COLUMNS))
+        )
+        if self.db.get_bind().dialect.name != "postgresql":
+            row = self.db.execute(changed).first()
+            return (row, True) if row is not None else (self.status_row(order_id), False)
+
+        after = changed.cte("changed")
+        before = select(*_STATUS_COLUMNS).where(Order.id == order_id).cte("before")
+        stmt = select(
+            # total est la seule colonne nullable et l'UPDATE ne la modifie pas
+            *(func.coalesce(after.c[c.key], before.c[c.key]).label(c.key) for c in _STATUS_COLUMNS),
+            after.c.id.is_not(None).label("changed"),
+        ).select_from(before.outerjoin(after, true()))
+        row = self.db.execute(stmt).first()
+        if row is None:
+            return None, False
+        if not row.changed and row.status in sources:
+            # Statut modifié par une transaction concurrente pendant l'UPDATE : `before` est périmé
+            return self.status_row(order_id), False
+        return row, row.changed
+
+    def status_row(self, order_id: int) -> Optional[Row]:
+        """Mêmes colonnes que transition_status, sans modification."""
+        return self.db.execute(select(*_STATUS_COLUMNS).where(Order.id == order_id)).first()
+
+    def update_statuses(self, changes: List[StatusChange]) -> List[Row]:
+        """
+        Un UPDATE ... RETURNING par statut cible, sans commit. Ignore les commandes dont le statut
+        courant ne permet pas la transition (dont celles déjà dans ce statut) et celles dont la version
+        ne vaut plus `expected_version`. Retourne les lignes modifiées.
+        """
+        by_status: Dict[OrderStatus, List[Tuple[int, Optional[int]]]] = {}
+        for order_id, status, expected_version in changes:
+            by_status.setdefault(status, []).append((order_id, expected_version))
+
+        rows: List[Row] = []
+        for status, targets in by_status.items():
+            any_version = [order_id for order_id, version in targets if version is None]
+            pinned = [(order_id, version) for order_id, version in targets if version is not None]
+            matches = []
+            if any_version:
+                matches.append(Order.id.in_(any_version))
+            if pinned:
+                matches.append(tuple_(Order.id, Order.version).in_(pinned))
+            stmt = (
+                update(Order)
+                .where(or_(*matches), Order.status.in_(allowed_sources(status)))
+                .values(status=status, version=Order.version + 1)
+                .returning(*_STATUS_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            rows += self.db.execute(stmt).all()
+        return rows
+
+    def status_versions(self, order_ids: List[int]) -> Dict[int, Tuple[OrderStatus, int]]:
+        """{id: (statut, version)} des commandes existantes parmi `order_ids`."""
+        if not order_ids:
+            return {}
+        stmt = select(Order.id, Order.status, Order.version).where(Order.id.in_(order_ids))
+        return {row.id: (row.status, row.version) for row in self.db.execute(stmt)}
+
+    # ---------- CHANGE FEED ----------
+    def changes(
+        self, after: Optional[ChangePosition], until: datetime, limit: int
+    ) -> List[Tuple[ChangePosition, Union[Order, OrderTombstone]]]:
+        """
+        Commandes modifiées et tombes après `after` (exclu) et jusqu'à `until`, triées par position.
+        Parcours d'index (updated_at, id) / (deleted_at, order_id) : coût proportionnel aux changements.
+        Retourne au plus `limit` entrées.
+        """
+        orders = select(Order).options(selectinload(Order.items)).where(Order.updated_at <= until)
+        tombs = select(OrderTombstone).where(OrderTombstone.deleted_at <= until)
+        if after is not None:
+            position = tuple_(self._timestamp_param(after[0]), after[1])
+            orders = orders.where(tuple_(Order.updated_at, Order.id) > position)
+            tombs = tombs.where(tuple_(OrderTombstone.deleted_at, OrderTombstone.order_id) > position)
+        orders = orders.order_by(Order.updated_at, Order.id).limit(limit)
+        tombs = tombs.order_by(OrderTombstone.deleted_at, OrderTombstone.order_id).limit(limit)
+
+        merged: List[Tuple[ChangePosition, Union[Order, OrderTombstone]]] = [
+            ((o.updated_at, o.id), o) for o in self.db.execute(orders).scalars()
+        ]
+        merged += [((t.deleted_at, t.order_id), t) for t in self.db.execute(tombs).scalars()]
+        merged.sort(key=lambda change: change[0])
+        return merged[:limit]
+
+    def _timestamp_param(self, ts: datetime):
+        # SQLite stocke func.now() sans microsecondes ("... 10:00:00") : le paramètre doit avoir
+        # le même format texte, sinon "10:00:00" < "10:00:00.000000" et les ex æquo sont sautés
+        if self.db.get_bind().dialect.name == "sqlite" and not ts.microsecond:
+            return literal(ts.strftime("%Y-%m-%d %H:%M:%S"), String)
+        return ts
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.models.order_models import OrderStatus
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing_extensions import TypedDict
 
 
 class OrderItemBase(BaseModel):
@@ -17,15 +18,13 @@ class OrderItemCreate(OrderItemBase):
 
 
 class OrderItemResponse(OrderItemBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     order_id: int
     unit_price: float
     line_total: float
 
-      
-class ConfigDict:
-    model_config = {"from_attributes": True}
-
 
 class OrderCreate(BaseModel):
     customer_id: int = Field(..., description="ID of the customer")
@@ -38,7 +37,41 @@ class OrderUpdate(BaseModel):
     status: str
 
 
+class OrderStatusChange(BaseModel):
+    order_id: int
+    # str brut comme OrderUpdate : statut invalide → 400 contrôlé
+    status: str
+    # Version lue par l'appelant : pas de mise à jour (conflict) si la commande a changé depuis
+    expected_version: Optional[int] = None
+
+
+class OrderStatusBatch(BaseModel):
+    updates: List[OrderStatusChange] = Field(..., min_length=1)
+
+
+class OrderStatusResult(BaseModel):
+    order_id: int
+    result: Literal["updated", "unchanged", "not_found", "conflict", "invalid_transition"]
+    # État courant de la commande (absent si not_found)
+    status: Optional[OrderStatus] = None
+    version: Optional[int] = None
+
+
+class OrderStatusResponse(BaseModel):
+    """PUT /orders/{id}/status : ligne renvoyée par l'UPDATE ... RETURNING (sans items, sans relecture)."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    customer_id: int
+    status: OrderStatus
+    updated_at: datetime
+    version: int
+    total: Optional[float] = None
+
+
 class OrderResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     customer_id: int
     status: str
@@ -48,5 +81,46 @@ class OrderResponse(BaseModel):
     total: Optional[float] = None
     items: List[OrderItemResponse] = []
 
-    class ConfigDict:
-        model_config = {"from_attributes": True}
+
+# ---------- Lecture rapide ----------
+# Même forme JSON qu'OrderResponse, pour les dicts construits depuis les lignes Core
+# (OrderRepository.get_row / list_rows). Les colonnes sont déjà typées par la base :
+# les adapters ne font que sérialiser (dump_json), sans instancier de modèles.
+class OrderItemRow(TypedDict):
+    product_id: int
+    quantity: int
+    id: int
+    order_id: int
+    unit_price: float
+    line_total: float
+
+
+class OrderRow(TypedDict):
+    id: int
+    customer_id: int
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    version: int
+    total: Optional[float]
+    items: List[OrderItemRow]
+
+
+ORDER_ROW_ADAPTER = TypeAdapter(OrderRow)
+ORDER_ROWS_ADAPTER = TypeAdapter(List[OrderRow])
+
+
+class OrderChange(BaseModel):
+    op: Literal["upsert", "delete"]
+    order_id: int
+    customer_id: int
+    changed_at: datetime
+    # Commande complète pour un upsert, absente pour une tombe
+    order: Optional[OrderResponse] = None
+
+
+class OrderChangesPage(BaseModel):
+    changes: List[OrderChange]
+    # À repasser en `since` ; inchangé si aucune modification
+    next_cursor: Optional[str] = None
+    has_more: bool = False
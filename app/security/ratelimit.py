@@ -0,0 +1,146 @@
+# app/security/ratelimit.py
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Protocol
+
+from fastapi import Depends, HTTPException, Request
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.security.security import AuthContext, require_read, require_write
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "http_rate_limited_total", "Requêtes refusées (429) par le rate limiter", ["scope"]
+)
+
+
+class Limit:
+    """Budget d'un token bucket : `rate` jetons/s, au plus `burst` en réserve."""
+
+    def __init__(self, per_minute: int, burst: int) -> None:
+        self.rate = max(per_minute, 1) / 60.0
+        self.burst = max(burst, 1)
+
+
+class Backend(Protocol):
+    async def acquire(self, key: str, limit: Limit) -> float:
+        """Consomme un jeton ; 0 si accepté, sinon délai (s) avant le prochain jeton."""
+        ...
+
+
+class MemoryBackend:
+    """Buckets en mémoire du process (un budget par worker). Accès depuis la boucle asyncio uniquement."""
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [jetons, instant]
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / limit.rate
+
+
+# Même algorithme côté Redis, atomique ; horloge du serveur Redis (commune à toutes les instances)
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """
+    Buckets partagés dans Redis (plusieurs workers / instances). En cas d'erreur Redis,
+    la requête passe (fail-open) : une panne du limiter ne doit pas couper l'API.
+    """
+
+    def __init__(self, url: str, prefix: str = "order-api:ratelimit:") -> None:
+        import redis.asyncio as redis  # dépendance optionnelle
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_SCRIPT)
+        self.prefix = prefix
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        try:
+            wait = await self._script(keys=[self.prefix + key], args=[limit.rate, limit.burst])
+        except Exception:
+            logger.warning("rate limit: Redis indisponible, requête acceptée", exc_info=True)
+            return 0.0
+        return float(wait)
+
+
+_backend: Optional[Backend] = None
+
+
+def _get_backend() -> Backend:
+    """Init paresseuse (le backend Redis n'est importé que s'il est configuré)."""
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = MemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+
+def client_key(auth: AuthContext, request: Request) -> str:
+    """Identité limitée : l'utilisateur authentifié, sinon l'IP cliente."""
+    if auth.user and auth.user != "unknown":
+        return f"user:{auth.user}"
+    client = request.client
+    return f"ip:{client.host if client else '-'}"
+
+
+async def _check(scope: str, limit: Limit, auth: AuthContext, request: Request) -> None:
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    wait = await _get_backend().acquire(f"{scope}:{client_key(auth, request)}", limit)
+    if wait > 0:
+        RATE_LIMITED.labels(scope).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+
+async def limit_read(request: Request, auth: AuthContext = Depends(require_read)) -> AuthContext:
+    """require_read + budget de lecture (429 + Retry-After une fois le budget épuisé)."""
+    await _check("read", Limit(settings.RATE_LIMIT_READ_PER_MIN, settings.RATE_LIMIT_READ_BURST), auth, request)
+    return auth
+
+
+async def limit_write(request: Request, auth: AuthContext = Depends(require_write)) -> AuthContext:
+    """require_write + budget d'écriture (429 + Retry-After une fois le budget épuisé)."""
+    await _check("write", Limit(settings.RATE_LIMIT_WRITE_PER_MIN, settings.RATE_LIMIT_WRITE_BURST), auth, request)
+    return auth
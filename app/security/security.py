@@ -6,8 +6,6 @@ import logging
 from fastapi import Header, HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-import jwt
-from jwt import PyJWKClient
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -24,10 +22,14 @@ class _Verifier:
     def __init__(self, jwks_url: str, issuer: str) -> None:
         if not jwks_url or not issuer:
             raise RuntimeError("KEYCLOAK_JWKS_URL / KEYCLOAK_ISSUER non configurés")
+        from jwt import PyJWKClient  # import différé : inutile en mode Gateway (headers)
+
         self._jwk = PyJWKClient(jwks_url)
         self._iss = issuer
 
     def decode(self, token: str) -> dict[str, Any]:
+        import jwt
+
         key = self._jwk.get_signing_key_from_jwt(token).key
         return jwt.decode(
             token,
@@ -1,25 +1,72 @@
 # app/services/order_services.py
 from __future__ import annotations
 
+import asyncio
+import base64
 import logging
-from datetime import datetime, timezone
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException
 
 from app.models.order_models import Order, OrderItem, OrderStatus
-from app.repositories.order_repositories import OrderRepository
-from app.schemas.order_schemas import OrderCreate
+from app.repositories.order_repositories import ChangePosition, OrderRepository, StatusChange
+from app.schemas.order_schemas import (
+    ORDER_ROW_ADAPTER,
+    ORDER_ROWS_ADAPTER,
+    OrderChange,
+    OrderChangesPage,
+    OrderCreate,
+    OrderResponse,
+    OrderStatusResult,
+)
 from app.infra.events.contracts import MessagePublisher
+from app.infra.events import outbox
+from app.infra.events.stream import order_stream
+from app.infra.events.waiters import price_waiters
+from app.core.executor import DbExecutor
+from app.core.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+Event = Tuple[str, dict]
+
+# Lectures identiques concurrentes (polling) : une requête DB, un JSON partagé (par process)
+order_reads: SingleFlight[bytes] = SingleFlight("order_get")
+order_list_reads: SingleFlight[bytes] = SingleFlight("order_list")
+
 
 class NotFoundError(Exception):
     """Exception levée si une commande n’existe pas."""
     pass
 
 
+class InvalidTransitionError(Exception):
+    """Changement de statut interdit par ORDER_TRANSITIONS."""
+
+    def __init__(self, current: OrderStatus, target: OrderStatus) -> None:
+        super().__init__(f"Invalid status transition: {current.value} -> {target.value}")
+        self.current = current
+        self.target = target
+
+
+# ---------- Curseurs du flux de changements ----------
+def encode_cursor(position: ChangePosition) -> str:
+    ts, order_id = position
+    raw = f"{ts.isoformat()}|{order_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ChangePosition:
+    """Lève ValueError si le curseur est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, order_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(order_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
 class OrderService:
     """
     Couche métier pour les commandes.
@@ -27,11 +74,44 @@ class OrderService:
     - Persiste les données uniquement après réception de `order.price_calculated`.
     """
 
-    def __init__(self, repository: OrderRepository, publisher: MessagePublisher):
+    def __init__(
+        self,
+        repository: OrderRepository,
+        publisher: MessagePublisher,
+        executor: Optional[DbExecutor] = None,
+        use_outbox: bool = False,
+        coalesce_reads: bool = False,
+    ):
         self.repository = repository
         self.publisher = publisher
+        # Si fourni, le travail DB synchrone part dans ce pool ; les publications restent sur la boucle
+        self.executor = executor
+        # Outbox : events écrits dans la transaction, publiés par le relai (pas de broker dans la requête)
+        self.use_outbox = use_outbox
+        # Single-flight sur get_order_json / list_orders_json
+        self.coalesce_reads = coalesce_reads
+
+    async def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.executor is None:
+            return fn(*args, **kwargs)
+        return await self.executor.run(fn, *args, **kwargs)
+
+    def _stage(self, order: Optional[Order], build: Callable[[], List[Event]]) -> None:
+        """Mode outbox, avant le COMMIT : events construits sur l'état flushé puis ajoutés à la transaction."""
+        db = self.repository.db
+        if order is not None:
+            db.flush()
+            db.refresh(order)
+        outbox.stage(db, build())
+
+    async def _emit(self, build: Callable[[], List[Event]]) -> None:
+        """Après le COMMIT : publication directe, ou simple réveil du relai en mode outbox."""
+        if self.use_outbox:
+            outbox.notify()
+            return
+        for routing_key, message in build():
+            await self.publisher.publish_message(routing_key, message)
 
-        
     # ==========================================================
     # === Lecture ==============================================
     # ==========================================================
@@ -46,84 +126,256 @@ class OrderService:
     def get_all_orders(self, skip: int = 0, limit: int = 100) -> List[Order]:
         return self.repository.list(skip=skip, limit=limit)
 
-    async def create_and_request_price(self, order_in: OrderCreate) -> Order:
+    # Lecture rapide (routes GET) : JSON construit depuis les lignes Core, sans objets ORM
+    def get_order_json(self, order_id: int) -> bytes:
+        if self.coalesce_reads:
+            return order_reads.do(order_id, self._get_order_json, order_id)
+        return self._get_order_json(order_id)
+
+    def _get_order_json(self, order_id: int) -> bytes:
+        row = self.repository.get_row(order_id)
+        if row is None:
+            raise NotFoundError(f"Order {order_id} not found")
+        return ORDER_ROW_ADAPTER.dump_json(row)
+
+    def list_orders_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        if self.coalesce_reads:
+            return order_list_reads.do((skip, limit), self._list_orders_json, skip, limit)
+        return self._list_orders_json(skip, limit)
+
+    def _list_orders_json(self, skip: int, limit: int) -> bytes:
+        return ORDER_ROWS_ADAPTER.dump_json(self.repository.list_rows(skip=skip, limit=limit))
+
+    def get_changes(self, since: Optional[str], limit: int = 500, settle_ms: int = 0) -> OrderChangesPage:
+        """
+        Page du flux de changements après le curseur `since` (upserts + tombes).
+        Les changements des `settle_ms` dernières ms sont retenus : une transaction horodatée
+        plus tôt mais commitée plus tard ne passe pas derrière le curseur.
+        """
+        after = decode_cursor(since) if since else None
+        until = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(milliseconds=settle_ms)
+        rows = self.repository.changes(after, until, limit + 1)
+
+        changes = []
+        for (changed_at, order_id), row in rows[:limit]:
+            if isinstance(row, Order):
+                order = OrderResponse.model_validate(row, from_attributes=True)
+                changes.append(OrderChange(op="upsert", order_id=order_id, customer_id=row.customer_id,
+                                           changed_at=changed_at, order=order))
+            else:
+                changes.append(OrderChange(op="delete", order_id=order_id, customer_id=row.customer_id,
+                                           changed_at=changed_at))
+        next_cursor = encode_cursor(rows[:limit][-1][0]) if rows else since
+        return OrderChangesPage(changes=changes, next_cursor=next_cursor, has_more=len(rows) > limit)
+
+    async def create_and_request_price(self, order_in: OrderCreate, wait_for_price_ms: int = 0) -> Order:
         """
         Crée une commande en base (statut PENDING) avec items (product_id + quantity).
         Ensuite publie deux événements :
         - customer.validate_request → pour vérifier que le client existe
         - order.request_price → pour calculer les prix et vérifier le stock
+        Avec `wait_for_price_ms` > 0, attend au plus ce délai `order.price_calculated` et
+        retourne la commande chiffrée (sinon la commande en attente, total=None).
         """
 
         if not order_in.items:
             raise HTTPException(status_code=400, detail="Order must contain at least one item")
 
         # 1. Persiste la commande minimale (status = PENDING)
-        db_order = self.repository.create(order_in)
+        db_order = await self._run(self._apply_create, order_in)
+        order_stream.publish_order("created", db_order)
+        # Enregistré avant la publication : la réponse ne peut pas arriver avant
+        waiter = price_waiters.register(db_order.id) if wait_for_price_ms > 0 else None
+
+        # 2. order.created puis order.request_price (calcul du prix)
+        try:
+            await self._emit(lambda: self._created_events(db_order, order_in))
+        except BaseException:
+            if waiter is not None:
+                price_waiters.discard(db_order.id, waiter)
+            raise
+        logger.info("[order.create] order %s price request sent", db_order.id)
+
+        if waiter is not None:
+            woken = await price_waiters.wait(db_order.id, waiter, wait_for_price_ms / 1000)
+            # Délai expiré : relecture quand même (réveil perdu, notification indisponible)
+            db_order = await self._run(self._load_priced, db_order)
+            if not woken:
+                logger.info(
+                    "[order.create] order %s not notified within %d ms (priced=%s)",
+                    db_order.id, wait_for_price_ms, db_order.total is not None,
+                )
+
+        return db_order
+
+    def _detach(self, order: Order) -> Order:
+        """
+        Charge les items, détache la commande et termine la transaction : la connexion retourne
+        au pool pendant la publication / l'attente du prix (le refresh après COMMIT en ouvre une).
+        """
+        list(order.items)
+        self.repository.db.expunge(order)
+        self.repository.db.commit()
+        return order
 
-        await self.publisher.publish_message("order.created", {
-            "order_id": db_order.id,
-            "customer_id": order_in.customer_id,
-            "created_at": db_order.created_at.isoformat() if db_order.created_at else None,
-        })
+    def _load_priced(self, pending: Order) -> Order:
+        # Relit total + items commités par le handler (autre session), transaction courte
+        order = self.repository.get(pending.id)
+        return self._detach(order) if order is not None else pending
 
+    def _apply_create(self, order_in: OrderCreate) -> Order:
+        if not self.use_outbox:
+            return self._detach(self.repository.create(order_in))
+        db_order = self.repository.create(order_in, commit=False)
+        self._stage(db_order, lambda: self._created_events(db_order, order_in))
+        self.repository.db.commit()
+        self.repository.db.refresh(db_order)
+        return self._detach(db_order)
 
-        # 3. Publie un event pour demander le calcul du prix
-        await self.publisher.publish_message(
-            "order.request_price",
+    @staticmethod
+    def _created_event(db_order: Order) -> Event:
+        return (
+            "order.created",
             {
+                "order_id": db_order.id,
+                "customer_id": db_order.customer_id,
+                "created_at": db_order.created_at.isoformat() if db_order.created_at else None,
+            },
+        )
+
+    @staticmethod
+    def _created_events(db_order: Order, order_in: OrderCreate) -> List[Event]:
+        return [
+            OrderService._created_event(db_order),
+            ("order.request_price", {
                 "order_id": db_order.id,
                 "customer_id": order_in.customer_id,
                 "items": [
                     {"product_id": i.product_id, "quantity": i.quantity}
                     for i in order_in.items
                 ],
-            },
-        )
-        logger.info("[order.create] order %s price request sent", db_order.id)
-
-        return db_order
+            }),
+        ]
 
     # ==========================================================
     # === Mise à jour du statut ================================
     # ==========================================================
-    async def update_order_status(self, order_id: int, new_status: OrderStatus, publish: bool = True):
-        order = self.repository.get(order_id)
-        if not order:
-            raise NotFoundError()
+    def _apply_status(self, order_id: int, new_status: OrderStatus, publish: bool = True) -> Tuple[Any, bool]:
+        """
+        Partie DB synchrone : un UPDATE conditionnel (compare-and-set selon ORDER_TRANSITIONS).
+        Retourne (ligne, modifiée ?) ; sans modification, la ligne courante distingue no-op,
+        transition refusée et commande absente.
+        """
+        db = self.repository.db
+        row, changed = self.repository.transition_status(order_id, new_status)
+        if row is None:
+            raise NotFoundError(f"Order {order_id} not found")
+        if not changed:
+            if row.status != new_status:
+                raise InvalidTransitionError(row.status, new_status)
+            return row, False
+
+        if publish and self.use_outbox:
+            outbox.stage(db, [self._status_event(row)])
+        db.commit()
+        return row, True
+
+    @staticmethod
+    def _status_event(order: Order) -> Event:
+        status = getattr(order.status, "value", str(order.status))
+        return (
+            f"order.{status.lower()}",
+            {
+                "order_id": order.id,
+                "customer_id": order.customer_id,
+                "status": status,
+                "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+            },
+        )
 
-        if order.status == new_status:
-            logger.info("[order.status] %s déjà en %s, no-op", order.id, new_status)
-            return order
+    async def update_order_status(self, order_id: int, new_status: OrderStatus, publish: bool = True):
+        """
+        Change le statut et retourne l'état résultant (id, customer_id, status, total, version, updated_at).
+        Lève NotFoundError, ou InvalidTransitionError si le statut courant ne permet pas la transition.
+        """
+        row, changed = await self._run(self._apply_status, order_id, new_status, publish)
 
-        old_status = order.status
-        order.status = new_status
-        self.repository.db.commit()
-        self.repository.db.refresh(order)
+        if not changed:
+            logger.info("[order.status] %s déjà en %s, no-op", row.id, new_status)
+            return row
 
+        order_stream.publish_order("status", row)
         if publish:
-            await self.publisher.publish_message(
-                f"order.{new_status.value.lower()}",
-                {
-                    "order_id": order.id,
-                    "customer_id": order.customer_id,
-                    "status": getattr(order.status, "value", str(order.status)),
-                    "updated_at": order.updated_at.isoformat() if order.updated_at else None,
-                },
-            )
-
-        logger.info("order status updated", extra={"id": order.id, "from": old_status, "to": new_status})
-        return order
+            await self._emit(lambda: [self._status_event(row)])
+
+        logger.info("order status updated", extra={"id": row.id, "to": new_status, "version": row.version})
+        return row
+
+    def _apply_statuses(self, changes: List[StatusChange], publish: bool) -> Tuple[list, Dict[int, Tuple[OrderStatus, int]]]:
+        """Partie DB synchrone, une transaction : (lignes modifiées, état des commandes non modifiées)."""
+        db = self.repository.db
+        try:
+            rows = self.repository.update_statuses(changes)
+            updated = {row.id for row in rows}
+            current = self.repository.status_versions([c[0] for c in changes if c[0] not in updated])
+            if publish and self.use_outbox and rows:
+                outbox.stage(db, [self._status_event(row) for row in rows])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return rows, current
+
+    async def update_statuses(self, changes: List[StatusChange], publish: bool = True) -> List[OrderStatusResult]:
+        """
+        Changements de statut en lot (order_ids distincts) : UPDATE ensemblistes dans une seule transaction,
+        events `order.<status>` publiés ensemble. Un résultat par changement, dans l'ordre reçu.
+        """
+        rows, current = await self._run(self._apply_statuses, changes, publish)
+
+        for row in rows:
+            order_stream.publish_order("status", row)
+        if publish and rows:
+            if self.use_outbox:
+                outbox.notify()
+            else:
+                # Une commande par event : pas d'ordre à préserver, publications en parallèle
+                await asyncio.gather(*(self.publisher.publish_message(*self._status_event(row)) for row in rows))
+
+        by_id = {row.id: row for row in rows}
+        results = []
+        for order_id, status, expected_version in changes:
+            row = by_id.get(order_id)
+            if row is not None:
+                results.append(OrderStatusResult(order_id=order_id, result="updated", status=row.status, version=row.version))
+            elif order_id not in current:
+                results.append(OrderStatusResult(order_id=order_id, result="not_found"))
+            else:
+                cur_status, cur_version = current[order_id]
+                if expected_version is not None and expected_version != cur_version:
+                    result = "conflict"
+                elif cur_status == status:
+                    result = "unchanged"
+                else:
+                    result = "invalid_transition"
+                results.append(OrderStatusResult(
+                    order_id=order_id, result=result, status=cur_status, version=cur_version,
+                ))
+        logger.info("order statuses updated", extra={"requested": len(changes), "updated": len(rows)})
+        return results
 
 
     # ==========================================================
     # === Mise à jour des items ================================
     # ==========================================================
     
-    async def update_order_items(self, order_id: int, items: list[dict]) -> Order:
+    def _apply_items(self, order_id: int, items: list[dict]) -> Tuple[Order, list, list]:
+        """Partie DB synchrone : applique les items, retourne (commande, deltas, items_payload)."""
         order = self.get_order(order_id)
 
         existing = {it.product_id: it for it in order.items}
         old_qty = {pid: it.quantity for pid, it in existing.items()}
+        before = {pid: (it.quantity, it.unit_price) for pid, it in existing.items()}
 
         for item in items:
             pid = item["product_id"]
@@ -153,10 +405,23 @@ class OrderService:
         keep_ids = {i["product_id"] for i in items}
         order.items[:] = [it for it in order.items if it.product_id in keep_ids]
 
+        # Items modifiés : updated_at explicite (UTC, comme le flux de changements), ce qui réécrit la
+        # ligne de commande et fait incrémenter `version` par le mapper (version_id_col)
+        if {it.product_id: (it.quantity, it.unit_price) for it in order.items} != before:
+            order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
         self.repository.db.add(order)
+        if self.use_outbox:
+            self._stage(order, lambda: self._items_events(order, *self._items_diff(order, old_qty)))
         self.repository.db.commit()
         self.repository.db.refresh(order)
 
+        deltas, items_payload = self._items_diff(order, old_qty)
+        return order, deltas, items_payload
+
+    @staticmethod
+    def _items_diff(order: Order, old_qty: dict) -> Tuple[list, list]:
+        """(deltas de quantité par produit, items_payload) après application des items."""
         new_qty = {it.product_id: it.quantity for it in order.items}
         for pid in set(old_qty) - set(new_qty):
             new_qty[pid] = 0
@@ -167,7 +432,11 @@ class OrderService:
             if new_qty[pid] - old_qty.get(pid, 0) != 0
         ]
 
-        items_payload = [
+        return deltas, OrderService._items_payload(order)
+
+    @staticmethod
+    def _items_payload(order: Order) -> list:
+        return [
             {
                 "product_id": it.product_id,
                 "quantity": it.quantity,
@@ -177,21 +446,27 @@ class OrderService:
             for it in order.items
         ]
 
-        await self.publisher.publish_message(
-            "order.updated",
-            {
+    @staticmethod
+    def _items_events(order: Order, deltas: list, items_payload: list) -> List[Event]:
+        events: List[Event] = [
+            ("order.updated", {
                 "order_id": order.id,
                 "status": getattr(order.status, "value", order.status),
                 "items": items_payload,
                 "updated_at": order.updated_at.isoformat(),
-            },
-        )
-
+            }),
+        ]
         if deltas:
-            await self.publisher.publish_message(
+            events.append((
                 "order.items_delta",
                 {"order_id": order.id, "deltas": deltas, "updated_at": order.updated_at.isoformat()},
-            )
+            ))
+        return events
+
+    async def update_order_items(self, order_id: int, items: list[dict]) -> Order:
+        order, deltas, items_payload = await self._run(self._apply_items, order_id, items)
+
+        await self._emit(lambda: self._items_events(order, deltas, items_payload))
 
         logger.info("[order.items] updated", extra={"id": order.id, "deltas": deltas})
         return order
@@ -199,7 +474,8 @@ class OrderService:
     # ==========================================================
     # === Suppression ==========================================
     # ==========================================================
-    async def delete_order(self, order_id: int) -> Order:
+    def _apply_delete(self, order_id: int) -> Tuple[Order, Optional[Order], list]:
+        """Partie DB synchrone : (commande, supprimée, items_payload)."""
         order = self.get_order(order_id)
 
         items_payload = [
@@ -212,18 +488,30 @@ class OrderService:
             for i in order.items
         ]
 
+        if self.use_outbox:
+            # repository.delete() fait le COMMIT : l'event part dans la même transaction
+            self._stage(None, lambda: [self._deleted_event(order, items_payload)])
         deleted = self.repository.delete(order.id)
+        return order, deleted, items_payload
 
-        await self.publisher.publish_message(
+    @staticmethod
+    def _deleted_event(order: Order, items_payload: list) -> Event:
+        return (
             "order.deleted",
             {
-                "order_id": order_id,
+                "order_id": order.id,
                 "customer_id": order.customer_id,
                 "status": getattr(order.status, "value", order.status),
                 "items": items_payload,
                 "deleted_at": datetime.now(timezone.utc).isoformat(),
             },
         )
+
+    async def delete_order(self, order_id: int) -> Order:
+        order, deleted, items_payload = await self._run(self._apply_delete, order_id)
+        order_stream.publish("deleted", order.id, order.customer_id, {"order_id": order.id, "customer_id": order.customer_id})
+
+        await self._emit(lambda: [self._deleted_event(order, items_payload)])
         logger.info("order deleted", extra={"order_id": order_id})
         return deleted
 
@@ -0,0 +1,86 @@
+"""
+Worker d'events autonome : consomme `order-events` (ou les lanes EVENTS_LANES) sans servir HTTP.
+
+    python -m app.worker
+
+- un consumer supervisé par lane (relancé en cas d'arrêt/crash),
+- concurrence via EVENTS_CONCURRENCY, micro-batching via EVENTS_BATCH_SIZE,
+- métriques Prometheus sur WORKER_METRICS_PORT.
+Côté API, désactiver la consommation avec EVENTS_CONSUME_IN_API=false.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+
+from app.core.config import settings
+from app.core.db import startup_db
+from app.core.executor import db_executor
+from app.core.log import setup_logging
+from app.infra.events.consumer import spawn_lanes, spawn_notifier, spawn_outbox_relay
+from app.infra.events.rabbitmq import rabbitmq, start_consumer
+
+logger = logging.getLogger("app.worker")
+
+
+async def _connect(max_backoff: float = 30.0) -> None:
+    """Connexion initiale à RabbitMQ, réessayée jusqu'au succès."""
+    backoff = 1.0
+    while True:
+        try:
+            await rabbitmq.connect()
+            return
+        except Exception as e:
+            logger.warning("[worker] RabbitMQ indisponible (%s), nouvel essai dans %.1fs", e, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+
+async def run(stop: asyncio.Event) -> None:
+    # Tables processed_events / outbox / orders (selon DB_INIT_MODE), en parallèle de la connexion broker
+    db_result, _ = await asyncio.gather(asyncio.to_thread(startup_db), _connect(), return_exceptions=True)
+    if isinstance(db_result, BaseException):
+        logger.error("[worker] initialisation DB impossible", exc_info=db_result)
+    consumers = spawn_lanes(start_consumer, rabbitmq)
+    relay = spawn_outbox_relay(rabbitmq)
+    if relay is not None:
+        consumers.append(relay)
+    # Publication seule : réveils wait_for_price et flux SSE des process API
+    notify = spawn_notifier(rabbitmq, consume=False)
+    if notify is not None:
+        consumers.append(notify)
+    logger.info("[worker] %d consumer(s) lancé(s) (batch=%d)", len(consumers), settings.EVENTS_BATCH_SIZE)
+
+    await stop.wait()
+
+    logger.info("[worker] arrêt demandé")
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    await rabbitmq.disconnect()
+
+
+async def main() -> None:
+    setup_logging()
+    start_http_server(settings.WORKER_METRICS_PORT)
+    logger.info("[worker] métriques Prometheus sur :%d", settings.WORKER_METRICS_PORT)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await run(stop)
+    finally:
+        db_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark de démarrage à froid : temps entre le lancement du process et le premier 200 sur /health.
+
+    python benchmarks/bench_cold_start.py [--runs 10] [--database-url postgresql+psycopg://...]
+
+Lance `python -m app` (1 worker, EVENTS_BROKER=memory) pour chaque DB_INIT_MODE
+("create_all" et "version") sur une base déjà initialisée (un premier démarrage non mesuré
+sert d'amorçage), puis affiche médiane / min / max. Sans --database-url, SQLite temporaire.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cold_start(env: dict, cwd: str, timeout: float = 60.0) -> float:
+    """Secondes entre Popen et le premier 200 sur /health (le process est ensuite arrêté)."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(url).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass
+                if proc.poll() is not None:
+                    raise RuntimeError(f"le serveur s'est arrêté (code {proc.returncode})")
+                time.sleep(0.005)
+        raise TimeoutError(f"pas de 200 sur {url} après {timeout}s")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            EVENTS_BROKER="memory",
+            SQLITE_PATH=os.path.join(tmp, "order.db"),
+            LOG_DIR=os.path.join(tmp, "logs"),
+            LOG_ENABLE_CONSOLE="false",
+        )
+        env.pop("TESTING", None)
+        if args.database_url:
+            env["DATABASE_URL"] = args.database_url
+
+        print(f"{'DB_INIT_MODE':<14}{'runs':>6}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+        for mode in ("create_all", "version"):
+            mode_env = dict(env, DB_INIT_MODE=mode)
+            cold_start(mode_env, tmp)  # amorçage : tables + schema_version
+            samples = [cold_start(mode_env, tmp) * 1000 for _ in range(args.runs)]
+            print(
+                f"{mode:<14}{len(samples):>6}{statistics.median(samples):>12.1f}"
+                f"{min(samples):>10.1f}{max(samples):>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
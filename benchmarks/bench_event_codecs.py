@@ -0,0 +1,62 @@
+"""
+Benchmark des codecs d'events sur des payloads `order.request_price` réalistes.
+
+    python benchmarks/bench_event_codecs.py [--repeat 2000]
+
+Compare l'ancien chemin (json.dumps().encode() / json.loads(body.decode()))
+aux codecs de app.infra.events.codecs (orjson, msgpack si installé).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.infra.events.codecs import _CODECS, JSON  # noqa: E402
+
+
+def request_price_payload(n_items: int) -> dict:
+    return {
+        "order_id": 123456,
+        "customer_id": 987,
+        "items": [
+            {"product_id": 1000 + i, "quantity": (i % 7) + 1}
+            for i in range(n_items)
+        ],
+    }
+
+
+class StdlibJson:
+    content_type = "application/json"
+
+    def encode(self, message):
+        return json.dumps(message).encode("utf-8")
+
+    def decode(self, body):
+        return json.loads(body.decode("utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    codecs = [StdlibJson(), JSON] + [c for ct, c in _CODECS.items() if c is not JSON and ct == c.content_type]
+
+    print(f"{'codec':<28}{'items':>7}{'bytes':>9}{'encode µs':>12}{'decode µs':>12}")
+    for n_items in (10, 100, 1000):
+        payload = request_price_payload(n_items)
+        for codec in codecs:
+            body = codec.encode(payload)
+            assert codec.decode(body) == payload
+            enc = timeit.timeit(lambda: codec.encode(payload), number=args.repeat) / args.repeat
+            dec = timeit.timeit(lambda: codec.decode(body), number=args.repeat) / args.repeat
+            print(f"{type(codec).__name__:<28}{n_items:>7}{len(body):>9}{enc * 1e6:>12.2f}{dec * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark bout en bout du pipeline create → price → confirm, sans réseau.
+
+    python benchmarks/bench_event_pipeline.py [--orders 500] [--items 5] [--clients 8]
+
+- broker en mémoire (EVENTS_BROKER=memory), SQLite temporaire ;
+- POST /orders/ via httpx + ASGITransport (même boucle que le consumer) ;
+- des stubs product/customer répondent à order.request_price et order.ready_for_stock.
+Les réglages du consumer (EVENTS_CONCURRENCY, EVENTS_BATCH_SIZE, ...) se passent par l'env.
+NB : garder --clients sous la taille du pool SQLAlchemy (5 + 10 overflow) : les routes async
+font leur travail DB sur la boucle, un pool épuisé y bloque donc tout le process.
+Le micro-batching garde le verrou d'écriture SQLite pendant tout le lot : pour
+EVENTS_BATCH_SIZE > 1, pointer DATABASE_URL vers Postgres.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+_tmp = tempfile.mkdtemp(prefix="order-bench-")
+os.environ.setdefault("EVENTS_BROKER", "memory")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.infra.events.rabbitmq import rabbitmq  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.models.order_models import Order, OrderStatus  # noqa: E402
+from app.security.security import AuthContext, require_read, require_write  # noqa: E402
+
+
+async def _stub_services(payload: dict, rk: str) -> None:
+    """Simule product-api (prix, stock) et customer-api (validation)."""
+    if rk == "order.request_price":
+        items = [dict(it, unit_price=9.9) for it in payload["items"]]
+        await rabbitmq.publish_message("order.price_calculated", {
+            "order_id": payload["order_id"],
+            "customer_id": payload["customer_id"],
+            "items": items,
+            "total": round(sum(9.9 * it["quantity"] for it in items), 2),
+        })
+        await rabbitmq.publish_message("order.customer_validated", {
+            "order_id": payload["order_id"],
+            "customer_id": payload["customer_id"],
+        })
+    elif rk == "order.ready_for_stock":
+        await rabbitmq.publish_message("order.confirmed", {"order_id": payload["order_id"]})
+
+
+def _confirmed_count() -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(func.count()).select_from(Order).where(Order.status == OrderStatus.CONFIRMED)
+        ).scalar_one()
+    finally:
+        db.close()
+
+
+async def run(orders: int, items: int, clients: int) -> None:
+    ctx = AuthContext(user="bench", email=None, roles=["order:read", "order:write"])
+    app.dependency_overrides[require_read] = lambda: ctx
+    app.dependency_overrides[require_write] = lambda: ctx
+
+    async with lifespan(app):
+        stubs = asyncio.create_task(rabbitmq.start_consumer(
+            rabbitmq.connection, rabbitmq.exchange, rabbitmq.exchange_type,
+            queue_name="bench-stubs",
+            patterns=["order.request_price", "order.ready_for_stock"],
+            handler=_stub_services,
+        ))
+        await asyncio.sleep(0.05)
+
+        body = {"customer_id": 1, "items": [{"product_id": p, "quantity": 2} for p in range(items)]}
+        slots = asyncio.Semaphore(clients)
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def create() -> None:
+                async with slots:
+                    r = await client.post("/orders/", json=body)
+                    r.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(create() for _ in range(orders)))
+            http_done = time.perf_counter() - start
+
+            while _confirmed_count() < orders:
+                await asyncio.sleep(0.02)
+            pipeline_done = time.perf_counter() - start
+
+        stubs.cancel()
+
+    print(f"orders={orders} items/order={items} http clients={clients}")
+    print(f"HTTP create     : {http_done:8.3f}s  ({orders / http_done:8.1f} orders/s)")
+    print(f"create→confirmed: {pipeline_done:8.3f}s  ({orders / pipeline_done:8.1f} orders/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, args.items, args.clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Requêtes/s sur /health : anciens middlewares `@app.middleware("http")` vs RequestContextMiddleware.
+
+    python benchmarks/bench_http_middleware.py [--requests 5000] [--clients 16]
+
+En process (httpx + ASGITransport), sans serveur : mesure le coût des couches de middleware.
+"legacy" reproduit access_log_middleware + metrics_middleware tels qu'ils étaient dans app/main.py
+(deux BaseHTTPMiddleware, time.time()).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.core.middleware import REQUEST_COUNT, REQUEST_LATENCY, RequestContextMiddleware  # noqa: E402
+
+
+def _health_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    app = _health_app()
+
+    async def access_log_middleware(request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        extra = {
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path,
+            "client_ip": request.client.host if request.client else "-",
+            "user_agent": request.headers.get("user-agent", "-"),
+        }
+        start = time.time()
+        response = await call_next(request)
+        extra["status"] = int(response.status_code)
+        extra["latency_ms"] = round((time.time() - start) * 1000, 2)
+        logging.getLogger("app.access").info("request", extra=extra)
+        return response
+
+    async def metrics_middleware(request: Request, call_next):
+        start = time.time()
+        response = await call_next(request)
+        duration = time.time() - start
+        path = request.url.path
+        REQUEST_COUNT.labels(request.method, path, str(response.status_code)).inc()
+        REQUEST_LATENCY.labels(request.method, path).observe(duration)
+        return response
+
+    app.middleware("http")(access_log_middleware)
+    app.middleware("http")(metrics_middleware)
+    return app
+
+
+def asgi_app() -> FastAPI:
+    app = _health_app()
+    app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def bench(app: FastAPI, requests: int, clients: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    per_client = requests // clients
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            for _ in range(per_client):
+                r = await client.get("/health")
+                r.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(clients)))  # chauffe
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return per_client * clients / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for name, factory in (("legacy (2 x BaseHTTPMiddleware)", legacy_app), ("RequestContextMiddleware", asgi_app)):
+        rps = asyncio.run(bench(factory(), args.requests, args.clients))
+        print(f"{name:32s}: {rps:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Sérialisation d'une page GET /orders/ : 100 commandes × 10 items.
+
+    python benchmarks/bench_order_serialization.py [--orders 100] [--items 10] [--rounds 200]
+
+- orm      : objets ORM (items en lazy load) → validation response_model → jsonable → json.dumps
+             (chemin FastAPI historique) ;
+- core     : lignes Core (2 requêtes) → TypeAdapter(List[OrderRow]).dump_json (chemin actuel) ;
+- core-raw : lignes Core → orjson.dumps (borne basse).
+Lecture SQLite temporaire comprise ; temps médian par page.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_tmp = tempfile.mkdtemp(prefix="order-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.db import SessionLocal, init_db  # noqa: E402
+from app.models.order_models import Order, OrderItem  # noqa: E402
+from app.repositories.order_repositories import OrderRepository  # noqa: E402
+from app.schemas.order_schemas import ORDER_ROWS_ADAPTER, OrderResponse  # noqa: E402
+
+_LEGACY_ADAPTER = TypeAdapter(List[OrderResponse])
+
+
+def _seed(orders: int, items: int) -> None:
+    init_db()
+    db = SessionLocal()
+    for o in range(orders):
+        order = Order(customer_id=o, total=10.0 * items)
+        for p in range(items):
+            order.items.append(OrderItem(product_id=p, quantity=1, unit_price=10.0, line_total=10.0))
+        db.add(order)
+    db.commit()
+    db.close()
+
+
+def _orm(limit: int) -> bytes:
+    db = SessionLocal()
+    try:
+        orders = OrderRepository(db).list(limit=limit)
+        validated = _LEGACY_ADAPTER.validate_python(orders, from_attributes=True)
+        return json.dumps(jsonable_encoder(_LEGACY_ADAPTER.dump_python(validated, mode="json"))).encode()
+    finally:
+        db.close()
+
+
+def _core(limit: int) -> bytes:
+    db = SessionLocal()
+    try:
+        return ORDER_ROWS_ADAPTER.dump_json(OrderRepository(db).list_rows(limit=limit))
+    finally:
+        db.close()
+
+
+def _core_raw(limit: int) -> bytes:
+    db = SessionLocal()
+    try:
+        return orjson.dumps(OrderRepository(db).list_rows(limit=limit))
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    _seed(args.orders, args.items)
+
+    # Même contenu JSON pour les trois chemins
+    assert json.loads(_orm(args.orders)) == json.loads(_core(args.orders))
+
+    print(f"page de {args.orders} commandes x {args.items} items, {args.rounds} tours")
+    for name, fn in (("orm", _orm), ("core", _core), ("core-raw", _core_raw)):
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            fn(args.orders)
+            timings.append(time.perf_counter() - start)
+        print(f"{name:9s}: {statistics.median(timings) * 1000:7.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.infra.events.autotune import AdaptiveController, ConcurrencyLimiter, db_pool_saturation
+
+pytestmark = pytest.mark.asyncio
+
+
+def _controller(**kwargs):
+    pool = kwargs.pop("pool", MagicMock(size=lambda: 10, checkedout=lambda: 0, _max_overflow=0))
+    defaults = dict(
+        queue="q", concurrency=4, concurrency_bounds=(1, 8), prefetch_bounds=(2, 12),
+        target_latency_ms=100, interval_s=0.01, pool=pool,
+    )
+    defaults.update(kwargs)
+    return AdaptiveController(**defaults)
+
+
+async def test_limiter_resize_wakes_waiters_in_order():
+    limiter = ConcurrencyLimiter(1)
+    await limiter.acquire()
+    order = []
+
+    async def waiter(i):
+        await limiter.acquire()
+        order.append(i)
+
+    tasks = [asyncio.create_task(waiter(i)) for i in range(3)]
+    await asyncio.sleep(0)
+    assert order == []
+
+    limiter.set_limit(3)
+    await asyncio.sleep(0)
+    assert order == [0, 1]
+    limiter.release()
+    await asyncio.sleep(0)
+    assert order == [0, 1, 2]
+    assert limiter.in_use == 3
+    await asyncio.gather(*tasks)
+
+
+async def test_limiter_cancelled_waiter_does_not_leak_slot():
+    limiter = ConcurrencyLimiter(1)
+    await limiter.acquire()
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    limiter.release()
+    assert limiter.in_use == 0
+
+
+async def test_db_pool_saturation():
+    pool = MagicMock(size=lambda: 5, checkedout=lambda: 6, _max_overflow=5)
+    assert db_pool_saturation(pool) == 0.6
+    assert db_pool_saturation(object()) == 0.0
+
+
+async def test_controller_increases_when_fast_and_busy():
+    ctl = _controller()
+    for _ in range(10):
+        ctl.observe(0.01)
+    assert ctl.decide(busy=True) == (5, 10)
+    # pas de trafic → aucune donnée → pas de changement
+    assert ctl.decide(busy=True) == (5, 10)
+
+
+async def test_controller_backs_off_on_latency_or_db_saturation():
+    ctl = _controller(concurrency=8)
+    for _ in range(10):
+        ctl.observe(0.5)
+    assert ctl.decide(busy=True) == (5, 10)
+
+    saturated = MagicMock(size=lambda: 5, checkedout=lambda: 5, _max_overflow=0)
+    ctl = _controller(concurrency=8, pool=saturated)
+    ctl.observe(0.01)
+    assert ctl.decide(busy=True) == (5, 10)
+
+
+async def test_controller_respects_bounds():
+    ctl = _controller(concurrency=1)
+    ctl.observe(1.0)
+    assert ctl.decide(busy=False) == (1, 2)
+
+
+async def test_controller_run_applies_qos_and_limit():
+    ctl = _controller()
+    limiter = ConcurrencyLimiter(ctl.concurrency)
+    for _ in range(4):
+        await limiter.acquire()
+    for _ in range(10):
+        ctl.observe(0.01)
+    channel = AsyncMock()
+
+    task = asyncio.create_task(ctl.run(channel, limiter))
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    channel.set_qos.assert_any_await(prefetch_count=10)
+    assert limiter.limit == 5
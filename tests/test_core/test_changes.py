@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import update
+
+from app.core.db import SessionLocal
+from app.models.order_models import Order, OrderStatus
+from app.repositories.order_repositories import OrderRepository
+from app.schemas.order_schemas import OrderCreate
+from app.services.order_services import OrderService, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def svc():
+    db = SessionLocal()
+    yield OrderService(OrderRepository(db), AsyncMock())
+    db.close()
+
+
+def _create(svc, n):
+    ids = [svc.repository.create(OrderCreate(customer_id=i, items=[])).id for i in range(n)]
+    # Vieillies d'une heure : les changements suivants tombent sur un horodatage plus récent
+    # (SQLite horodate à la seconde ; en prod c'est la fenêtre ORDERS_CHANGES_SETTLE_MS qui le garantit)
+    db = svc.repository.db
+    db.execute(update(Order).values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+    db.commit()
+    return ids
+
+
+def _sync(svc, since=None, limit=2):
+    """Suit le flux jusqu'au bout ; retourne (ops, curseur)."""
+    ops = []
+    while True:
+        page = svc.get_changes(since, limit=limit)
+        ops += [(c.op, c.order_id) for c in page.changes]
+        since = page.next_cursor
+        if not page.has_more:
+            return ops, since
+
+
+def test_pages_cover_every_order_once(svc):
+    ids = _create(svc, 5)
+    ops, cursor = _sync(svc)
+    assert ops == [("upsert", i) for i in ids]
+    assert cursor is not None
+    # Rien de neuf : page vide, curseur inchangé
+    page = svc.get_changes(cursor)
+    assert page.changes == [] and page.next_cursor == cursor
+
+
+@pytest.mark.asyncio
+async def test_updates_and_deletes_after_the_cursor(svc):
+    ids = _create(svc, 3)
+    _, cursor = _sync(svc)
+
+    await svc.update_order_status(ids[0], OrderStatus.CONFIRMED, publish=False)
+    await svc.delete_order(ids[1])
+
+    page = svc.get_changes(cursor)
+    assert sorted((c.op, c.order_id) for c in page.changes) == [("delete", ids[1]), ("upsert", ids[0])]
+    upsert = next(c for c in page.changes if c.op == "upsert")
+    assert upsert.order.status == "confirmed"
+    tomb = next(c for c in page.changes if c.op == "delete")
+    assert tomb.order is None and tomb.customer_id == 1
+
+
+def test_recent_changes_are_held_back(svc):
+    svc.repository.create(OrderCreate(customer_id=1, items=[]))
+    assert svc.get_changes(None, settle_ms=60_000).changes == []
+
+
+def test_cursor_roundtrip_and_invalid_cursor(svc):
+    _create(svc, 1)
+    page = svc.get_changes(None, limit=1)
+    position = (page.changes[0].changed_at, page.changes[0].order_id)
+    assert decode_cursor(page.next_cursor) == position
+    assert decode_cursor(encode_cursor(position)) == position
+    with pytest.raises(ValueError):
+        svc.get_changes("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_item_changes_move_the_order_past_the_cursor(svc):
+    order_id = svc.repository.create(OrderCreate(customer_id=1, items=[])).id
+    await svc.update_order_items(order_id, [{"product_id": 1, "quantity": 1, "unit_price": 2.0}])
+    _create(svc, 0)  # vieillit la commande
+    _, cursor = _sync(svc)
+
+    order = await svc.update_order_items(order_id, [{"product_id": 1, "quantity": 3}])
+
+    assert order.version == 3
+    page = svc.get_changes(cursor)
+    assert [(c.op, c.order_id) for c in page.changes] == [("upsert", order_id)]
+    assert page.changes[0].order.items[0].quantity == 3
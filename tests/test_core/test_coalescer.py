@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.infra.events.coalescer import StatusCoalescer, current_status
+from app.infra.events.consumer import STATUS_EVENTS
+from app.infra.events.dispatcher import handle_event
+from app.infra.events.memory import InMemoryBroker
+from app.infra.events.rabbitmq import start_consumer
+from app.models.order_models import Order, OrderStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _pending(order_id):
+    return OrderStatus.PENDING
+
+
+async def _consume(events, concurrency=1, window_ms=30, handler=None, coalescer=True):
+    """Publie `events` puis consomme (avec coalescing par défaut) ; retourne les appels au handler."""
+    broker = InMemoryBroker()
+    await broker.connect()
+    calls = []
+
+    async def record(payload, rk):
+        calls.append((rk, payload["order_id"]))
+        if handler is not None:
+            await handler(payload, rk)
+
+    consumer = asyncio.create_task(broker.start_consumer(
+        broker.connection, broker.exchange, broker.exchange_type,
+        queue_name="q", patterns=["order.#", "customer.#"], handler=record, concurrency=concurrency,
+        coalescer=StatusCoalescer(
+            # Handler réel : statut lu en base ; sinon commandes supposées en attente
+            STATUS_EVENTS, window_ms=window_ms, status_of=current_status if handler is not None else _pending,
+        ) if coalescer else None,
+    ))
+    await asyncio.sleep(0.01)
+    for rk, order_id in events:
+        await broker.publish_message(rk, {"order_id": order_id})
+
+    await asyncio.sleep(window_ms / 1000 + 0.05)
+    queue = broker.queue("q")
+    for _ in range(100):
+        if queue.depth == 0 and not queue._unacked:
+            break
+        await asyncio.sleep(0.02)
+    assert queue.depth == 0 and not queue._unacked
+    await broker.disconnect()
+    await consumer
+    return calls
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+async def test_burst_keeps_the_last_allowed_transition(concurrency):
+    calls = await _consume([
+        ("order.confirmed", 1),
+        ("order.confirmed", 2),
+        ("order.rejected", 1),  # confirmed → rejected interdit : ignoré
+        ("customer.delete_order", 1),
+    ], concurrency=concurrency)
+
+    assert sorted(calls) == [("customer.delete_order", 1), ("order.confirmed", 2)]
+
+
+def _order_status(order_id):
+    db = SessionLocal()
+    try:
+        return db.get(Order, order_id).status
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("events, final", [
+    (["order.confirmed", "order.rejected"], OrderStatus.CONFIRMED),
+    (["order.rejected", "customer.delete_order"], OrderStatus.REJECTED),
+    (["customer.delete_order", "order.rejected"], OrderStatus.CANCELLED),
+    (["order.confirmed", "customer.delete_order"], OrderStatus.CANCELLED),
+])
+async def test_coalesced_result_matches_one_by_one(events, final):
+    results = {}
+    for coalesce in (False, True):
+        db = SessionLocal()
+        order = Order(customer_id=1)
+        db.add(order)
+        db.commit()
+        order_id = order.id
+        db.close()
+
+        await _consume([(rk, order_id) for rk in events], handler=handle_event, coalescer=coalesce)
+        results[coalesce] = _order_status(order_id)
+
+    assert results == {False: final, True: final}
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+async def test_customer_validated_is_never_absorbed(concurrency):
+    # Son handler publie order.ready_for_stock : chaque occurrence doit être traitée
+    assert "order.customer_validated" not in STATUS_EVENTS
+    calls = await _consume([
+        ("order.customer_validated", 1),
+        ("order.rejected", 1),
+        ("order.customer_validated", 1),
+        ("order.confirmed", 1),
+    ], concurrency=concurrency)
+
+    assert calls == [
+        ("order.customer_validated", 1),
+        ("order.rejected", 1),
+        ("order.customer_validated", 1),
+        ("order.confirmed", 1),
+    ]
+
+
+async def test_indirect_final_status_replays_each_step():
+    # rejected → pending → confirmed : confirmed n'est pas atteignable directement depuis rejected
+    coalescer = StatusCoalescer(dict(STATUS_EVENTS, **{"order.revalidated": OrderStatus.PENDING}))
+    entries = [(None, {}, "order.revalidated"), (None, {}, "order.confirmed"), (None, {}, "order.rejected")]
+    assert coalescer._plan(OrderStatus.REJECTED, entries) == [0, 1]
+    assert coalescer._plan(None, entries) == [2]
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+async def test_other_event_flushes_pending_group_first(concurrency):
+    calls = await _consume([
+        ("order.rejected", 1),
+        ("order.price_calculated", 1),
+        ("order.confirmed", 1),
+    ], concurrency=concurrency)
+
+    assert calls == [
+        ("order.rejected", 1),
+        ("order.price_calculated", 1),
+        ("order.confirmed", 1),
+    ]
+
+
+async def test_pending_group_redelivered_if_consumer_stops():
+    broker = InMemoryBroker()
+    await broker.connect()
+    handler_calls = []
+
+    async def handler(payload, rk):
+        handler_calls.append(rk)
+
+    consumer = asyncio.create_task(start_consumer(
+        broker, broker.exchange, broker.exchange_type, "q", ["order.#"], handler,
+        coalescer=StatusCoalescer(STATUS_EVENTS, window_ms=10_000),
+    ))
+    await asyncio.sleep(0.01)
+    await broker.publish_message("order.confirmed", {"order_id": 1})
+    await asyncio.sleep(0.01)
+
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+
+    assert handler_calls == []
+    assert broker.queue("q").depth == 1
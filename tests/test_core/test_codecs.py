@@ -0,0 +1,31 @@
+import pytest
+
+from app.infra.events.codecs import JSON, JsonCodec, codec_by_name, get_codec
+
+
+def test_json_codec_roundtrip_from_memoryview():
+    payload = {"order_id": 1, "items": [{"product_id": 2, "quantity": 3}], "total": 9.5}
+    body = JSON.encode(payload)
+    assert isinstance(body, bytes)
+    assert JSON.decode(memoryview(body)) == payload
+
+
+def test_get_codec_negotiation_defaults_to_json():
+    assert get_codec(None) is JSON
+    assert get_codec("application/json; charset=utf-8") is JSON
+    assert get_codec("text/unknown") is JSON
+
+
+def test_codec_by_name_fallback(caplog):
+    assert isinstance(codec_by_name("json"), JsonCodec)
+    assert codec_by_name("avro") is JSON
+    assert "fallback JSON" in caplog.text
+
+
+def test_msgpack_codec_roundtrip():
+    pytest.importorskip("msgpack")
+    codec = codec_by_name("msgpack")
+    assert codec.content_type == "application/msgpack"
+    assert get_codec("application/msgpack") is codec
+    payload = {"order_id": 1, "items": [{"product_id": 2, "quantity": 3}]}
+    assert codec.decode(codec.encode(payload)) == payload
@@ -0,0 +1,89 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.compression import COMPRESSION_BYTES, CompressionMiddleware, available_encodings, negotiate
+
+BIG = b'{"items": [' + b",".join(b'{"product_id": 1, "quantity": 2}' for _ in range(200)) + b"]}"
+
+
+def _app(minimum_size=1024):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=minimum_size)
+
+    @app.get("/big")
+    def big():
+        return Response(BIG, media_type="application/json")
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BIG, BIG]), media_type="application/json")
+
+    @app.get("/sse")
+    def sse():
+        return StreamingResponse(iter([b"data: x\n\n"] * 200), media_type="text/event-stream")
+
+    return app
+
+
+async def _get(path, accept="gzip", app=None):
+    transport = httpx.ASGITransport(app=app or _app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"accept-encoding": accept})
+
+
+def test_negotiate_follows_server_preference_and_q_values():
+    assert negotiate("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate("br;q=0, gzip;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate("*", ["gzip"]) == "gzip"
+    assert negotiate("identity", ["gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+
+
+def test_unavailable_encodings_are_ignored():
+    assert available_encodings("nope, gzip") == ["gzip"]
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped_and_counted():
+    before = COMPRESSION_BYTES.labels("gzip", "uncompressed")._value.get()
+    r = await _get("/big")
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(BIG)
+    assert r.content == BIG  # httpx décompresse
+    assert COMPRESSION_BYTES.labels("gzip", "uncompressed")._value.get() == before + len(BIG)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/small", "/not-modified", "/sse"])
+async def test_skipped_responses(path):
+    r = await _get(path)
+    assert "content-encoding" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_client_without_gzip_gets_identity():
+    r = await _get("/big", accept="identity")
+    assert "content-encoding" not in r.headers and r.content == BIG
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_is_compressed_on_the_fly():
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", "/stream", headers={"accept-encoding": "gzip"}) as r:
+            raw = b"".join([chunk async for chunk in r.aiter_raw()])
+    assert r.headers["content-encoding"] == "gzip" and "content-length" not in r.headers
+    assert gzip.decompress(raw) == BIG + BIG
@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.db import SessionLocal
+from app.models.order_models import Order, OrderStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+def _create_order(customer_id: int = 1) -> int:
+    db = SessionLocal()
+    try:
+        order = Order(customer_id=customer_id, status=OrderStatus.PENDING)
+        db.add(order)
+        db.commit()
+        return order.id
+    finally:
+        db.close()
+
+
+def _get_order(order_id: int):
+    db = SessionLocal()
+    try:
+        return db.get(Order, order_id)
+    finally:
+        db.close()
+
+
+# ---------- dispatch ----------
+async def test_dispatch_unknown_routing_key(caplog):
+    from app.infra.events.dispatcher import dispatch
+    await dispatch({}, "unknown.rk", MagicMock(), AsyncMock())
+    assert "event ignoré" in caplog.text
+
+
+async def test_dispatch_routes_to_handler():
+    from app.infra.events import dispatcher
+
+    handler = AsyncMock()
+    db, publisher = MagicMock(), AsyncMock()
+    with patch.dict(dispatcher.HANDLERS, {"order.confirmed": handler}):
+        await dispatcher.dispatch({"order_id": 1}, "order.confirmed", db, publisher)
+    handler.assert_awaited_once_with({"order_id": 1}, db, publisher)
+
+
+@patch("app.infra.events.dispatcher.rabbitmq")
+async def test_handle_event_closes_session(mock_rabbit):
+    from app.infra.events import dispatcher
+
+    handler = AsyncMock()
+    with patch.dict(dispatcher.HANDLERS, {"order.confirmed": handler}):
+        await dispatcher.handle_event({"order_id": 1}, "order.confirmed")
+    handler.assert_awaited_once()
+    assert handler.await_args.args[2] is mock_rabbit
+
+
+# ---------- handle_batch ----------
+@patch("app.infra.events.dispatcher.rabbitmq")
+async def test_handle_batch_single_transaction_and_deferred_publish(mock_rabbit):
+    from app.infra.events.dispatcher import handle_batch
+
+    mock_rabbit.publish_message = AsyncMock()
+    first, second = _create_order(1), _create_order(2)
+
+    await handle_batch([
+        ({"order_id": first}, "order.confirmed"),
+        ({"order_id": second, "customer_id": 2,
+          "items": [{"product_id": 5, "quantity": 2, "unit_price": 3.0}], "total": 6.0},
+         "order.price_calculated"),
+    ])
+
+    assert _get_order(first).status == OrderStatus.CONFIRMED
+    assert _get_order(second).total == 6.0
+    mock_rabbit.publish_message.assert_awaited_once()
+    assert mock_rabbit.publish_message.await_args.args[0] == "order.created"
+
+
+@patch("app.infra.events.dispatcher.rabbitmq")
+async def test_handle_batch_failed_event_rolls_back_to_savepoint(mock_rabbit):
+    from app.infra.events import dispatcher
+
+    mock_rabbit.publish_message = AsyncMock()
+    order_id = _create_order(1)
+
+    async def failing(payload, db, publisher):
+        order = db.get(Order, payload["order_id"])
+        order.status = OrderStatus.REJECTED
+        db.flush()
+        await publisher.publish_message("order.rejected", {"order_id": order.id})
+        raise RuntimeError("boom")
+
+    with patch.dict(dispatcher.HANDLERS, {"order.rejected": failing}):
+        await dispatcher.handle_batch([
+            ({"order_id": order_id}, "order.rejected"),
+            ({"order_id": order_id}, "order.confirmed"),
+        ])
+
+    assert _get_order(order_id).status == OrderStatus.CONFIRMED
+    mock_rabbit.publish_message.assert_not_awaited()
+
+
+@patch("app.infra.events.dispatcher.rabbitmq")
+async def test_handle_batch_real_handler_error_reaches_the_batch(mock_rabbit, caplog):
+    from app.infra.events import dispatcher
+
+    mock_rabbit.publish_message = AsyncMock()
+    first, second = _create_order(1), _create_order(2)
+
+    with patch("app.infra.events.handlers._apply_prices", side_effect=RuntimeError("boom")):
+        await dispatcher.handle_batch([
+            ({"order_id": first, "customer_id": 1,
+              "items": [{"product_id": 5, "quantity": 1, "unit_price": 3.0}], "total": 3.0},
+             "order.price_calculated"),
+            ({"order_id": second}, "order.confirmed"),
+        ])
+
+    assert "batch: handler error rk=order.price_calculated" in caplog.text
+    assert _get_order(second).status == OrderStatus.CONFIRMED
+    mock_rabbit.publish_message.assert_not_awaited()
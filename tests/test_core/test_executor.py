@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executor import DbExecutor
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_inline_executor_runs_on_loop_thread():
+    ex = DbExecutor(0, name="test-inline")
+    assert await ex.run(threading.get_ident) == threading.get_ident()
+
+
+async def test_pooled_executor_runs_off_loop_and_tracks_metrics():
+    ex = DbExecutor(1, name="test-pool")
+    gate = threading.Event()
+
+    first = asyncio.ensure_future(ex.run(gate.wait, 5))
+    second = asyncio.ensure_future(ex.run(lambda x, y=0: x + y, 1, y=2))
+    await asyncio.sleep(0.05)
+
+    # 1 tâche en cours, 1 en attente d'un thread
+    assert ex._in_flight._value.get() == 1
+    assert ex._queue_depth._value.get() == 1
+
+    gate.set()
+    assert await second == 3
+    await first
+    assert await ex.run(threading.get_ident) != threading.get_ident()
+    assert ex._queue_depth._value.get() == 0
+    assert ex._in_flight._value.get() == 0
+    ex.shutdown()
+
+
+async def test_cancelled_task_leaves_queue_depth_consistent():
+    ex = DbExecutor(1, name="test-cancel")
+    gate = threading.Event()
+    blocker = asyncio.ensure_future(ex.run(gate.wait, 5))
+    queued = asyncio.ensure_future(ex.run(lambda: None))
+    await asyncio.sleep(0.05)
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    gate.set()
+    await blocker
+    assert ex._queue_depth._value.get() == 0
+    ex.shutdown()
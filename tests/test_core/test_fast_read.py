@@ -0,0 +1,60 @@
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.db import SessionLocal
+from app.main import app
+from app.models.order_models import Order, OrderItem
+from app.repositories.order_repositories import OrderRepository
+from app.schemas.order_schemas import OrderResponse
+from app.security.security import require_read
+from app.services.order_services import NotFoundError, OrderService
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    for o in range(3):
+        order = Order(customer_id=o, total=2.5 * o if o else None)
+        for p in range(o):
+            order.items.append(OrderItem(product_id=p, quantity=p + 1, unit_price=2.5, line_total=2.5 * (p + 1)))
+        session.add(order)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _orm_json(db):
+    """Sortie de référence : OrderResponse validé depuis les objets ORM."""
+    return [OrderResponse.model_validate(o).model_dump(mode="json") for o in OrderRepository(db).list()]
+
+
+def test_fast_path_matches_order_response(db):
+    svc = OrderService(OrderRepository(db), AsyncMock())
+    assert json.loads(svc.list_orders_json()) == _orm_json(db)
+    assert json.loads(svc.get_order_json(3)) == _orm_json(db)[2]
+    assert json.loads(svc.list_orders_json(skip=1, limit=1))[0]["id"] == 2
+
+
+def test_fast_path_missing_order(db):
+    with pytest.raises(NotFoundError):
+        OrderService(OrderRepository(db), AsyncMock()).get_order_json(999)
+
+
+def test_routes_serve_the_fast_path(db):
+    app.dependency_overrides[require_read] = lambda: None
+    try:
+        client = TestClient(app)
+        listed = client.get("/orders/")
+        one = client.get("/orders/2")
+        missing = client.get("/orders/999")
+    finally:
+        app.dependency_overrides.clear()
+    assert listed.headers["content-type"] == "application/json"
+    assert listed.json() == _orm_json(db)
+    assert one.json()["items"][0] == {
+        "product_id": 0, "quantity": 1, "id": 1, "order_id": 2, "unit_price": 2.5, "line_total": 2.5,
+    }
+    assert missing.status_code == 404
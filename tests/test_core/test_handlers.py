@@ -74,13 +74,14 @@ async def test_handle_customer_deleted_no_orders(mock_repo, mock_service, db_ses
 
 @patch("app.infra.events.handlers.OrderService")
 @patch("app.infra.events.handlers.OrderRepository")
-async def test_handle_customer_deleted_generic_error(mock_repo, mock_service, db_session, publisher, caplog):
+async def test_handle_customer_deleted_generic_error_propagates(mock_repo, mock_service, db_session, publisher, caplog):
     from app.infra.events.handlers import handle_customer_deleted
 
     repo = mock_repo.return_value
     repo.list.side_effect = Exception("db fail")
 
-    await handle_customer_deleted({"id": 789}, db_session, publisher)
+    with pytest.raises(Exception, match="db fail"):
+        await handle_customer_deleted({"id": 789}, db_session, publisher)
     assert "erreur inattendue" in caplog.text
 
 
@@ -119,14 +120,15 @@ async def test_handle_customer_update_order_not_found(mock_service, db_session,
 
 
 @patch("app.infra.events.handlers.OrderService")
-async def test_handle_customer_update_order_generic_error(mock_service, db_session, publisher, caplog):
+async def test_handle_customer_update_order_generic_error_propagates(mock_service, db_session, publisher, caplog):
     from app.infra.events.handlers import handle_customer_update_order
 
     payload = {"order_id": 99, "items": [{"product_id": 5, "quantity": 10}]}
     service = mock_service.return_value
     service.update_order_items = AsyncMock(side_effect=Exception("boom"))
 
-    await handle_customer_update_order(payload, db_session, publisher)
+    with pytest.raises(Exception, match="boom"):
+        await handle_customer_update_order(payload, db_session, publisher)
     assert "erreur inattendue" in caplog.text
 
 
@@ -163,13 +165,14 @@ async def test_handle_customer_delete_order_not_found(mock_service, db_session,
 
 
 @patch("app.infra.events.handlers.OrderService")
-async def test_handle_customer_delete_order_generic_error(mock_service, db_session, publisher, caplog):
+async def test_handle_customer_delete_order_generic_error_propagates(mock_service, db_session, publisher, caplog):
     from app.infra.events.handlers import handle_customer_delete_order
 
     service = mock_service.return_value
     service.update_order_status = AsyncMock(side_effect=Exception("db fail"))
 
-    await handle_customer_delete_order({"order_id": 55}, db_session, publisher)
+    with pytest.raises(Exception, match="db fail"):
+        await handle_customer_delete_order({"order_id": 55}, db_session, publisher)
     assert "erreur inattendue" in caplog.text
 
 
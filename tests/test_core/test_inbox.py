@@ -0,0 +1,84 @@
+import threading
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.core.executor import DbExecutor
+from app.infra.events.inbox import Inbox
+from app.models.event_models import ProcessedEvent, _utcnow
+
+
+def _count() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(ProcessedEvent).count()
+    finally:
+        db.close()
+
+
+def test_key_for_uses_message_id_only():
+    msg = MagicMock(message_id="abc", body=b"{}")
+    assert Inbox.key_for(msg, "order.confirmed") == "abc"
+
+    # Sans message_id : pas de déduplication (un event identique légitime n'est pas perdu)
+    assert Inbox.key_for(MagicMock(message_id=None, body=b'{"order_id": 1}'), "rk") is None
+    assert Inbox.key_for(MagicMock(message_id="", body=b"{}"), "rk") is None
+
+
+@pytest.mark.asyncio
+async def test_remember_then_duplicate_from_lru_and_db():
+    inbox = Inbox()
+    assert not await inbox.is_duplicate("k1")
+    await inbox.remember([("k1", "order.confirmed")])
+    assert await inbox.is_duplicate("k1")
+    assert _count() == 1
+
+    # Nouveau process (LRU vide) → retrouvé en table
+    assert await Inbox().is_duplicate("k1")
+
+
+@pytest.mark.asyncio
+async def test_table_queries_run_in_the_executor():
+    threads = []
+
+    def session_factory():
+        threads.append(threading.current_thread().name)
+        return SessionLocal()
+
+    executor = DbExecutor(1, name="t_inbox")
+    try:
+        inbox = Inbox(session_factory=session_factory, executor=executor)
+        await inbox.is_duplicate("k1")
+        await inbox.remember([("k1", "rk")])
+    finally:
+        executor.shutdown()
+    assert len(threads) == 2 and all(t.startswith("t_inbox-executor") for t in threads)
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded():
+    inbox = Inbox(max_size=2)
+    await inbox.remember([("a", "rk"), ("b", "rk"), ("c", "rk")])
+    assert list(inbox._lru) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_remember_ignores_keys_recorded_by_another_consumer():
+    await Inbox().remember([("dup", "rk")])
+    inbox = Inbox()
+    await inbox.remember([("dup", "rk"), ("new", "rk")])
+    assert _count() == 2
+    assert await inbox.is_duplicate("new")
+
+
+def test_purge_expired():
+    db = SessionLocal()
+    db.add(ProcessedEvent(event_id="old", routing_key="rk", processed_at=_utcnow() - timedelta(days=2)))
+    db.add(ProcessedEvent(event_id="recent", routing_key="rk"))
+    db.commit()
+    db.close()
+
+    assert Inbox(ttl_seconds=3600).purge_expired() == 1
+    assert _count() == 1
@@ -0,0 +1,112 @@
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from app import __main__ as launcher
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_max_requests_for_worker():
+    assert launcher.max_requests_for_worker(0, 50) is None
+    assert launcher.max_requests_for_worker(1000, 0) == 1000
+    values = {launcher.max_requests_for_worker(1000, 50, random.Random(i)) for i in range(20)}
+    assert all(1000 <= v <= 1050 for v in values) and len(values) > 1
+
+
+def test_prepare_multiproc_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    monkeypatch.setattr(launcher.settings, "PROMETHEUS_MULTIPROC_DIR", "")
+    # Un seul worker sans répertoire configuré : registre classique
+    assert launcher.prepare_multiproc_dir(1) is None
+
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    (tmp_path / "keep.txt").write_text("x")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert launcher.prepare_multiproc_dir(1) == str(tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["keep.txt"]
+    assert launcher.settings.PROMETHEUS_MULTIPROC_DIR == str(tmp_path)
+
+    # Plusieurs workers : répertoire temporaire créé
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    monkeypatch.setattr(launcher.settings, "PROMETHEUS_MULTIPROC_DIR", "")
+    path = launcher.prepare_multiproc_dir(2)
+    assert path and os.path.isdir(path) and os.environ["PROMETHEUS_MULTIPROC_DIR"] == path
+
+
+def test_worker_spool_dir():
+    assert launcher.worker_spool_dir("", 1, 4) == ""
+    assert launcher.worker_spool_dir("/spool", 0, 1) == "/spool"
+    assert launcher.worker_spool_dir("/spool", 2, 4) == os.path.join("/spool", "worker-2")
+
+
+def test_replacement_worker_reuses_the_slot(monkeypatch):
+    arbiter = launcher.Arbiter(app=None, sock=None, workers=3, graceful_timeout=1)
+    arbiter.children = {101: (time.monotonic() - 10, 2)}
+    spawned = []
+    monkeypatch.setattr(arbiter, "spawn", spawned.append)
+    monkeypatch.setattr(launcher.settings, "PROMETHEUS_MULTIPROC_DIR", "")
+    arbiter._reap(101, 0)
+    assert spawned == [2] and arbiter.children == {}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_health(url, deadline):
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork requis")
+def test_prefork_serves_recycles_and_stops_gracefully(tmp_path):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        EVENTS_BROKER="memory",
+        SQLITE_PATH=str(tmp_path / "order.db"),
+        LOG_DIR=str(tmp_path / "logs"),
+        LOG_ENABLE_CONSOLE="false",
+        PROMETHEUS_MULTIPROC_DIR=str(tmp_path / "metrics"),
+        WEB_MAX_REQUESTS="3",
+    )
+    env.pop("TESTING", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app", "--workers", "2", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=str(tmp_path), env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        assert _wait_health(f"{base}/health", time.monotonic() + 30)
+        # Recyclage après 3 requêtes : le service reste disponible
+        for _ in range(12):
+            assert _wait_health(f"{base}/health", time.monotonic() + 10)
+        metrics = httpx.get(f"{base}/metrics", timeout=5).text
+        # Agrégé sur tous les workers, y compris ceux recyclés
+        line = next(l for l in metrics.splitlines() if l.startswith('http_requests_total{method="GET",path="/health"'))
+        assert float(line.rsplit(" ", 1)[1]) >= 13
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            code = proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            raise
+    assert code == 0
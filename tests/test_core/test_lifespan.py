@@ -7,8 +7,8 @@ def test_lifespan_database_ok(monkeypatch):
     mock_conn = MagicMock()
     mock_engine = MagicMock()
     mock_engine.connect.return_value.__enter__.return_value = mock_conn
-    monkeypatch.setattr("app.main.engine", mock_engine)
-    monkeypatch.setattr("app.main.init_db", lambda: None)
+    monkeypatch.setattr("app.core.db.engine", mock_engine)
+    monkeypatch.setattr("app.core.db.init_db", lambda: None)
     mock_rabbit = MagicMock()
     mock_rabbit.connect = AsyncMock()
     mock_rabbit.disconnect = AsyncMock()
@@ -30,8 +30,8 @@ def test_lifespan_database_fail(monkeypatch, caplog):
         raise Exception("fail")
     mock_engine = MagicMock()
     mock_engine.connect.side_effect = fail_connect
-    monkeypatch.setattr("app.main.engine", mock_engine)
-    monkeypatch.setattr("app.main.init_db", lambda: None)
+    monkeypatch.setattr("app.core.db.engine", mock_engine)
+    monkeypatch.setattr("app.core.db.init_db", lambda: None)
     mock_rabbit = MagicMock()
     mock_rabbit.connect = AsyncMock()
     mock_rabbit.disconnect = AsyncMock()
@@ -50,8 +50,8 @@ def test_lifespan_database_fail(monkeypatch, caplog):
 def test_lifespan_rabbitmq_fail(monkeypatch, caplog):
     mock_engine = MagicMock()
     mock_engine.connect.return_value.__enter__.return_value = MagicMock()
-    monkeypatch.setattr("app.main.engine", mock_engine)
-    monkeypatch.setattr("app.main.init_db", lambda: None)
+    monkeypatch.setattr("app.core.db.engine", mock_engine)
+    monkeypatch.setattr("app.core.db.init_db", lambda: None)
     mock_rabbit = MagicMock()
     mock_rabbit.connect = AsyncMock(side_effect=Exception("rabbit fail"))
     mock_rabbit.disconnect = AsyncMock()
@@ -64,3 +64,81 @@ def test_lifespan_rabbitmq_fail(monkeypatch, caplog):
                 pass
     asyncio.run(run_lifespan())
     assert "Échec initialisation RabbitMQ" in caplog.text
+
+
+def test_lifespan_consumption_disabled(monkeypatch, caplog):
+    mock_engine = MagicMock()
+    monkeypatch.setattr("app.core.db.engine", mock_engine)
+    monkeypatch.setattr("app.core.db.init_db", lambda: None)
+    mock_rabbit = MagicMock()
+    mock_rabbit.connect = AsyncMock()
+    mock_rabbit.disconnect = AsyncMock()
+    monkeypatch.setattr("app.main.rabbitmq", mock_rabbit)
+    start = AsyncMock()
+    monkeypatch.setattr("app.main.start_consumer", start)
+    monkeypatch.setattr("app.main.settings.EVENTS_CONSUME_IN_API", False)
+
+    import asyncio
+    async def run_lifespan():
+        with caplog.at_level(logging.INFO):
+            async with lifespan(FastAPI()):
+                await asyncio.sleep(0)
+    asyncio.run(run_lifespan())
+    start.assert_not_called()
+    assert "Consommation désactivée" in caplog.text
+
+
+def test_lifespan_connects_db_and_broker_concurrently(monkeypatch):
+    import asyncio
+    import threading
+
+    broker_started = threading.Event()
+    overlapped = []
+
+    def startup_db():
+        # Le thread DB attend que la connexion broker ait démarré
+        overlapped.append(broker_started.wait(5))
+
+    async def connect():
+        broker_started.set()
+
+    mock_rabbit = MagicMock()
+    mock_rabbit.connect = AsyncMock(side_effect=connect)
+    mock_rabbit.disconnect = AsyncMock()
+    monkeypatch.setattr("app.main.startup_db", startup_db)
+    monkeypatch.setattr("app.main.rabbitmq", mock_rabbit)
+    monkeypatch.setattr("app.main.settings.EVENTS_CONSUME_IN_API", False)
+
+    async def run_lifespan():
+        async with lifespan(FastAPI()):
+            pass
+    asyncio.run(run_lifespan())
+    assert overlapped == [True]
+
+
+def test_lifespan_waits_for_consumers_before_disconnect(monkeypatch):
+    import asyncio
+    monkeypatch.setattr("app.main.startup_db", lambda: None)
+    events = []
+    mock_rabbit = MagicMock()
+    mock_rabbit.connect = AsyncMock()
+    mock_rabbit.disconnect = AsyncMock(side_effect=lambda: events.append("disconnect"))
+    monkeypatch.setattr("app.main.rabbitmq", mock_rabbit)
+
+    async def consumer():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)  # fin du lot en cours
+            events.append("consumer stopped")
+            raise
+
+    monkeypatch.setattr("app.main.spawn_lanes", lambda start, broker: [asyncio.create_task(consumer())])
+    app = FastAPI()
+
+    async def run_lifespan():
+        async with lifespan(app):
+            await asyncio.sleep(0)
+
+    asyncio.run(run_lifespan())
+    assert events == ["consumer stopped", "disconnect"]
@@ -0,0 +1,172 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import aio_pika
+import pytest
+
+from app.infra.events.memory import InMemoryBroker, topic_matches
+from app.infra.events.rabbitmq import start_consumer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.parametrize("pattern, rk, expected", [
+    ("order.#", "order.created", True),
+    ("order.#", "order", True),
+    ("order.#", "order.a.b", True),
+    ("order.*", "order.created", True),
+    ("order.*", "order", False),
+    ("order.*", "order.a.b", False),
+    ("*.deleted", "customer.deleted", True),
+    ("#.deleted", "a.b.deleted", True),
+    ("#", "anything.at.all", True),
+    ("customer.#", "order.created", False),
+    ("order.created", "order.created", True),
+])
+async def test_topic_matches(pattern, rk, expected):
+    assert topic_matches(pattern, rk) is expected
+
+
+async def _broker_with_queue(name="q", patterns=("order.#",), prefetch=0):
+    broker = InMemoryBroker()
+    await broker.connect()
+    channel = await broker.channel()
+    await channel.set_qos(prefetch_count=prefetch)
+    queue = await channel.declare_queue(name)
+    for p in patterns:
+        await queue.bind(broker.exchange, routing_key=p)
+    return broker, queue
+
+
+async def test_publish_routes_to_matching_queues_only():
+    broker, _ = await _broker_with_queue("orders", ("order.#",))
+    channel = await broker.channel()
+    customers = await channel.declare_queue("customers")
+    await customers.bind(broker.exchange, routing_key="customer.*")
+
+    await broker.publish_message("order.created", {"order_id": 1})
+    await broker.publish_message("customer.deleted", {"id": 2})
+    await broker.publish_message("product.updated", {"id": 3})
+
+    assert broker.queue("orders").depth == 1
+    assert broker.queue("customers").depth == 1
+
+
+async def test_prefetch_ack_and_nack_redelivery():
+    broker, queue = await _broker_with_queue(prefetch=1)
+    for i in range(2):
+        await broker.publish_message("order.confirmed", {"order_id": i})
+
+    async with queue.iterator() as it:
+        first = await it.__anext__()
+        # prefetch=1 : pas de 2e livraison tant que le 1er n'est pas réglé
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(it.__anext__(), 0.05)
+
+        await first.nack(requeue=True)
+        again = await it.__anext__()
+        assert again.redelivered and again.body == first.body
+        await again.ack()
+
+        second = await it.__anext__()
+        assert not second.redelivered
+        with pytest.raises(RuntimeError):
+            await again.ack()
+        await second.ack()
+    assert broker.queue("q").depth == 0
+
+
+async def test_closing_consumer_requeues_unacked():
+    broker, queue = await _broker_with_queue()
+    await broker.publish_message("order.confirmed", {"order_id": 1})
+
+    async with queue.iterator() as it:
+        await it.__anext__()
+    assert broker.queue("q").depth == 1
+
+
+async def test_start_consumer_end_to_end_and_disconnect():
+    broker = InMemoryBroker()
+    await broker.connect()
+    received = []
+    done = asyncio.Event()
+
+    async def handler(payload, rk):
+        received.append((rk, payload))
+        if len(received) == 2:
+            done.set()
+
+    consumer = asyncio.create_task(broker.start_consumer(
+        broker.connection, broker.exchange, aio_pika.ExchangeType.TOPIC,
+        queue_name="order-events", patterns=["order.#"], handler=handler,
+    ))
+    await asyncio.sleep(0)
+    await broker.publish_message("order.confirmed", {"order_id": 1})
+    await broker.publish_message("customer.deleted", {"id": 9})
+    await broker.publish_message("order.rejected", {"order_id": 2})
+    await asyncio.wait_for(done.wait(), 1)
+
+    assert received == [("order.confirmed", {"order_id": 1}), ("order.rejected", {"order_id": 2})]
+    await broker.disconnect()
+    await asyncio.wait_for(consumer, 1)
+
+
+async def test_batch_consumer_runs_on_memory_broker():
+    broker = InMemoryBroker()
+    await broker.connect()
+    batch_handler = AsyncMock()
+    channel = await broker.channel()
+    queue = await channel.declare_queue("q")
+    await queue.bind(broker.exchange, routing_key="order.#")
+    for i in range(3):
+        await broker.publish_message("order.confirmed", {"order_id": i})
+
+    consumer = asyncio.create_task(start_consumer(
+        broker, broker.exchange, aio_pika.ExchangeType.TOPIC, "q", ["order.#"], AsyncMock(),
+        batch_handler=batch_handler, batch_size=3, batch_max_wait_ms=10,
+    ))
+    for _ in range(50):
+        if batch_handler.await_count:
+            break
+        await asyncio.sleep(0.01)
+    await broker.disconnect()
+    await asyncio.wait_for(consumer, 1)
+
+    assert len(batch_handler.await_args.args[0]) == 3
+    assert broker.queue("q").depth == 0
+
+
+async def test_priority_queue_delivers_high_priority_first():
+    broker = InMemoryBroker(priorities={"order.confirmed": 9})
+    await broker.connect()
+    channel = await broker.channel()
+    queue = await channel.declare_queue("q", arguments={"x-max-priority": 10})
+    await queue.bind(broker.exchange, routing_key="order.#")
+
+    for rk in ("order.created", "order.updated", "order.confirmed"):
+        await broker.publish_message(rk, {})
+
+    async with queue.iterator() as it:
+        order = []
+        for _ in range(3):
+            m = await it.__anext__()
+            order.append(m.routing_key)
+            await m.ack()
+    assert order == ["order.confirmed", "order.created", "order.updated"]
+
+
+async def test_consumer_observes_lag_per_queue():
+    from app.infra.events.rabbitmq import CONSUMER_LAG
+
+    broker, _ = await _broker_with_queue("lag-q")
+    await broker.publish_message("order.confirmed", {"order_id": 1})
+
+    consumer = asyncio.create_task(start_consumer(
+        broker, broker.exchange, broker.exchange_type, "lag-q", ["order.#"], AsyncMock(),
+    ))
+    await asyncio.sleep(0.02)
+    await broker.disconnect()
+    await consumer
+
+    samples = {s.name: s.value for s in CONSUMER_LAG.collect()[0].samples if s.labels.get("queue") == "lag-q"}
+    assert samples["events_consumer_lag_seconds_count"] == 1
@@ -0,0 +1,119 @@
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core import metrics
+from app.core.log import request_id_var
+from app.core.metrics import parse_buckets, render_metrics
+from app.core.middleware import REQUEST_COUNT, REQUEST_LATENCY, UNMATCHED_PATH, RequestContextMiddleware
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/echo")
+    def echo(request: Request):
+        logging.getLogger("app.test").info("inside")
+        return {"state": request.state.request_id, "ctx": request_id_var.get()}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    @app.get("/orders/{order_id}")
+    def order(order_id: int):
+        return {"id": order_id}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def _client(app, raise_app_exceptions=True):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=raise_app_exceptions)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def _count(path, status):
+    return REQUEST_COUNT.labels("GET", path, status)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_generates_request_id_visible_to_route_and_response():
+    async with _client(_app()) as client:
+        r = await client.get("/echo")
+    body = r.json()
+    assert body["state"] == body["ctx"] == r.headers["x-request-id"]
+    assert len(body["state"]) == 36
+    assert request_id_var.get() == "-"
+
+
+@pytest.mark.asyncio
+async def test_incoming_request_id_is_kept_when_valid():
+    async with _client(_app()) as client:
+        kept = await client.get("/echo", headers={"x-request-id": "gw-123"})
+        replaced = await client.get("/echo", headers={"x-request-id": "bad id\n"})
+    assert kept.headers["x-request-id"] == "gw-123"
+    assert replaced.headers["x-request-id"] != "bad id\n"
+
+
+@pytest.mark.asyncio
+async def test_records_metrics_and_access_log(caplog):
+    before = _count("/echo", "200")
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        async with _client(_app()) as client:
+            r = await client.get("/echo", headers={"user-agent": "ua-test"})
+    assert _count("/echo", "200") == before + 1
+    assert REQUEST_LATENCY.labels("GET", "/echo")._sum.get() > 0
+
+    access = [rec for rec in caplog.records if rec.name == "app.access"][-1]
+    assert access.request_id == r.headers["x-request-id"]
+    assert (access.status, access.path, access.user_agent) == (200, "/echo", "ua-test")
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through():
+    async with _client(_app()) as client:
+        r = await client.get("/stream")
+    assert r.text == "abc" and "x-request-id" in r.headers
+
+
+@pytest.mark.asyncio
+async def test_unhandled_error_counts_as_500():
+    before = _count("/boom", "500")
+    async with _client(_app(), raise_app_exceptions=False) as client:
+        r = await client.get("/boom")
+    assert r.status_code == 500
+    assert _count("/boom", "500") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_labelled_by_route_template():
+    before = _count("/orders/{order_id}", "200")
+    before_404 = _count(UNMATCHED_PATH, "404")
+    async with _client(_app()) as client:
+        for i in range(3):
+            await client.get(f"/orders/{i}")
+        await client.get("/nope/123")
+    assert _count("/orders/{order_id}", "200") == before + 3
+    assert _count(UNMATCHED_PATH, "404") == before_404 + 1
+    assert REQUEST_COUNT.labels("GET", "/orders/1", "200")._value.get() == 0
+
+
+def test_parse_buckets():
+    assert parse_buckets("0.5, 0.01,1") == (0.01, 0.5, 1.0, float("inf"))
+    assert parse_buckets("")[-1] == float("inf")
+
+
+def test_multiprocess_exposition_reads_the_shared_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    data, _ = render_metrics()
+    # Répertoire vide : rien, pas même les métriques du registre du process
+    assert b"http_requests_total" not in data
+    monkeypatch.setattr(metrics.settings, "PROMETHEUS_MULTIPROC_DIR", "")
+    assert b"http_requests_total" in render_metrics()[0]
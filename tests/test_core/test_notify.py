@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+from app.infra.events.notify import ORIGIN_HEADER, Notifier
+from app.infra.events.stream import OrderStream
+from app.infra.events.waiters import Waiters
+
+pytestmark = pytest.mark.asyncio
+
+
+def _link(*notifiers):
+    """Exchange fanout simulé : chaque publication est livrée à tous les notifiers (émetteur compris)."""
+    async def publish(message, routing_key):
+        for n in notifiers:
+            n.deliver(message)
+
+    for n in notifiers:
+        n.exchange = MagicMock(publish=AsyncMock(side_effect=publish))
+
+
+async def test_notifications_reach_other_processes_only():
+    api, worker = Notifier("n"), Notifier("n")
+    _link(api, worker)
+    received = {"api": [], "worker": []}
+    api.register("k", received["api"].append)
+    send = worker.register("k", received["worker"].append)
+
+    send({"key": 1})
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert received == {"api": [{"key": 1}], "worker": []}
+
+
+async def test_send_without_exchange_is_a_noop():
+    n = Notifier("n")
+    n.send("k", {"key": 1})
+    assert n._tasks == set()
+
+
+async def test_unreadable_or_unknown_notifications_are_ignored():
+    n = Notifier("n")
+    handler = MagicMock()
+    n.register("k", handler)
+    n.deliver(MagicMock(headers={ORIGIN_HEADER: "other"}, body=b"not json"))
+    n.deliver(MagicMock(headers={}, body=orjson.dumps({"kind": "x", "data": {}})))
+    handler.assert_not_called()
+
+
+async def test_price_wakeup_crosses_processes():
+    api, worker = Notifier("n"), Notifier("n")
+    _link(api, worker)
+    api_waiters, worker_waiters = Waiters("price"), Waiters("price")
+    api_waiters.attach(api)
+    worker_waiters.attach(worker)
+
+    fut = api_waiters.register(42)
+    worker_waiters.resolve(42)  # handler order.price_calculated exécuté dans le worker
+
+    assert await api_waiters.wait(42, fut, 0.5)
+
+
+async def test_stream_changes_cross_processes():
+    api, worker = Notifier("n"), Notifier("n")
+    _link(api, worker)
+    api_stream, worker_stream = OrderStream(), OrderStream()
+    api_stream.attach(api)
+    worker_stream.attach(worker)
+    sub, _, _ = api_stream.subscribe(("order", 1))
+
+    worker_stream.publish("status", 1, 7, {"status": "confirmed"})  # handler order.confirmed du worker
+    ev = await asyncio.wait_for(sub.queue.get(), 0.5)
+
+    assert (ev.event, ev.data, ev.id) == ("status", {"status": "confirmed"}, worker_stream.buffer[0].id)
+    assert len(worker_stream.buffer) == 1  # pas d'écho vers l'émetteur
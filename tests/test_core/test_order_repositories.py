@@ -88,6 +88,10 @@ def fake_db():
             except ValueError:
                 pass
 
+        def get(self, model, pk):
+            # pas de tombe existante
+            return None
+
     return DB()
 
 
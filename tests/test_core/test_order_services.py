@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import MagicMock, AsyncMock, ANY
 from fastapi import HTTPException
 
-from app.services.order_services import OrderService, NotFoundError
+from app.services.order_services import InvalidTransitionError, OrderService, NotFoundError
 from app.models.order_models import OrderItem, OrderStatus
 from app.schemas.order_schemas import OrderCreate
 from datetime import datetime, timezone
@@ -81,28 +81,38 @@ async def test_create_and_request_price_empty_items(service):
 # ==========================================================
 
 async def test_update_order_status_success(service, repo, publisher):
-    order = MagicMock(id=1, status=OrderStatus.PENDING, updated_at=None, customer_id=1)
-    repo.get.return_value = order
+    row = MagicMock(id=1, status=OrderStatus.CONFIRMED, updated_at=None, customer_id=1, version=2)
+    repo.transition_status.return_value = (row, True)
 
     result = await service.update_order_status(1, OrderStatus.CONFIRMED)
     assert result.status == OrderStatus.CONFIRMED
+    repo.transition_status.assert_called_once_with(1, OrderStatus.CONFIRMED)
     publisher.publish_message.assert_awaited_once()
     repo.db.commit.assert_called_once()
 
 
 async def test_update_order_status_not_found(service, repo):
-    repo.get.return_value = None
+    repo.transition_status.return_value = (None, False)
     with pytest.raises(NotFoundError):
         await service.update_order_status(1, OrderStatus.CONFIRMED)
 
 
 async def test_update_order_status_same_status(service, repo, publisher):
-    order = MagicMock(id=1, status=OrderStatus.PENDING)
-    repo.get.return_value = order
+    row = MagicMock(id=1, status=OrderStatus.PENDING)
+    repo.transition_status.return_value = (row, False)
     result = await service.update_order_status(1, OrderStatus.PENDING)
     # no-op → pas de publish
     publisher.publish_message.assert_not_awaited()
-    assert result == order
+    repo.db.commit.assert_not_called()
+    assert result == row
+
+
+async def test_update_order_status_invalid_transition(service, repo, publisher):
+    repo.transition_status.return_value = (MagicMock(id=1, status=OrderStatus.COMPLETED), False)
+    with pytest.raises(InvalidTransitionError) as e:
+        await service.update_order_status(1, OrderStatus.PENDING)
+    assert (e.value.current, e.value.target) == (OrderStatus.COMPLETED, OrderStatus.PENDING)
+    publisher.publish_message.assert_not_awaited()
 
 
 # ==========================================================
@@ -184,3 +194,24 @@ async def test_delete_order_not_found(service, repo):
     repo.get.return_value = None
     with pytest.raises(NotFoundError):
         await service.delete_order(1)
+
+
+# ==========================================================
+# executor (travail DB hors boucle)
+# ==========================================================
+
+async def test_update_order_status_runs_db_work_in_executor(repo, publisher):
+    import threading
+    from app.core.executor import DbExecutor
+
+    threads = []
+    row = MagicMock(id=1, status=OrderStatus.CONFIRMED, updated_at=None, customer_id=1)
+    repo.transition_status.side_effect = lambda *_: threads.append(threading.get_ident()) or (row, True)
+
+    executor = DbExecutor(1, name="test-service")
+    svc = OrderService(repo, publisher, executor=executor)
+    await svc.update_order_status(1, OrderStatus.CONFIRMED)
+
+    assert threads and threads[0] != threading.get_ident()
+    publisher.publish_message.assert_awaited_once()
+    executor.shutdown()
@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+
+from app.core.db import SessionLocal
+from app.core.executor import DbExecutor
+from app.infra.events.outbox import OutboxRelay
+from app.models.event_models import OutboxEvent
+from app.models.order_models import OrderStatus
+from app.repositories.order_repositories import OrderRepository
+from app.schemas.order_schemas import OrderCreate
+from app.services.order_services import OrderService
+
+pytestmark = pytest.mark.asyncio
+
+
+def _outbox_rows():
+    db = SessionLocal()
+    try:
+        return [(r.routing_key, r.payload) for r in db.execute(select(OutboxEvent).order_by(OutboxEvent.id)).scalars()]
+    finally:
+        db.close()
+
+
+async def test_service_writes_events_in_the_order_transaction():
+    db = SessionLocal()
+    publisher = AsyncMock()
+    svc = OrderService(OrderRepository(db), publisher, use_outbox=True)
+    try:
+        order = await svc.create_and_request_price(
+            OrderCreate(customer_id=7, items=[{"product_id": 1, "quantity": 2}])
+        )
+        await svc.update_order_status(order.id, OrderStatus.CONFIRMED)
+        await svc.delete_order(order.id)
+    finally:
+        db.close()
+
+    publisher.publish_message.assert_not_awaited()
+    rows = _outbox_rows()
+    assert [rk for rk, _ in rows] == ["order.created", "order.request_price", "order.confirmed", "order.deleted"]
+    assert rows[0][1]["order_id"] == order.id and rows[0][1]["created_at"]
+    assert rows[2][1]["status"] == "confirmed" and rows[2][1]["updated_at"]
+    assert rows[3][1]["customer_id"] == 7
+
+
+async def test_status_noop_writes_nothing():
+    db = SessionLocal()
+    svc = OrderService(OrderRepository(db), AsyncMock(), use_outbox=True)
+    try:
+        order = OrderRepository(db).create(OrderCreate(customer_id=1, items=[{"product_id": 1, "quantity": 1}]))
+        await svc.update_order_status(order.id, OrderStatus.PENDING)
+    finally:
+        db.close()
+    assert _outbox_rows() == []
+
+
+def _seed(n):
+    db = SessionLocal()
+    for i in range(n):
+        db.add(OutboxEvent(routing_key=f"order.e{i}", message_id=f"id-{i}", payload={"i": i}))
+    db.commit()
+    db.close()
+
+
+async def test_relay_publishes_in_order_and_deletes_confirmed_rows():
+    _seed(3)
+    publisher = AsyncMock()
+    relay = OutboxRelay(publisher, executor=DbExecutor(0), batch_size=2)
+
+    assert await relay.relay_once() == 2
+    assert await relay.relay_once() == 1
+    assert await relay.relay_once() == 0
+
+    sent = [c.args for c in publisher.publish_confirmed.await_args_list]
+    assert sent == [("order.e0", {"i": 0}, "id-0"), ("order.e1", {"i": 1}, "id-1"), ("order.e2", {"i": 2}, "id-2")]
+    assert _outbox_rows() == []
+
+
+async def test_relay_keeps_rows_from_first_failure():
+    _seed(3)
+    publisher = AsyncMock()
+    publisher.publish_confirmed.side_effect = [None, ConnectionError("nack"), None]
+    relay = OutboxRelay(publisher, executor=DbExecutor(0))
+
+    assert await relay.relay_once() == 1
+    assert [rk for rk, _ in _outbox_rows()] == ["order.e1", "order.e2"]
@@ -1,9 +1,10 @@
+import asyncio
 import pytest
 import json
 from unittest.mock import AsyncMock, MagicMock
 import aio_pika
 
-from app.infra.events.rabbitmq import RabbitMQ, start_consumer
+from app.infra.events.rabbitmq import RabbitMQ, parse_priorities, start_consumer
 
 pytestmark = pytest.mark.asyncio
 
@@ -18,7 +19,7 @@ async def test_rabbitmq_connect_sets_exchange_and_channel(monkeypatch):
     channel.declare_exchange = AsyncMock(return_value=exchange)
 
     connect_robust = AsyncMock(return_value=conn)
-    monkeypatch.setattr("app.infra.events.rabbitmq.aio_pika.connect_robust", connect_robust)
+    monkeypatch.setattr("aio_pika.connect_robust", connect_robust)
 
     r = RabbitMQ()
     await r.connect()
@@ -75,6 +76,27 @@ async def test_publish_message_topic_and_fanout(monkeypatch):
     assert call2.kwargs["routing_key"] == ""
 
 
+async def test_publish_message_sets_priority_and_publish_time():
+    r = RabbitMQ()
+    r.exchange = AsyncMock()
+    r.exchange_type = aio_pika.ExchangeType.TOPIC
+    r.priorities = parse_priorities("order.confirmed=9, bad=x")
+
+    await r.publish_message("order.confirmed", {"a": 1})
+    await r.publish_message("order.created", {"a": 2})
+
+    urgent, normal = (c.args[0] for c in r.exchange.publish.await_args_list)
+    assert urgent.priority == 9 and not normal.priority
+    assert urgent.headers["x-published-at"] > 0
+    assert urgent.timestamp is not None
+
+
+async def test_start_consumer_declares_priority_queue():
+    conn, channel = _batch_queue([])
+    await start_consumer(conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(), max_priority=10)
+    assert channel.declare_queue.await_args.kwargs["arguments"] == {"x-max-priority": 10}
+
+
 async def test_publish_message_no_exchange_logs_error(caplog):
     r = RabbitMQ()
     r.exchange = None
@@ -203,3 +225,246 @@ async def test_start_consumer_handler_exception(caplog):
     await start_consumer(conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], bad_handler)
 
     assert "Handler error" in caplog.text
+
+
+# ---------- start_consumer (micro-batching) ----------
+class _BatchMsg:
+    def __init__(self, body, rk):
+        self.body = body
+        self.routing_key = rk
+        self.ack = AsyncMock()
+        self.nack = AsyncMock()
+
+
+def _batch_queue(messages):
+    conn = AsyncMock()
+    channel = AsyncMock()
+    queue = MagicMock()
+    channel.set_qos = AsyncMock()
+    channel.declare_queue = AsyncMock(return_value=queue)
+    conn.channel = AsyncMock(return_value=channel)
+    queue.bind = AsyncMock()
+    queue.iterator = lambda: _AsyncIteratorContext(messages)
+    return conn, channel
+
+
+async def test_start_consumer_batches_and_acks_after_success():
+    msgs = [_BatchMsg(json.dumps({"i": i}).encode(), "order.confirmed") for i in range(5)]
+    conn, channel = _batch_queue(msgs)
+    batch_handler = AsyncMock()
+
+    await start_consumer(
+        conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(),
+        batch_handler=batch_handler, batch_size=2, batch_max_wait_ms=10,
+    )
+
+    sizes = [len(c.args[0]) for c in batch_handler.await_args_list]
+    assert sizes == [2, 2, 1]
+    assert batch_handler.await_args_list[0].args[0][0] == ({"i": 0}, "order.confirmed")
+    channel.set_qos.assert_awaited_with(prefetch_count=16)
+    for idx in (1, 3, 4):
+        msgs[idx].ack.assert_awaited_once_with(multiple=True)
+    msgs[0].ack.assert_not_awaited()
+
+
+async def test_start_consumer_batch_failure_requeues(caplog):
+    msgs = [_BatchMsg(b'{"a": 1}', "order.confirmed"), _BatchMsg(b'{"a": 2}', "order.confirmed")]
+    conn, _ = _batch_queue(msgs)
+
+    await start_consumer(
+        conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(),
+        batch_handler=AsyncMock(side_effect=Exception("commit fail")), batch_size=2,
+    )
+
+    msgs[1].nack.assert_awaited_once_with(multiple=True, requeue=True)
+    msgs[1].ack.assert_not_awaited()
+    assert "Batch handler error" in caplog.text
+
+
+async def test_start_consumer_decodes_by_content_type():
+    msg = _BatchMsg(b"\x81\xa1a\x01", "rk")
+    msg.content_type = "application/octet-stream"
+    msg.process = lambda: _AsyncIteratorContext([])
+    conn, _ = _batch_queue([msg])
+    handler = AsyncMock()
+
+    await start_consumer(conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], handler)
+
+    # content_type inconnu → JSON par défaut → body invalide conservé brut
+    assert handler.await_args.args[0] == {"raw": msg.body}
+
+
+# ---------- start_consumer (inbox) ----------
+async def test_start_consumer_skips_duplicates_with_inbox():
+    class ProcessCtx:
+        async def __aenter__(self): return self
+        async def __aexit__(self, exc_type, exc, tb): return False
+
+    msgs = []
+    for _ in range(2):
+        m = _BatchMsg(b'{"order_id": 1}', "order.confirmed")
+        m.message_id = "same-id"
+        m.process = lambda: ProcessCtx()
+        msgs.append(m)
+    conn, _ = _batch_queue(msgs)
+
+    inbox = MagicMock()
+    inbox.key_for = lambda message, rk: message.message_id
+    remembered = set()
+    inbox.is_duplicate = AsyncMock(side_effect=lambda key, rk: key in remembered)
+    inbox.remember = AsyncMock(side_effect=lambda entries: remembered.update(k for k, _ in entries))
+    handler = AsyncMock()
+
+    await start_consumer(conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], handler, inbox=inbox)
+
+    handler.assert_awaited_once()
+    assert remembered == {"same-id"}
+
+
+async def test_start_consumer_batch_dedupes_within_batch():
+    msgs = [_BatchMsg(b'{"a": 1}', "order.confirmed") for _ in range(3)]
+    for m, mid in zip(msgs, ["x", "x", "y"]):
+        m.message_id = mid
+    conn, _ = _batch_queue(msgs)
+
+    inbox = MagicMock()
+    inbox.key_for = lambda message, rk: message.message_id
+    inbox.is_duplicate = AsyncMock(return_value=False)
+    inbox.remember = AsyncMock()
+    batch_handler = AsyncMock()
+
+    await start_consumer(
+        conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(),
+        batch_handler=batch_handler, batch_size=3, inbox=inbox,
+    )
+
+    assert len(batch_handler.await_args.args[0]) == 2
+    inbox.remember.assert_awaited_once_with([("x", "order.confirmed"), ("y", "order.confirmed")])
+    msgs[2].ack.assert_awaited_once_with(multiple=True)
+
+
+# ---------- start_consumer (concurrence) ----------
+async def test_start_consumer_concurrency_keeps_order_per_order_id():
+    class ProcessCtx:
+        async def __aenter__(self): return self
+        async def __aexit__(self, exc_type, exc, tb): return False
+
+    msgs = []
+    for order_id, step in [(1, "a"), (2, "a"), (1, "b"), (2, "b"), (1, "c")]:
+        m = _BatchMsg(json.dumps({"order_id": order_id, "step": step}).encode(), "order.confirmed")
+        m.process = lambda: ProcessCtx()
+        msgs.append(m)
+    conn, channel = _batch_queue(msgs)
+
+    seen = {1: [], 2: []}
+    running = 0
+    max_running = 0
+
+    async def handler(payload, rk):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01 if payload["step"] == "a" else 0)
+        seen[payload["order_id"]].append(payload["step"])
+        running -= 1
+
+    await start_consumer(
+        conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], handler, concurrency=4,
+    )
+
+    assert seen == {1: ["a", "b", "c"], 2: ["a", "b"]}
+    assert max_running == 2
+
+
+async def test_start_consumer_configurable_prefetch_and_controller():
+    conn, channel = _batch_queue([])
+    await start_consumer(conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(), prefetch=64)
+    channel.set_qos.assert_awaited_with(prefetch_count=64)
+
+    controller = MagicMock(concurrency=3, prefetch=6)
+    controller.run = AsyncMock()
+    conn, channel = _batch_queue([])
+    await start_consumer(
+        conn, MagicMock(), aio_pika.ExchangeType.TOPIC, "q", ["p"], AsyncMock(), controller=controller,
+    )
+    channel.set_qos.assert_awaited_with(prefetch_count=6)
+
+
+# ---------- Circuit breaker + spool ----------
+async def test_circuit_breaker_opens_then_half_opens():
+    from app.infra.events.breaker import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker("t", failure_threshold=2, reset_timeout=5, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_in() == 5
+
+    now[0] = 5.0
+    assert breaker.allow()          # essai unique en semi-ouvert
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 10.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+async def test_publish_fails_fast_when_circuit_open(monkeypatch, caplog):
+    monkeypatch.setattr("app.infra.events.rabbitmq.settings.EVENTS_SPOOL_DIR", "")
+    r = RabbitMQ()
+    r.exchange = AsyncMock()
+    r.exchange.publish = AsyncMock(side_effect=ConnectionError("down"))
+    r.exchange_type = aio_pika.ExchangeType.TOPIC
+    r.breaker.failure_threshold = 1
+
+    await r.publish_message("order.created", {"a": 1})
+    await r.publish_message("order.created", {"a": 2})
+
+    assert r.exchange.publish.await_count == 1
+    assert "Event dropped rk=order.created" in caplog.text
+
+
+async def test_outage_spools_then_replays_in_order(monkeypatch, tmp_path):
+    monkeypatch.setattr("app.infra.events.rabbitmq.settings.EVENTS_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr("app.infra.events.rabbitmq.settings.EVENTS_SPOOL_REPLAY_RATE", 1000)
+    r = RabbitMQ()
+    r.exchange_type = aio_pika.ExchangeType.TOPIC
+    r.breaker.failure_threshold = 1
+    r.breaker.reset_timeout = 0
+
+    r.exchange = AsyncMock()
+    r.exchange.publish = AsyncMock(side_effect=ConnectionError("down"))
+    for i in range(3):
+        await r.publish_message("order.created", {"i": i})
+    assert r.spool.pending == 3
+
+    # Reconnexion : le spool est republié dans l'ordre, avec les mêmes message_id
+    sent = []
+    r.exchange.publish = AsyncMock(side_effect=lambda msg, routing_key: sent.append(msg))
+    r._replayer = asyncio.create_task(r._replay_loop())
+    await r.publish_message("order.created", {"i": 3})
+    for _ in range(100):
+        if len(sent) == 4:
+            break
+        await asyncio.sleep(0.01)
+
+    assert [json.loads(m.body)["i"] for m in sent] == [0, 1, 2, 3]
+    assert r.spool.pending == 0
+    await r.disconnect()
+
+
+async def test_publish_confirmed_raises_instead_of_spooling():
+    r = RabbitMQ()
+    r.exchange = None
+    with pytest.raises(ConnectionError):
+        await r.publish_confirmed("order.created", {"a": 1}, "mid")
+
+    r.exchange = AsyncMock()
+    r.exchange_type = aio_pika.ExchangeType.TOPIC
+    await r.publish_confirmed("order.created", {"a": 1}, "mid")
+    assert r.exchange.publish.await_args.args[0].message_id == "mid"
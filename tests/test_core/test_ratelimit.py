@@ -0,0 +1,101 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.security import ratelimit
+from app.security.ratelimit import Limit, MemoryBackend, limit_read, limit_write
+from app.security.security import AuthContext, require_read, require_write
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_refills():
+    clock = _Clock()
+    backend = MemoryBackend(clock=clock)
+    limit = Limit(per_minute=60, burst=3)  # 1 jeton/s
+    assert [await backend.acquire("k", limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert await backend.acquire("k", limit) == pytest.approx(1.0)
+    clock.now = 0.5
+    assert await backend.acquire("k", limit) == pytest.approx(0.5)
+    clock.now = 1.0
+    assert await backend.acquire("k", limit) == 0.0
+    # Autre clé : budget indépendant
+    assert await backend.acquire("other", limit) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_forgets_oldest_keys():
+    backend = MemoryBackend(max_keys=2, clock=_Clock())
+    limit = Limit(per_minute=60, burst=1)
+    for key in ("a", "b", "c"):
+        await backend.acquire(key, limit)
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def _app(user="alice"):
+    app = FastAPI()
+
+    @app.get("/read", dependencies=[Depends(limit_read)])
+    async def read():
+        return {}
+
+    @app.post("/write", dependencies=[Depends(limit_write)])
+    async def write():
+        return {}
+
+    ctx = AuthContext(user=user, email=None, roles=[])
+    app.dependency_overrides[require_read] = lambda: ctx
+    app.dependency_overrides[require_write] = lambda: ctx
+    return app
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_READ_PER_MIN", 60)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_READ_BURST", 2)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_WRITE_PER_MIN", 6)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_WRITE_BURST", 1)
+    monkeypatch.setattr(ratelimit, "_backend", MemoryBackend())
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_429_with_retry_after_and_separate_budgets(limited):
+    async with _client(_app()) as client:
+        assert [(await client.get("/read")).status_code for _ in range(2)] == [200, 200]
+        refused = await client.get("/read")
+        # Le budget d'écriture n'est pas entamé par les lectures
+        assert (await client.post("/write")).status_code == 200
+        refused_write = await client.post("/write")
+    assert refused.status_code == 429 and refused.headers["retry-after"] == "1"
+    assert refused_write.status_code == 429 and refused_write.headers["retry-after"] == "10"
+
+
+@pytest.mark.asyncio
+async def test_budgets_are_per_user_with_ip_fallback(limited):
+    async with _client(_app("alice")) as alice, _client(_app("bob")) as bob:
+        for _ in range(2):
+            await alice.get("/read")
+        assert (await alice.get("/read")).status_code == 429
+        assert (await bob.get("/read")).status_code == 200
+    async with _client(_app("unknown")) as anonymous:
+        assert (await anonymous.get("/read")).status_code == 200
+    assert "ip:127.0.0.1" in {k.split(":", 1)[1] for k in ratelimit._backend._buckets}
+
+
+@pytest.mark.asyncio
+async def test_disabled_by_default():
+    async with _client(_app()) as client:
+        codes = {(await client.get("/read")).status_code for _ in range(100)}
+    assert codes == {200}
@@ -0,0 +1,74 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.models.order_models import Order, OrderItem, OrderStatus
+from app.replay import Checkpoint, build_events, iter_orders, message_id, replay
+from app.services.order_services import OrderService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    for i in range(5):
+        order = Order(customer_id=i % 2, status=OrderStatus.CONFIRMED if i % 2 else OrderStatus.PENDING)
+        order.items.append(OrderItem(product_id=i, quantity=2, unit_price=1.5, line_total=3.0))
+        session.add(order)
+    session.commit()
+    yield session
+    session.close()
+
+
+async def test_payloads_match_order_service(db):
+    order = next(iter_orders(db))
+    events = build_events(order)
+    assert [rk for rk, _ in events] == ["order.created", "order.updated"]
+    assert events[0] == OrderService._created_event(order)
+    assert events[1][1]["items"] == [{"product_id": 0, "quantity": 2, "unit_price": 1.5, "line_total": 3.0}]
+    assert build_events(order, ["updated"])[0][0] == "order.updated"
+
+
+async def test_filters_and_resume_point(db):
+    assert [o.id for o in iter_orders(db, after_id=2)] == [3, 4, 5]
+    assert [o.id for o in iter_orders(db, status=OrderStatus.CONFIRMED, to_id=4)] == [2, 4]
+    assert [o.customer_id for o in iter_orders(db, customer_id=1)] == [1, 1]
+
+
+async def test_replay_checkpoints_after_each_confirmed_batch(db, tmp_path):
+    publisher = AsyncMock()
+    ckpt = Checkpoint(str(tmp_path / "replay.ckpt"))
+
+    n_orders, n_events = await replay(publisher, iter_orders(db), ckpt, ["created"], batch_size=2)
+
+    assert (n_orders, n_events) == (5, 5)
+    sent = [c.args for c in publisher.publish_confirmed.await_args_list]
+    assert [m["order_id"] for _, m, _ in sent] == [1, 2, 3, 4, 5]
+    assert sent[0][2] == message_id("order.created", db.get(Order, 1))
+    assert ckpt.load() == 5
+
+
+async def test_failed_batch_keeps_previous_checkpoint(db, tmp_path):
+    publisher = AsyncMock()
+    publisher.publish_confirmed.side_effect = [None, None, ConnectionError("nack"), None]
+    ckpt = Checkpoint(str(tmp_path / "replay.ckpt"))
+
+    with pytest.raises(RuntimeError):
+        await replay(publisher, iter_orders(db), ckpt, ["created"], batch_size=2)
+    assert ckpt.load() == 2
+
+    # Reprise : seules les commandes après le checkpoint repartent
+    publisher.publish_confirmed.side_effect = None
+    publisher.publish_confirmed.reset_mock()
+    await replay(publisher, iter_orders(db, after_id=ckpt.load()), ckpt, ["created"], batch_size=2)
+    assert [c.args[1]["order_id"] for c in publisher.publish_confirmed.await_args_list] == [3, 4, 5]
+
+
+async def test_dry_run_publishes_nothing(db, tmp_path):
+    publisher = AsyncMock()
+    ckpt = Checkpoint(str(tmp_path / "replay.ckpt"))
+    assert await replay(publisher, iter_orders(db), ckpt, dry_run=True) == (5, 10)
+    publisher.publish_confirmed.assert_not_awaited()
+    assert ckpt.load() == 0
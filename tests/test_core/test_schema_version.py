@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, event, insert, select, update
+
+from app.core import db as core_db
+from app.core.db import (
+    Base, current_schema_version, engine, init_db, schema_fingerprint, schema_version, startup_db,
+)
+
+
+@pytest.fixture
+def version_mode(monkeypatch):
+    monkeypatch.setattr(core_db.settings, "DB_INIT_MODE", "version")
+
+
+@pytest.fixture
+def statements():
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement.split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_init_db_stamps_a_single_version_row():
+    assert current_schema_version() is None
+    init_db()
+    init_db()
+    with engine.connect() as conn:
+        assert conn.execute(select(schema_version.c.version)).scalars().all() == [schema_fingerprint()]
+
+
+def test_version_mode_skips_create_all_when_current(version_mode, monkeypatch, statements):
+    init_db()
+    statements.clear()
+    monkeypatch.setattr(core_db, "init_db", lambda: pytest.fail("create_all ne doit pas être relancé"))
+    startup_db()
+    assert statements == ["SELECT"]
+
+
+@pytest.mark.parametrize("stale", ["outdated", "missing_table"])
+def test_version_mode_falls_back_to_create_all(version_mode, stale):
+    if stale == "outdated":
+        with engine.begin() as conn:
+            conn.execute(insert(schema_version).values(version=schema_fingerprint() + 1))
+    else:
+        schema_version.drop(engine)
+    startup_db()
+    assert current_schema_version() == schema_fingerprint()
+
+
+def test_default_mode_always_runs_create_all(monkeypatch):
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(update(schema_version).values(version=0))
+    calls = []
+    monkeypatch.setattr(core_db, "init_db", lambda: calls.append(1))
+    startup_db()
+    assert calls == [1]
+
+
+def test_fingerprint_follows_the_models():
+    copy = MetaData()
+    for table in Base.metadata.tables.values():
+        table.to_metadata(copy)
+    assert schema_fingerprint(copy) == schema_fingerprint()
+
+    copy.tables["orders"].append_column(Column("note", Integer))
+    assert schema_fingerprint(copy) != schema_fingerprint()
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.singleflight import SINGLEFLIGHT_CALLS, SingleFlight
+from app.services.order_services import NotFoundError, OrderService
+
+
+def _count(name, result):
+    return SINGLEFLIGHT_CALLS.labels(name, result)._value.get()
+
+
+def _coalesced_burst(name, n, call):
+    """n appels concurrents de `call(release)` ; `release` n'est levé qu'une fois les n-1 suiveurs en attente."""
+    release = threading.Event()
+    base = _count(name, "coalesced")
+
+    def releaser():
+        deadline = time.monotonic() + 5
+        while _count(name, "coalesced") - base < n - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+
+    threading.Thread(target=releaser).start()
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(call, release) for _ in range(n)]
+        return [f.exception() or f.result() for f in futures]
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("t_share")
+    calls = []
+
+    def fetch(release):
+        calls.append(1)
+        release.wait(5)
+        return b"payload"
+
+    results = _coalesced_burst("t_share", 8, lambda release: flight.do(1, fetch, release))
+
+    assert results == [b"payload"] * 8
+    assert len(calls) == 1
+    assert _count("t_share", "leader") == 1 and _count("t_share", "coalesced") == 7
+    assert flight._calls == {}
+
+
+def test_error_is_shared_and_key_released():
+    flight = SingleFlight("t_error")
+
+    def fetch(release):
+        release.wait(5)
+        raise NotFoundError("Order 1 not found")
+
+    results = _coalesced_burst("t_error", 4, lambda release: flight.do(1, fetch, release))
+
+    assert all(isinstance(r, NotFoundError) for r in results)
+    assert _count("t_error", "leader") == 1
+    # Pas de cache : l'appel suivant s'exécute à nouveau
+    assert flight.do(1, lambda: b"ok") == b"ok"
+
+
+def test_distinct_keys_are_not_coalesced():
+    flight = SingleFlight("t_keys")
+    assert [flight.do(k, lambda k: k * 2, k) for k in (1, 2, 1)] == [2, 4, 2]
+    assert _count("t_keys", "leader") == 3 and _count("t_keys", "coalesced") == 0
+
+
+def test_service_coalesces_identical_list_reads():
+    repo = MagicMock()
+    svc = OrderService(repo, AsyncMock(), coalesce_reads=True)
+    gate = {}
+
+    def list_rows(skip, limit):
+        gate["release"].wait(5)
+        return []
+
+    repo.list_rows.side_effect = list_rows
+
+    def call(release):
+        gate["release"] = release
+        return svc.list_orders_json(skip=0, limit=10)
+
+    results = _coalesced_burst("order_list", 6, call)
+    assert results == [b"[]"] * 6
+    assert repo.list_rows.call_count == 1
+
+
+def test_service_without_coalescing_queries_every_time():
+    repo = MagicMock()
+    repo.get_row.return_value = None
+    svc = OrderService(repo, AsyncMock())
+    for _ in range(3):
+        try:
+            svc.get_order_json(7)
+        except NotFoundError:
+            pass
+    assert repo.get_row.call_count == 3
@@ -0,0 +1,66 @@
+from app.infra.events.spool import Spool
+
+
+def _drain(spool):
+    out = []
+    while (rec := spool.peek()) is not None:
+        out.append(rec)
+        spool.advance()
+    return out
+
+
+def test_append_and_replay_in_order(tmp_path):
+    spool = Spool(str(tmp_path))
+    for i in range(3):
+        spool.append("order.created", f"id-{i}", {"order_id": i})
+    assert spool.pending == 3
+
+    assert spool.peek() == ("order.created", "id-0", {"order_id": 0})
+    # peek sans advance : même event
+    assert spool.peek()[1] == "id-0"
+    assert [r[1] for r in _drain(spool)] == ["id-0", "id-1", "id-2"]
+    assert spool.pending == 0
+    spool.close()
+
+
+def test_segments_rotate_and_replayed_ones_are_deleted(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=4096)
+    payload = {"blob": "x" * 1000}
+    for i in range(10):
+        spool.append("order.updated", str(i), payload)
+    assert len(list(tmp_path.glob("*.seg"))) > 1
+
+    assert [r[1] for r in _drain(spool)] == [str(i) for i in range(10)]
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+    spool.close()
+
+
+def test_restart_resumes_from_committed_cursor(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=4096)
+    for i in range(5):
+        spool.append("order.created", str(i), {"i": i})
+    spool.peek()
+    spool.advance()
+    spool.peek()
+    spool.advance()
+    spool.close()
+
+    reopened = Spool(str(tmp_path), segment_bytes=4096)
+    assert reopened.pending == 3
+    reopened.append("order.created", "5", {"i": 5})
+    assert [r[1] for r in _drain(reopened)] == ["2", "3", "4", "5"]
+    reopened.close()
+
+
+def test_torn_record_is_invisible(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append("order.created", "ok", {"i": 1})
+    spool.append("order.created", "torn", {"i": 2})
+    # Corrompt le dernier enregistrement (écriture interrompue)
+    spool._wmap[spool._woff - 1] ^= 0xFF
+    spool.close()
+
+    reopened = Spool(str(tmp_path))
+    assert reopened.pending == 1
+    assert [r[1] for r in _drain(reopened)] == ["ok"]
+    reopened.close()
@@ -0,0 +1,96 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.db import SessionLocal
+from app.infra.events import outbox
+from app.main import app
+from app.models.order_models import Order, OrderStatus
+from app.repositories.order_repositories import OrderRepository
+from app.security.security import require_write
+from app.services.order_services import OrderService
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.add_all([Order(customer_id=10 + i) for i in range(5)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _state(db):
+    db.expire_all()
+    return {o.id: (o.status, o.version) for o in db.query(Order)}
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_updates_and_reports_each_order(db):
+    db.get(Order, 1).status = OrderStatus.CONFIRMED
+    db.get(Order, 3).status = OrderStatus.COMPLETED
+    db.commit()
+    publisher = AsyncMock()
+    svc = OrderService(OrderRepository(db), publisher)
+
+    results = await svc.update_statuses([
+        (1, OrderStatus.COMPLETED, None),
+        (2, OrderStatus.CANCELLED, 1),
+        (3, OrderStatus.COMPLETED, None),
+        (4, OrderStatus.CANCELLED, 7),
+        (5, OrderStatus.COMPLETED, None),
+        (99, OrderStatus.COMPLETED, None),
+    ])
+
+    assert [(r.order_id, r.result, r.status, r.version) for r in results] == [
+        (1, "updated", OrderStatus.COMPLETED, 3),
+        (2, "updated", OrderStatus.CANCELLED, 2),
+        (3, "unchanged", OrderStatus.COMPLETED, 2),
+        (4, "conflict", OrderStatus.PENDING, 1),
+        (5, "invalid_transition", OrderStatus.PENDING, 1),  # pending -> completed interdit
+        (99, "not_found", None, None),
+    ]
+    state = _state(db)
+    assert state[1] == (OrderStatus.COMPLETED, 3) and state[4] == state[5] == (OrderStatus.PENDING, 1)
+
+    published = sorted(call.args[0] for call in publisher.publish_message.await_args_list)
+    assert published == ["order.cancelled", "order.completed"]
+    payload = next(c.args[1] for c in publisher.publish_message.await_args_list if c.args[0] == "order.completed")
+    assert payload["order_id"] == 1 and payload["customer_id"] == 10 and payload["updated_at"]
+
+
+@pytest.mark.asyncio
+async def test_batch_in_outbox_mode_stages_events_in_the_transaction(db, monkeypatch):
+    notify = []
+    monkeypatch.setattr(outbox, "notify", lambda: notify.append(1))
+    publisher = AsyncMock()
+    svc = OrderService(OrderRepository(db), publisher, use_outbox=True)
+
+    await svc.update_statuses([(1, OrderStatus.CONFIRMED, None), (2, OrderStatus.CONFIRMED, None)])
+
+    staged = db.query(outbox.OutboxEvent).all()
+    assert sorted(e.routing_key for e in staged) == ["order.confirmed", "order.confirmed"]
+    assert notify == [1] and publisher.publish_message.await_count == 0
+
+
+def test_patch_route_validates_and_returns_results(db):
+    app.dependency_overrides[require_write] = lambda: None
+    try:
+        client = TestClient(app)
+        ok = client.patch("/orders/status", json={"updates": [
+            {"order_id": 1, "status": "confirmed"},
+            {"order_id": 2, "status": "confirmed", "expected_version": 5},
+        ]})
+        invalid = client.patch("/orders/status", json={"updates": [{"order_id": 1, "status": "shipped"}]})
+        duplicate = client.patch("/orders/status", json={"updates": [
+            {"order_id": 1, "status": "completed"}, {"order_id": 1, "status": "cancelled"},
+        ]})
+        empty = client.patch("/orders/status", json={"updates": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert ok.status_code == 200
+    assert [(r["order_id"], r["result"]) for r in ok.json()] == [(1, "updated"), (2, "conflict")]
+    assert invalid.status_code == 400 and duplicate.status_code == 400
+    assert empty.status_code == 422
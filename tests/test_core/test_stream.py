@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.order_routes import _stream
+from app.infra.events import postcommit
+from app.infra.events.stream import OrderStream, order_stream
+from app.main import app
+from app.security.security import require_read
+
+pytestmark = pytest.mark.asyncio
+
+
+def _ids(events):
+    return [e.data["n"] for e in events]
+
+
+async def test_subscribers_only_get_their_topic():
+    hub = OrderStream()
+    by_order, _, _ = hub.subscribe(("order", 1))
+    by_customer, _, _ = hub.subscribe(("customer", 7))
+    hub.publish("status", 1, 7, {"n": 1})
+    hub.publish("status", 2, 7, {"n": 2})
+    hub.publish("status", 3, 8, {"n": 3})
+
+    assert by_order.queue.qsize() == 1
+    assert [by_customer.queue.get_nowait().order_id for _ in range(2)] == [1, 2]
+
+
+async def test_last_event_id_replays_missed_events():
+    hub = OrderStream()
+    for n in range(3):
+        hub.publish("status", 1, 7, {"n": n})
+    first = hub.buffer[0].id
+
+    _, missed, complete = hub.subscribe(("order", 1), last_event_id=first)
+    assert _ids(missed) == [1, 2] and complete
+
+
+async def test_resume_is_incomplete_once_the_buffer_wrapped():
+    hub = OrderStream(buffer_size=2)
+    sub, _, _ = hub.subscribe(("order", 1))
+    for n in range(4):
+        hub.publish("status", 1, 7, {"n": n})
+    first = sub.queue.get_nowait().id
+    _, missed, complete = hub.subscribe(("order", 1), last_event_id=first)
+    assert _ids(missed) == [2, 3] and not complete
+    # Id d'un process précédent : non rejouable
+    _, _, complete = OrderStream().subscribe(("order", 1), last_event_id=1)
+    assert not complete
+
+
+async def test_slow_subscriber_is_dropped():
+    hub = OrderStream(queue_size=2)
+    sub, _, _ = hub.subscribe(("order", 1))
+    for n in range(3):
+        hub.publish("status", 1, 7, {"n": n})
+    assert sub.queue.get_nowait() is None
+    assert hub._subscribers == set()
+
+
+async def test_publication_waits_for_the_batch_commit():
+    hub = OrderStream()
+    sub, _, _ = hub.subscribe(("order", 1))
+    with postcommit.deferred() as callbacks:
+        hub.publish("status", 1, 7, {"n": 1})
+    assert sub.queue.empty()
+    postcommit.run(callbacks)
+    assert sub.queue.qsize() == 1
+
+
+async def test_stream_formats_events_and_closes_subscription():
+    hub = OrderStream()
+    sub, _, _ = hub.subscribe(("order", 1))
+    hub.publish("status", 1, 7, {"n": 1})
+    ev = sub.queue.get_nowait()
+    hub.publish("priced", 1, 7, {"n": 2})
+
+    checks = iter([False, True])
+
+    async def is_disconnected():
+        return next(checks)
+
+    request = SimpleNamespace(is_disconnected=is_disconnected)
+    chunks = [c async for c in _stream(request, sub, [b"event: snapshot\n\n"], [ev])]
+
+    assert chunks[0].startswith(b"retry:")
+    assert chunks[1] == b"event: snapshot\n\n"
+    assert chunks[2] == f'id: {ev.id}\nevent: status\ndata: {{"n":1}}\n\n'.encode()
+    assert b"event: priced" in chunks[3]
+    assert hub._subscribers == set()
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[require_read] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+async def test_unknown_order_is_404_and_frees_the_slot(client):
+    assert client.get("/orders/999/events").status_code == 404
+    assert order_stream._subscribers == set()
+
+
+async def test_subscriber_cap_returns_503(client, monkeypatch):
+    monkeypatch.setattr(order_stream, "max_subscribers", 0)
+    resp = client.get("/orders/customers/7/events")
+    assert resp.status_code == 503 and resp.headers["retry-after"] == "5"
+
+
+async def test_changes_from_another_process_keep_their_id():
+    api, worker = OrderStream(), OrderStream()
+    sent = []
+    worker._send = sent.append
+    api_sub, _, _ = api.subscribe(("customer", 7))
+
+    worker.publish("status", 1, 7, {"n": 1})
+    api._broadcast(**sent[0])  # livraison par le notifier
+    api.publish("status", 2, 7, {"n": 2})
+
+    remote, local = api_sub.queue.get_nowait(), api_sub.queue.get_nowait()
+    assert remote.id == worker.buffer[0].id and local.id > remote.id
+    # Reprise sur un autre process : l'id reçu ailleurs reste comparable
+    _, missed, complete = api.subscribe(("customer", 7), last_event_id=remote.id)
+    assert _ids(missed) == [2] and complete
@@ -0,0 +1,170 @@
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from app.core.db import SessionLocal, engine
+from app.infra.events.handlers import handle_customer_deleted, handle_customer_validated
+from app.main import app
+from app.models.order_models import ORDER_TRANSITIONS, Order, OrderItem, OrderStatus, allowed_sources
+from app.repositories.order_repositories import OrderRepository
+from app.security.security import require_write
+from app.services.order_services import InvalidTransitionError, NotFoundError, OrderService
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.add(Order(customer_id=5))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements():
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement.split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_transition_table():
+    assert set(ORDER_TRANSITIONS) == set(OrderStatus)
+    assert allowed_sources(OrderStatus.COMPLETED) == [OrderStatus.CONFIRMED]
+    assert allowed_sources(OrderStatus.PENDING) == [OrderStatus.REJECTED]
+
+
+@pytest.mark.asyncio
+async def test_transition_is_a_single_update(db, statements):
+    svc = OrderService(OrderRepository(db), AsyncMock())
+    row = await svc.update_order_status(1, OrderStatus.CONFIRMED)
+
+    assert (row.status, row.version, row.customer_id) == (OrderStatus.CONFIRMED, 2, 5)
+    assert row.updated_at is not None
+    assert [s for s in statements if s in ("SELECT", "UPDATE")] == ["UPDATE"]
+
+
+@pytest.mark.asyncio
+async def test_noop_invalid_and_missing(db):
+    svc = OrderService(OrderRepository(db), AsyncMock())
+    row = await svc.update_order_status(1, OrderStatus.PENDING)
+    assert (row.status, row.version) == (OrderStatus.PENDING, 1)
+
+    await svc.update_order_status(1, OrderStatus.REJECTED)
+    with pytest.raises(InvalidTransitionError):
+        await svc.update_order_status(1, OrderStatus.CONFIRMED)
+    with pytest.raises(NotFoundError):
+        await svc.update_order_status(42, OrderStatus.CONFIRMED)
+    db.expire_all()
+    assert (db.get(Order, 1).status, db.get(Order, 1).version) == (OrderStatus.REJECTED, 2)
+
+
+def test_put_status_returns_409_on_forbidden_transition(db):
+    app.dependency_overrides[require_write] = lambda: None
+    try:
+        client = TestClient(app)
+        ok = client.put("/orders/1/status", json={"status": "confirmed"})
+        forbidden = client.put("/orders/1/status", json={"status": "pending"})
+    finally:
+        app.dependency_overrides.clear()
+    assert ok.status_code == 200 and ok.json()["status"] == "confirmed" and ok.json()["version"] == 2
+    assert forbidden.status_code == 409
+
+
+def test_put_status_answers_from_the_update_row(db, statements):
+    app.dependency_overrides[require_write] = lambda: None
+    try:
+        response = TestClient(app).put("/orders/1/status", json={"status": "confirmed"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed" and response.json()["customer_id"] == 5
+    assert [s for s in statements if s in ("SELECT", "UPDATE")] == ["UPDATE"]
+
+
+def test_postgres_transition_is_one_statement():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    session.execute.return_value.first.return_value = MagicMock(status=OrderStatus.PENDING, changed=True)
+
+    row, changed = OrderRepository(session).transition_status(1, OrderStatus.CONFIRMED)
+
+    assert changed and session.execute.call_count == 1
+    sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH") and "UPDATE orders SET" in sql and "LEFT OUTER JOIN changed" in sql
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("start, published, final", [
+    (OrderStatus.PENDING, True, OrderStatus.PENDING),
+    (OrderStatus.REJECTED, True, OrderStatus.PENDING),  # client revalidé : nouvelle demande de stock
+    (OrderStatus.CANCELLED, False, OrderStatus.CANCELLED),
+])
+async def test_customer_validated_requests_stock(db, start, published, final):
+    db.get(Order, 1).status = start
+    db.commit()
+    publisher = AsyncMock()
+
+    await handle_customer_validated({"order_id": 1, "customer_id": 5}, db, publisher)
+
+    sent = [c.args[0] for c in publisher.publish_message.await_args_list]
+    assert sent == (["order.ready_for_stock"] if published else [])
+    db.expire_all()
+    assert db.get(Order, 1).status == final
+
+
+@pytest.mark.asyncio
+async def test_customer_validated_builds_the_payload_off_the_loop(db):
+    order = db.get(Order, 1)
+    order.total = 6.0
+    order.items.append(OrderItem(product_id=3, quantity=2, unit_price=3.0, line_total=6.0, total=6.0))
+    db.commit()
+    publisher = AsyncMock()
+    loop_thread, on_loop = threading.get_ident(), []
+
+    def record(conn, cursor, statement, *args):
+        if threading.get_ident() == loop_thread:
+            on_loop.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        await handle_customer_validated({"order_id": 1, "customer_id": 5}, db, publisher)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert on_loop == []
+    publisher.publish_message.assert_awaited_once_with("order.ready_for_stock", {
+        "order_id": 1,
+        "customer_id": 5,
+        "items": [{"product_id": 3, "quantity": 2, "unit_price": 3.0}],
+        "total": 6.0,
+    })
+
+
+@pytest.mark.asyncio
+async def test_customer_deleted_runs_no_query_on_the_loop(db):
+    db.add_all([Order(customer_id=5), Order(customer_id=5)])
+    db.commit()
+    loop_thread, on_loop = threading.get_ident(), []
+
+    def record(conn, cursor, statement, *args):
+        if threading.get_ident() == loop_thread:
+            on_loop.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        await handle_customer_deleted({"id": 5}, db, AsyncMock())
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert on_loop == []
+    db.expire_all()
+    assert {o.status for o in db.query(Order).filter_by(customer_id=5)} == {OrderStatus.CANCELLED}
@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.db import SessionLocal, engine
+from app.core.executor import DbExecutor
+from app.infra.events import postcommit
+from app.infra.events.handlers import handle_order_price_calculated
+from app.infra.events.waiters import Waiters, price_waiters
+from app.repositories.order_repositories import OrderRepository
+from app.schemas.order_schemas import OrderCreate
+from app.services.order_services import OrderService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_resolve_wakes_every_waiter_of_the_key():
+    w = Waiters("t")
+    a, b = w.register(1), w.register(1)
+    w.resolve(1)
+    assert await w.wait(1, a, 0.1) and await w.wait(1, b, 0.1)
+    assert w._futures == {}
+
+
+async def test_wait_times_out_and_forgets_the_future():
+    w = Waiters("t")
+    fut = w.register(1)
+    assert await w.wait(1, fut, 0.01) is False
+    assert w._futures == {}
+    w.resolve(1)  # plus personne : sans effet
+
+
+async def test_resolution_is_deferred_inside_a_batch():
+    w = Waiters("t")
+    fut = w.register(1)
+    with postcommit.deferred() as callbacks:
+        w.resolve(1)
+    assert not fut.done() and len(callbacks) == 1
+    postcommit.run(callbacks)
+    assert fut.done()
+
+
+def _price_reply(publisher):
+    """Simule le service de pricing : répond à order.request_price via le handler."""
+
+    async def publish(rk, message):
+        if rk != "order.request_price":
+            return
+
+        async def reply():
+            db = SessionLocal()
+            try:
+                items = [{**it, "unit_price": 2.5} for it in message["items"]]
+                payload = {"order_id": message["order_id"], "customer_id": 7, "items": items, "total": 5.0}
+                await handle_order_price_calculated(payload, db, AsyncMock())
+            finally:
+                db.close()
+
+        asyncio.get_running_loop().create_task(reply())
+
+    publisher.publish_message.side_effect = publish
+
+
+async def _create(publisher, wait_ms):
+    db = SessionLocal()
+    try:
+        svc = OrderService(OrderRepository(db), publisher, executor=DbExecutor(0))
+        order = await svc.create_and_request_price(
+            OrderCreate(customer_id=7, items=[{"product_id": 1, "quantity": 2}]), wait_for_price_ms=wait_ms
+        )
+        return order.total, [(it.unit_price, it.line_total) for it in order.items]
+    finally:
+        db.close()
+
+
+async def test_create_waits_for_the_priced_order():
+    publisher = AsyncMock()
+    _price_reply(publisher)
+    total, items = await _create(publisher, 1000)
+    assert total == 5.0 and items == [(2.5, 5.0)]
+    assert price_waiters._futures == {}
+
+
+async def test_create_returns_pending_order_when_deadline_expires():
+    total, items = await _create(AsyncMock(), 20)
+    assert total is None and items == []
+    assert price_waiters._futures == {}
+
+
+async def test_create_rereads_the_order_when_no_wakeup_arrives(monkeypatch):
+    # Prix appliqué par un autre process dont le réveil n'arrive pas : pas de faux 202
+    monkeypatch.setattr("app.infra.events.handlers.price_waiters", Waiters("elsewhere"))
+    publisher = AsyncMock()
+    _price_reply(publisher)
+    total, items = await _create(publisher, 100)
+    assert total == 5.0 and items == [(2.5, 5.0)]
+
+
+async def test_create_releases_its_connection_while_waiting():
+    checked_out = []
+
+    async def publish(rk, message):
+        async def reply():
+            await asyncio.sleep(0.01)  # la requête est dans price_waiters.wait
+            checked_out.append(engine.pool.checkedout())
+            price_waiters.resolve(message["order_id"])
+
+        if rk == "order.request_price":
+            asyncio.get_running_loop().create_task(reply())
+
+    publisher = AsyncMock()
+    publisher.publish_message.side_effect = publish
+    await _create(publisher, 1000)
+    assert checked_out == [0]
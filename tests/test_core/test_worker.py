@@ -0,0 +1,127 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_supervise_restarts_after_crash_and_stops_on_cancel(monkeypatch):
+    from app.infra.events import consumer
+
+    real_sleep = asyncio.sleep
+
+    async def no_backoff(_delay):
+        await real_sleep(0)
+
+    monkeypatch.setattr(consumer.asyncio, "sleep", no_backoff)
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("channel closed")
+        await asyncio.Event().wait()
+
+    task = asyncio.create_task(consumer.supervise(factory, name="test"))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert len(calls) == 3
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_worker_run_starts_consumer_and_shuts_down(monkeypatch):
+    from app import worker
+
+    rabbit = MagicMock()
+    rabbit.connect = AsyncMock()
+    rabbit.disconnect = AsyncMock()
+    started = asyncio.Event()
+
+    async def fake_start_consumer(*args, **kwargs):
+        assert kwargs["queue_name"] == "order-events"
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(worker, "rabbitmq", rabbit)
+    monkeypatch.setattr(worker, "start_consumer", fake_start_consumer)
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(worker.run(stop))
+    await asyncio.wait_for(started.wait(), 1)
+    stop.set()
+    await asyncio.wait_for(task, 1)
+
+    rabbit.connect.assert_awaited_once()
+    rabbit.disconnect.assert_awaited_once()
+
+
+
+async def test_parse_lanes_with_defaults_and_invalid_entries(monkeypatch):
+    from app.infra.events import consumer
+
+    monkeypatch.setattr(consumer.settings, "EVENTS_CONCURRENCY", 2)
+    monkeypatch.setattr(consumer.settings, "EVENTS_PREFETCH", 16)
+
+    lanes = consumer.parse_lanes(
+        "critical=order.confirmed,order.rejected:8:32; bulk=customer.# ; bad=x:y ; =order.#"
+    )
+
+    assert lanes == [
+        consumer.Lane("critical", ["order.confirmed", "order.rejected"], 8, 32),
+        consumer.Lane("bulk", ["customer.#"], 2, 16),
+    ]
+    assert consumer.parse_lanes("") == []
+
+
+async def test_worker_starts_one_consumer_per_lane(monkeypatch):
+    from app import worker
+    from app.infra.events import consumer
+
+    monkeypatch.setattr(consumer.settings, "EVENTS_LANES", "fast=order.#:4:8;slow=customer.#:1:2")
+    rabbit = MagicMock()
+    rabbit.connect = AsyncMock()
+    rabbit.disconnect = AsyncMock()
+    seen = {}
+
+    async def fake_start_consumer(*args, **kwargs):
+        seen[kwargs["queue_name"]] = (kwargs["patterns"], kwargs["concurrency"], kwargs["prefetch"])
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(worker, "rabbitmq", rabbit)
+    monkeypatch.setattr(worker, "start_consumer", fake_start_consumer)
+    monkeypatch.setattr(worker, "startup_db", lambda: None)
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(worker.run(stop))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    stop.set()
+    await asyncio.wait_for(task, 1)
+
+    assert seen == {"fast": (["order.#"], 4, 8), "slow": (["customer.#"], 1, 2)}
+
+
+async def test_worker_creates_its_tables_on_a_fresh_database(monkeypatch):
+    from sqlalchemy import inspect
+
+    from app import worker
+    from app.core.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    rabbit = MagicMock()
+    rabbit.connect = AsyncMock()
+    rabbit.disconnect = AsyncMock()
+    monkeypatch.setattr(worker, "rabbitmq", rabbit)
+    monkeypatch.setattr(worker, "spawn_lanes", lambda *_: [])
+    monkeypatch.setattr(worker, "spawn_outbox_relay", lambda *_: None)
+
+    stop = asyncio.Event()
+    stop.set()
+    await asyncio.wait_for(worker.run(stop), 5)
+
+    tables = set(inspect(engine).get_table_names())
+    assert {"orders", "processed_events", "outbox", "schema_version"} <= tables